@@ -1,12 +1,31 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context, g, has_request_context
 import os
+import functools
+import hmac
 import json
 import threading
 import time
 import sys
 import ssl
+import uuid
 from datetime import datetime
 from debate_engine import DebateEngine
+from utils.jobs import JobQueue, FINISHED_STATES
+from utils.speculative_tts import SpeculativeTTS
+from utils.speculative_reply import SpeculativeReplies
+from utils.shared_store import SQLiteSessionInterface, SQLiteCache
+from utils.audio_pipeline import AudioNormalizer, EXTENSIONS, sniff_file
+from utils.audio_files import AudioFiles
+from utils.chunked_upload import RecordingUploads
+from utils.opening_pool import OpeningPool, load_catalog, catalog_keys
+from utils.transcripts import TranscriptStore
+from utils.similarity import RebuttalIndex
+from utils.idempotency import SubmissionCoalescer
+from utils.cancellation import CancelRegistry, Cancelled, DisconnectWatcher, request_socket
+from utils.response_cache import cache_key
+from utils.turns import DebateHistory, Turn, USER
+from utils.turn_order import DebateLocks, TurnConflict
+from utils import provider_tape
 
 print(f"🐍 Python Version: {sys.version}")
 print(f"🐍 Python Version Info: {sys.version_info}")
@@ -25,20 +44,378 @@ from utils.api_keys import get_api_keys
 app = Flask(__name__)
 app.secret_key = 'debate_coach_secret_key_2024'
 
+MAX_BATCH_ARGUMENTS = 500
+MAX_BATCH_PACK_SIZE = 25
+MAX_BATCH_WORKERS = 16
+
+DATA_DIR = os.getenv('DEBATE_DATA_DIR', 'data')
+SESSION_DB = os.getenv('DEBATE_SESSION_DB', os.path.join(DATA_DIR, 'sessions.db'))
+CACHE_DB = os.getenv('DEBATE_CACHE_DB', os.path.join(DATA_DIR, 'cache.db'))
+OPENING_POOL_DB = os.getenv('OPENING_POOL_DB', os.path.join(DATA_DIR, 'openings.db'))
+TRANSCRIPTS_DB = os.getenv('DEBATE_TRANSCRIPTS_DB', os.path.join(DATA_DIR, 'transcripts.db'))
+SUBMISSIONS_DB = os.getenv('DEBATE_SUBMISSIONS_DB', os.path.join(DATA_DIR, 'submissions.db'))
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_OFFSET = 10000
+
+# Sessions and the response cache live in SQLite so every worker process shares them
+app.session_interface = SQLiteSessionInterface(SESSION_DB, intern_keys=('debate_topic', 'user_side', 'ai_theme'))
+
 print("🔄 Initializing components...")
+# PROVIDER_TAPE records provider calls, or replays them offline (see utils/provider_tape.py)
+tape = provider_tape.install_from_env()
+if tape is not None:
+    print(f"📼 Provider tape {tape.mode}: {tape.path}")
 api_keys = get_api_keys()
-debate_engine = DebateEngine(api_keys)
+# REBUTTAL_REUSE_THRESHOLD is the default minimum similarity; REBUTTAL_REUSE_THEMES="objective:0.95,flirty:2"
+# overrides it per theme (above 1 disables reuse for that theme)
+rebuttal_index = RebuttalIndex(
+    default_threshold=float(os.getenv('REBUTTAL_REUSE_THRESHOLD', '0.85')),
+    thresholds=RebuttalIndex.parse_thresholds(os.getenv('REBUTTAL_REUSE_THEMES', ''))
+) if os.getenv('REBUTTAL_REUSE', '1') != '0' else None
+debate_engine = DebateEngine(
+    api_keys,
+    analysis_cache=SQLiteCache(CACHE_DB, namespace='analysis'),
+    rebuttal_index=rebuttal_index
+)
+
+# Every debate is also written to a permanent store that outlives the session
+# Turns are group-committed every TRANSCRIPT_FLUSH_MS (0 = commit each turn)
+transcripts = TranscriptStore(TRANSCRIPTS_DB, flush_interval=float(os.getenv('TRANSCRIPT_FLUSH_MS', '50')) / 1000)
+
+# The session keeps the last DEBATE_HISTORY_TURNS turns; older ones are read back from the transcript store
+HISTORY_CAP = int(os.getenv('DEBATE_HISTORY_TURNS', '40'))
+
+def session_history():
+    return DebateHistory.decode(session.get('debate_history'), cap=HISTORY_CAP)
+
+def record_turn(speaker, message, at=None, source=None):
+    """Append a turn to the session history and the transcript store; source is where an AI turn came from"""
+    now = at or datetime.now()
+    history = session_history()
+    history.append(speaker, message, now.timestamp())
+    session['debate_history'] = history.encode()
+    transcripts.append(session['debate_id'], speaker, message, now.timestamp(), source=source)
+
+# Double-clicks and client retries of /submit_argument share one generate_response call
+submissions = SubmissionCoalescer(SUBMISSIONS_DB, ttl=float(os.getenv('SUBMISSION_REPLAY_SECONDS', '600')))
+
+# Different arguments sent to one debate at once (two tabs) run one after another in arrival order;
+# DEBATE_TURN_ORDER=reject answers an overlapping turn with 409 instead of queueing it
+turn_locks = DebateLocks(
+    SESSION_DB,
+    mode=os.getenv('DEBATE_TURN_ORDER', 'queue'),
+    wait_timeout=float(os.getenv('DEBATE_TURN_WAIT_SECONDS', '120')),
+    max_waiting=int(os.getenv('DEBATE_TURN_QUEUE', '4'))
+)
+
+def submission_key(data, user_argument):
+    """Idempotency key of a submission: the client's key, else (debate, turn, argument)"""
+    client_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    if client_key:
+        return cache_key('submit', session['debate_id'], str(client_key))
+    
+    history = session_history()
+    turn = len(history)
+    # A retry that arrives after the first request saved the session finds its own turn already recorded
+    recent = history.turns
+    if (len(recent) >= 2 and recent[-1]['speaker'] == 'ai'
+            and recent[-2]['speaker'] == 'user' and recent[-2].message == user_argument):
+        turn -= 2
+    return cache_key('submit', session['debate_id'], str(turn), user_argument)
+
+# In-flight provider calls are cancelled by /reset_debate (the whole debate), the page-close
+# beacon (/cancel, that page's requests only) or, unless CANCEL_ON_DISCONNECT=0, the client
+# dropping the connection
+cancellations = CancelRegistry()
+disconnect_watcher = DisconnectWatcher() if os.getenv('CANCEL_ON_DISCONNECT', '1') != '0' else None
+
+def request_cancel_token():
+    """Cancel token of the current request, created and registered on first use"""
+    token = g.get('cancel_token')
+    if token is None:
+        g.cancel_key = session.get('debate_id', '')
+        token = g.cancel_token = cancellations.open(g.cancel_key, request.headers.get('X-Request-Id'))
+        sock = request_socket(request.environ) if disconnect_watcher is not None else None
+        if sock is not None:
+            disconnect_watcher.watch(sock, token)
+            g.cancel_socket = sock
+    return token
+
+def current_cancel_token():
+    """The running job's token on a job worker, else the request's"""
+    token = job_queue.current_token()
+    if token is None and has_request_context():
+        token = request_cancel_token()
+    return token
+
+def cancel_debate(debate_id, reason):
+    if not debate_id:
+        return 0
+    cancelled = cancellations.cancel(debate_id, reason) + job_queue.cancel_tag(debate_id, reason)
+    if cancelled:
+        print(f"🛑 Cancelled {cancelled} in-flight calls/jobs of debate {debate_id} ({reason})")
+    return cancelled
+
+@app.teardown_request
+def release_cancel_token(exc=None):
+    token = g.pop('cancel_token', None)
+    if token is not None:
+        sock = g.pop('cancel_socket', None)
+        if sock is not None:
+            disconnect_watcher.unwatch(sock)
+        cancellations.close(g.pop('cancel_key'), token)
+
+def cancellable(view):
+    """Turn Cancelled (a BaseException Flask won't handle) into a 499 response"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except Cancelled as e:
+            print(f"🛑 {request.path} cancelled ({e})")
+            # 499 is nginx's "client closed request"; a reset client just ignores it
+            return jsonify({'error': 'Request cancelled', 'cancelled': True, 'reason': str(e)}), 499
+    return wrapper
 voice_manager = VoiceManager(api_keys)
 
-if VOICE_MODULE_AVAILABLE:
-    voice_status = voice_manager.get_voice_status()
-    print("🎤 FINAL VOICE STATUS:")
-    for feature, available in voice_status.items():
-        status = "✅" if available else "❌"
-        print(f"   {feature}: {status}")
-else:
+if not VOICE_MODULE_AVAILABLE:
     print("❌ Voice features running in fallback mode")
 
+os.makedirs('temp', exist_ok=True)
+
+def _analysis_job(payload):
+    return debate_engine.analyze_argument(payload['argument'], payload['theme'], cancel=job_queue.current_token())
+
+def _tts_job(payload):
+    audio_path = voice_manager.text_to_speech(payload['text'], payload['debate_id'], payload['theme'])
+    if audio_path.startswith('❌') or not audio_path.startswith('/'):
+        raise RuntimeError(audio_path)
+    return {'audio_path': audio_path}
+
+audio_normalizer = AudioNormalizer()
+# Synthesized replies are served by /audio with ETags, ranges and long-lived caching
+audio_files = AudioFiles()
+
+def save_upload(audio_file, prefix):
+    """Save an uploaded recording under the extension of its real container"""
+    base = os.path.join('temp', f"{prefix}_{session.get('debate_id', 'unknown')}_{uuid.uuid4().hex[:8]}")
+    audio_file.save(base)
+    path = base + EXTENSIONS[sniff_file(base)]
+    os.replace(base, path)
+    return path
+
+def _transcription_job(payload):
+    normalized = audio_normalizer.normalize(payload['path'])
+    try:
+        source = payload['path']
+        if normalized:
+            print(f"🎚️ Normalized {normalized['container']} → 16 kHz mono {normalized['format']}: "
+                  f"{normalized['input_bytes']} → {normalized['output_bytes']} bytes, "
+                  f"{normalized['cpu_per_audio_second'] * 1000:.1f} ms CPU per second of audio")
+            if normalized['output_bytes'] < normalized['input_bytes']:
+                source = normalized['path']
+        return {'transcription': voice_manager.transcribe_audio(source, cancel=current_cancel_token())}
+    finally:
+        for path in (payload['path'], normalized and normalized['path']):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+recording_uploads = RecordingUploads(max_bytes=int(os.getenv('RECORDING_MAX_BYTES', str(50 * 1024 * 1024))))
+STREAMING_UPLOAD_ENABLED = (
+    VOICE_MODULE_AVAILABLE
+    and bool(api_keys.get('ASSEMBLYAI_API_KEY'))
+    and hasattr(voice_manager, 'upload_audio')
+)
+
+def _stream_recording_upload(recording_id):
+    """Upload a recording to AssemblyAI while it is still being recorded"""
+    try:
+        upload_url = voice_manager.upload_audio(recording_uploads.stream(recording_id), timeout=300)
+    except Exception as e:
+        upload_url = f"❌ Streaming upload failed: {e}"
+    try:
+        recording_uploads.update(recording_id, upload_url=upload_url)
+    except KeyError:
+        pass
+
+def _summary_job(payload):
+    history = DebateHistory.decode(payload['debate_history']).all(transcripts, payload.get('debate_id'))
+    return {'summary': debate_engine.summarize_debate(
+        payload['topic'], payload['user_side'], payload['theme'], history
+    )}
+
+job_queue = JobQueue(
+    workers=int(os.getenv('JOB_WORKERS', '4')),
+    db_path=os.getenv('JOB_QUEUE_DB') or None
+)
+job_queue.register('analysis', _analysis_job)
+job_queue.register('tts', _tts_job)
+job_queue.register('transcription', _transcription_job)
+job_queue.register('summary', _summary_job)
+
+def _speculative_reply_job(payload):
+    history = DebateHistory.decode(payload['debate_history'])
+    with debate_engine.usage_meter() as meter:
+        try:
+            reply = debate_engine.generate_response(
+                user_argument=payload['argument'],
+                topic=payload['topic'],
+                user_side=payload['user_side'],
+                theme=payload['theme'],
+                debate_history=history.turns + [Turn(USER, payload['argument'], time.time())],
+                cancel=job_queue.current_token(),
+                remember=False
+            )
+        except Cancelled:
+            speculative_replies.cancelled(sum(usage['completion_tokens'] for usage in meter.values()))
+            raise
+    return {
+        'reply': reply,
+        'source': debate_engine.last_rebuttal_source(),
+        'completion_tokens': sum(usage['completion_tokens'] for usage in meter.values())
+    }
+
+job_queue.register('speculative_reply', _speculative_reply_job)
+
+# Realtime mode: partial transcripts (POST /realtime/partial, or a start_realtime_transcription callback)
+# start the rebuttal early; /submit_argument with realtime=true uses it if the final transcript still matches
+speculative_replies = SpeculativeReplies(
+    job_queue,
+    index=SQLiteCache(CACHE_DB, namespace='speculative_reply', ttl=300) if job_queue.db_path else None,
+    min_words=int(os.getenv('REALTIME_MIN_WORDS', '10')),
+    reissue_below=float(os.getenv('REALTIME_REISSUE_BELOW', '0.85')),
+    accept_at=float(os.getenv('REALTIME_ACCEPT_AT', '0.8'))
+)
+REALTIME_SPECULATION_ENABLED = os.getenv('REALTIME_SPECULATION', '1') != '0'
+
+speculative_tts = SpeculativeTTS(
+    job_queue,
+    index=SQLiteCache(CACHE_DB, namespace='speculative_tts', ttl=600) if job_queue.db_path else None,
+    voice_for=lambda theme: getattr(voice_manager, 'available_voices', {}).get(theme)
+)
+SPECULATIVE_TTS = os.getenv('SPECULATIVE_TTS', '1') != '0'
+
+def speculative_tts_enabled():
+    """Checked per call: the TTS engine is only created on first use, after import"""
+    return VOICE_MODULE_AVAILABLE and SPECULATIVE_TTS and voice_manager.get_voice_status()['tts_available']
+
+def speculative_audio(text, theme, debate_id):
+    if not speculative_tts_enabled():
+        return None
+    return speculative_tts.start(text, theme, debate_id)
+
+def _synthesize_pooled_opening(text, theme):
+    if not speculative_tts_enabled():
+        return None
+    audio_path = voice_manager.text_to_speech(text, 'opening_pool', theme)
+    if audio_path.startswith('❌') or not audio_path.startswith('/'):
+        raise RuntimeError(audio_path)
+    return audio_path
+
+# Openings for the start screen's fixed topics are generated ahead of time
+OPENING_CATALOG = load_catalog(os.path.join(app.root_path, 'templates', 'index.html'))
+OPENING_KEYS = catalog_keys(OPENING_CATALOG)
+OPENING_POOL_ENABLED = (
+    int(os.getenv('OPENING_POOL_DEPTH', '2')) > 0
+    and debate_engine.has_providers()
+)
+def _generate_pooled_opening(topic, side, theme, angle):
+    text = debate_engine.generate_opening(topic, side, theme, angle=angle)
+    if debate_engine.last_call_mocked():
+        # A provider failed and the canned mock stood in; it must not be served for days from the pool
+        raise RuntimeError("provider unavailable, got the mock fallback")
+    return text
+
+opening_pool = OpeningPool(
+    OPENING_POOL_DB,
+    generate=_generate_pooled_opening,
+    synthesize=_synthesize_pooled_opening if os.getenv('OPENING_POOL_TTS', '1') != '0' else None,
+    depth=int(os.getenv('OPENING_POOL_DEPTH', '2')),
+    max_age=float(os.getenv('OPENING_POOL_MAX_AGE', str(7 * 24 * 3600)))
+)
+job_queue.register('opening_refill', lambda payload: {
+    'added': opening_pool.refill(payload['topic'], payload['side'], payload['theme'])
+})
+
+last_request_at = time.time()
+
+def off_peak():
+    """No recent traffic, nothing queued, and inside OPENING_POOL_HOURS (e.g. "1-6") if set"""
+    hours = os.getenv('OPENING_POOL_HOURS')
+    if hours:
+        first, last = (int(hour) for hour in hours.split('-'))
+        if not first <= datetime.now().hour <= last:
+            return False
+    states = job_queue.stats()['states']
+    return (
+        time.time() - last_request_at > float(os.getenv('OPENING_POOL_IDLE_SECONDS', '60'))
+        and not states.get('queued') and not states.get('running')
+    )
+
+@app.before_request
+def note_request():
+    global last_request_at
+    if request.endpoint not in ('static', 'serve_audio', 'metrics'):
+        last_request_at = time.time()
+
+def pooled_opening(topic, side, theme):
+    """Pop a pre-generated opening and queue its replacement"""
+    if not OPENING_POOL_ENABLED or (topic, side, theme) not in OPENING_KEYS:
+        return None
+    pooled = opening_pool.take(topic, side, theme)
+    job_queue.submit('opening_refill', {'topic': topic, 'side': side, 'theme': theme}, tag='opening_pool')
+    return pooled
+
+def load_rebuttal_index():
+    """Seed the near-duplicate index with exchanges from past debates"""
+    loaded = 0
+    for topic, side, theme, argument, rebuttal in transcripts.iter_exchanges(
+        limit=int(os.getenv('REBUTTAL_REUSE_BOOTSTRAP', '20000'))
+    ):
+        rebuttal_index.add(topic, side, theme, argument, rebuttal)
+        loaded += 1
+    print(f"♻️ Rebuttal index loaded {loaded} past exchanges")
+
+# Offline transcription model, loaded into its own process once per worker
+local_stt = getattr(voice_manager, 'local_stt', None)
+
+def warm_providers():
+    """Import provider SDKs and create the TTS engine (voice scan included)"""
+    started = time.time()
+    debate_engine.warmup()
+    if hasattr(voice_manager, 'warmup'):
+        voice_manager.warmup()
+    print(f"🔥 Providers warmed up in {time.time() - started:.2f}s")
+
+def warmup():
+    """Per-process initialization, run at import in dev mode or after fork by serve.py"""
+    job_queue.start()
+    # Off the startup path; STARTUP_WARMUP=0 leaves it to the first request that needs each piece
+    if os.getenv('STARTUP_WARMUP', '1') != '0':
+        threading.Thread(target=warm_providers, name='provider-warmup', daemon=True).start()
+    os.makedirs(os.path.join('static', 'audio'), exist_ok=True)
+    with app.app_context():
+        app.jinja_env.get_template('index.html')
+    debate_engine.analysis_cache.stats()
+    if local_stt is not None:
+        local_stt.warm_in_background()
+    if OPENING_POOL_ENABLED:
+        opening_pool.start_filler(OPENING_KEYS, is_idle=off_peak)
+    if rebuttal_index is not None and debate_engine.has_providers():
+        threading.Thread(target=load_rebuttal_index, daemon=True).start()
+    print(f"🔥 Worker {os.getpid()} warmed up")
+
+if os.getenv('DEBATE_DEFER_WARMUP') != '1':
+    warmup()
+
+def accepted(job_id):
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'events_url': f'/jobs/{job_id}/events'
+    }), 202
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -58,85 +435,330 @@ def voice_status_endpoint():
             'python_version_compatible': False
         })
 
+def _voice_catalog():
+    return getattr(voice_manager, 'voice_catalog', None) if VOICE_MODULE_AVAILABLE else None
+
+# Changing theme voices affects every user; unset, the admin routes are disabled
+VOICE_ADMIN_TOKEN = os.getenv('VOICE_ADMIN_TOKEN', '')
+
+def voice_admin(view):
+    """403 unless the X-Admin-Token header matches VOICE_ADMIN_TOKEN"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not VOICE_ADMIN_TOKEN:
+            return jsonify({'error': 'Voice administration is disabled (set VOICE_ADMIN_TOKEN)'}), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), VOICE_ADMIN_TOKEN.encode()):
+            return jsonify({'error': 'Invalid or missing X-Admin-Token'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/audio/<path:filename>')
+def serve_audio(filename):
+    return audio_files.send(filename)
+
+@app.route('/voices')
+def list_voices():
+    catalog = _voice_catalog()
+    if catalog is None:
+        return jsonify({'error': 'Theme voices not supported by this voice module'}), 404
+    voice_manager.get_voice_status()  # loads or scans the catalog on first use
+    return jsonify(catalog.describe())
+
+@app.route('/voices/rescan', methods=['POST'])
+@voice_admin
+def rescan_voices():
+    if _voice_catalog() is None:
+        return jsonify({'error': 'Theme voices not supported by this voice module'}), 404
+    described = voice_manager.rescan_voices()
+    if described is None:
+        return jsonify({'error': 'TTS engine not available'}), 503
+    return jsonify(described)
+
+@app.route('/voices/<theme>', methods=['PUT', 'DELETE'])
+@voice_admin
+def override_voice(theme):
+    catalog = _voice_catalog()
+    if catalog is None:
+        return jsonify({'error': 'Theme voices not supported by this voice module'}), 404
+    if theme not in debate_engine.themes:
+        return jsonify({'error': f'Unknown theme: {theme}'}), 404
+
+    if request.method == 'DELETE':
+        catalog.clear_override(theme)
+    else:
+        voice_id = (request.json or {}).get('voice_id')
+        if not voice_id:
+            return jsonify({'error': 'No voice_id provided'}), 400
+        voice_manager.get_voice_status()
+        try:
+            catalog.set_override(theme, voice_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify({'theme': theme, 'voice_id': catalog.mapping().get(theme), 'overrides': catalog.describe()['overrides']})
+
 @app.route('/start_debate', methods=['POST'])
+@cancellable
 def start_debate():
     data = request.json
     
     session['debate_topic'] = data.get('topic')
     session['user_side'] = data.get('side')
     session['ai_theme'] = data.get('theme')
-    session['debate_history'] = []
-    session['debate_id'] = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    opening_response = debate_engine.generate_opening(
+    if session.get('debate_id'):
+        speculative_replies.discard(session['debate_id'])
+    session['debate_history'] = DebateHistory(cap=HISTORY_CAP).encode()
+    session['debate_id'] = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    session.setdefault('user_id', uuid.uuid4().hex)
+    transcripts.start_debate(
+        session['debate_id'],
         topic=session['debate_topic'],
-        user_side=session['user_side'],
-        theme=session['ai_theme']
+        side=session['user_side'],
+        theme=session['ai_theme'],
+        user_id=session['user_id']
     )
     
-    session['debate_history'].append({
-        'speaker': 'ai',
-        'message': opening_response,
-        'timestamp': datetime.now().isoformat()
-    })
+    pooled = pooled_opening(session['debate_topic'], session['user_side'], session['ai_theme'])
+    if pooled:
+        opening_response = pooled['text']
+        source = 'generated'
+    else:
+        opening_response = debate_engine.generate_opening(
+            topic=session['debate_topic'],
+            user_side=session['user_side'],
+            theme=session['ai_theme'],
+            cancel=request_cancel_token()
+        )
+        source = 'mock' if debate_engine.last_call_mocked() else 'generated'
+    
+    if pooled and pooled['audio_path']:
+        audio = {'job_id': None, 'status': 'ready', 'audio_path': pooled['audio_path']}
+    else:
+        audio = speculative_audio(opening_response, session['ai_theme'], session['debate_id'])
+    
+    record_turn('ai', opening_response, source=source)
     
     return jsonify({
         'success': True,
         'ai_response': opening_response,
         'debate_id': session['debate_id'],
-        'theme': session['ai_theme']
+        'theme': session['ai_theme'],
+        'audio': audio
     })
 
 @app.route('/submit_argument', methods=['POST'])
+@cancellable
 def submit_argument():
-    data = request.json
+    data = request.json or {}
     user_argument = data.get('argument', '').strip()
     
     if not user_argument:
         return jsonify({'error': 'No argument provided'}), 400
     
-    session['debate_history'].append({
-        'speaker': 'user',
-        'message': user_argument,
-        'timestamp': datetime.now().isoformat()
-    })
+    cancel = request_cancel_token()
     
-    ai_response = debate_engine.generate_response(
-        user_argument=user_argument,
-        topic=session['debate_topic'],
-        user_side=session['user_side'],
-        theme=session['ai_theme'],
-        debate_history=session['debate_history']
-    )
+    debate_id = session.get('debate_id')
+    realtime = REALTIME_SPECULATION_ENABLED and bool(data.get('realtime'))
     
-    session['debate_history'].append({
-        'speaker': 'ai',
-        'message': ai_response,
-        'timestamp': datetime.now().isoformat()
-    })
+    def respond():
+        # Only the first of a set of duplicates records the turn, and only once the reply
+        # exists, so a cancelled call leaves no half-recorded turn behind
+        with turn_locks.hold(debate_id, cancel=cancel):
+            if turn_locks.mode != 'off':
+                # Build on the turns that ran while this one waited, not the session as the request read it
+                app.session_interface.refresh(session._get_current_object())
+                if session.get('debate_id') != debate_id:
+                    raise TurnConflict("The debate was reset or restarted", 'restarted')
+            
+            submitted_at = datetime.now()
+            history = session_history()
+            
+            speculated = speculative_replies.take(debate_id, len(history), user_argument) if realtime else None
+            if speculated is not None:
+                print("⚡ Using the rebuttal speculated from the partial transcript")
+                ai_response = speculated['reply']
+                source = speculated.get('source', 'generated')
+                # Mock fallbacks and reused rebuttals must not go (back) into the reuse index
+                if speculated.get('source') == 'generated':
+                    debate_engine.remember_rebuttal(
+                        session['debate_topic'], session['user_side'], session['ai_theme'], user_argument, ai_response
+                    )
+            else:
+                ai_response = debate_engine.generate_response(
+                    user_argument=user_argument,
+                    topic=session['debate_topic'],
+                    user_side=session['user_side'],
+                    theme=session['ai_theme'],
+                    debate_history=history.turns + [Turn(USER, user_argument, submitted_at.timestamp())],
+                    cancel=cancel
+                )
+                source = debate_engine.last_rebuttal_source()
+            
+            record_turn('user', user_argument, at=submitted_at)
+            record_turn('ai', ai_response, source=source)
+            if turn_locks.mode != 'off':
+                app.session_interface.persist(session._get_current_object())
+        
+        return {
+            'ai_response': ai_response,
+            'theme': session['ai_theme'],
+            'audio': speculative_audio(ai_response, session['ai_theme'], session['debate_id'])
+        }
+    
+    key = submission_key(data, user_argument)
+    while True:
+        try:
+            result, outcome = submissions.run(key, respond, cancel=cancel)
+            break
+        except TurnConflict as e:
+            return jsonify({'error': str(e), 'conflict': e.reason}), 409
+        except Cancelled:
+            if cancel.is_set():
+                raise
+            # The request this one was coalesced with was cancelled (its client left); take over
+            print("🔁 Original submission was cancelled, retrying as a new call")
+    if outcome != 'new':
+        print(f"🔁 Duplicate submission {outcome} with the original request")
+    
+    return jsonify(dict(result, success=True, duplicate=outcome != 'new'))
+
+def speculation_payload(history):
+    return {
+        'topic': session['debate_topic'],
+        'user_side': session['user_side'],
+        'theme': session['ai_theme'],
+        'debate_history': history.encode()
+    }
+
+@app.route('/realtime/partial', methods=['POST'])
+def realtime_partial():
+    """A partial transcript of the argument the user is still speaking"""
+    if not REALTIME_SPECULATION_ENABLED:
+        return jsonify({'status': 'disabled'})
+    text = (request.json or {}).get('text', '').strip()
+    if not session.get('debate_id'):
+        return jsonify({'error': 'No debate in progress'}), 400
+    
+    history = session_history()
+    return jsonify(speculative_replies.partial(session['debate_id'], len(history), text, speculation_payload(history)))
+
+@app.route('/analyze_argument', methods=['POST'])
+@cancellable
+def analyze_argument():
+    data = request.json or {}
+    argument = data.get('argument', '').strip()
+    theme = data.get('theme') or session.get('ai_theme', 'teacher')
+    
+    if not argument:
+        return jsonify({'error': 'No argument provided'}), 400
+    
+    if data.get('async'):
+        return accepted(job_queue.submit(
+            'analysis', {'argument': argument, 'theme': theme}, tag=session.get('debate_id')
+        ))
+    
+    if not data.get('stream', True):
+        return jsonify({
+            'success': True,
+            'feedback': debate_engine.analyze_argument(argument, theme, cancel=request_cancel_token())
+        })
+    
+    def generate():
+        for event, payload in debate_engine.analyze_argument_stream(argument, theme, cancel=request_cancel_token()):
+            if event == 'field':
+                key, value = payload
+                yield json.dumps({'field': key, 'value': value}) + "\n"
+            else:
+                yield json.dumps({
+                    'done': True,
+                    'feedback': payload,
+                    'fallback': event == 'fallback'
+                }) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/analyze_batch', methods=['POST'])
+@cancellable
+def analyze_batch():
+    data = request.json or {}
+    if not isinstance(data.get('arguments', []), list):
+        return jsonify({'error': 'arguments must be a list'}), 400
+    arguments = [a.strip() for a in data.get('arguments', []) if isinstance(a, str) and a.strip()]
+    theme = data.get('theme') or session.get('ai_theme', 'teacher')
+    mode = data.get('mode', 'packed')
+    try:
+        pack_size = int(data.get('pack_size', 10))
+        max_workers = int(data.get('max_workers', 4))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'pack_size and max_workers must be integers'}), 400
+    
+    if not 1 <= pack_size <= MAX_BATCH_PACK_SIZE:
+        return jsonify({'error': f'pack_size must be between 1 and {MAX_BATCH_PACK_SIZE}'}), 400
+    if not 1 <= max_workers <= MAX_BATCH_WORKERS:
+        return jsonify({'error': f'max_workers must be between 1 and {MAX_BATCH_WORKERS}'}), 400
+    if not arguments:
+        return jsonify({'error': 'No arguments provided'}), 400
+    if len(arguments) > MAX_BATCH_ARGUMENTS:
+        return jsonify({'error': f'At most {MAX_BATCH_ARGUMENTS} arguments per batch'}), 400
+    if mode not in ('packed', 'concurrent'):
+        return jsonify({'error': f'Unknown batch mode: {mode}'}), 400
+    
+    results = debate_engine.analyze_arguments(
+        arguments,
+        theme,
+        mode=mode,
+        pack_size=pack_size,
+        max_workers=max_workers,
+        cancel=request_cancel_token()
+    )
     
     return jsonify({
         'success': True,
-        'ai_response': ai_response,
-        'theme': session['ai_theme']
+        'results': [{'argument': a, 'feedback': f} for a, f in zip(arguments, results)]
+    })
+
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'analysis': debate_engine.get_analysis_stats(),
+        'analysis_cache': debate_engine.analysis_cache.stats(),
+        'usage': debate_engine.get_usage_stats(),
+        'generation': debate_engine.get_generation_stats(),
+        'models': debate_engine.get_model_stats(),
+        'provider_tape': tape.stats() if tape is not None else {'mode': None},
+        'jobs': job_queue.stats(),
+        'speculative_tts': dict(speculative_tts.stats, enabled=speculative_tts_enabled()),
+        'realtime_speculation': dict(speculative_replies.stats(), enabled=REALTIME_SPECULATION_ENABLED),
+        'audio_pipeline': audio_normalizer.stats(),
+        'audio_serving': audio_files.stats(),
+        'recordings': recording_uploads.stats(),
+        'local_stt': local_stt.stats() if local_stt is not None else {'backend': None},
+        'transcription': voice_manager.transcription.stats() if hasattr(voice_manager, 'transcription') else {},
+        'opening_pool': dict(opening_pool.stats(OPENING_KEYS), enabled=OPENING_POOL_ENABLED),
+        'transcripts': transcripts.stats(),
+        'rebuttal_reuse': rebuttal_index.stats() if rebuttal_index is not None else {'enabled': False},
+        'submissions': submissions.stats(),
+        'turn_order': turn_locks.stats(),
+        'sessions': app.session_interface.stats(),
+        'cancellation': dict(cancellations.stats(),
+                             disconnects=disconnect_watcher.disconnects if disconnect_watcher is not None else None)
     })
 
 @app.route('/transcribe_audio', methods=['POST'])
+@cancellable
 def transcribe_audio():
     try:
         audio_file = request.files.get('audio')
         if not audio_file:
             return jsonify({'error': 'No audio file provided'}), 400
         
-        temp_path = f"temp_audio_{session.get('debate_id', 'unknown')}.wav"
-        audio_file.save(temp_path)
+        temp_path = save_upload(audio_file, 'audio')
         
-        print(f"🔄 Starting transcription of {temp_path}")
+        if request.args.get('async') or request.form.get('async'):
+            return accepted(job_queue.submit('transcription', {'path': temp_path}, tag=session.get('debate_id')))
         
-        transcription = voice_manager.transcribe_audio(temp_path)
+        print(f"🔄 Starting transcription of {temp_path}")
         
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        transcription = _transcription_job({'path': temp_path})['transcription']
         
         print(f"✅ Transcription result: {transcription[:100]}...")
         
@@ -149,6 +771,87 @@ def transcribe_audio():
         print(f"❌ Transcription endpoint error: {e}")
         return jsonify({'error': f'Transcription failed: {str(e)}'}), 500
 
+@app.route('/recordings', methods=['POST'])
+def create_recording():
+    data = request.json or {}
+    recording_uploads.purge_stale()
+    meta = recording_uploads.create(session.get('debate_id', 'unknown'), data.get('mime_type', ''))
+    
+    if STREAMING_UPLOAD_ENABLED:
+        recording_uploads.update(meta['id'], streaming_upload=True)
+        threading.Thread(target=_stream_recording_upload, args=(meta['id'],), daemon=True).start()
+    
+    return jsonify({'success': True, 'recording_id': meta['id'], 'next_index': 0})
+
+@app.route('/recordings/<recording_id>', methods=['GET'])
+def recording_status(recording_id):
+    try:
+        meta = recording_uploads.status(recording_id)
+    except KeyError:
+        return jsonify({'error': 'Unknown recording'}), 404
+    return jsonify({'success': True, 'next_index': meta['next_index'], 'bytes': meta['bytes'],
+                    'finished': meta['finished']})
+
+@app.route('/recordings/<recording_id>/chunks/<int:index>', methods=['PUT'])
+def upload_recording_chunk(recording_id, index):
+    try:
+        meta = recording_uploads.append(recording_id, index, request.get_data())
+    except KeyError:
+        return jsonify({'error': 'Unknown recording'}), 404
+    
+    if meta.get('too_large'):
+        return jsonify({'error': 'Recording too large', 'bytes': meta['bytes'],
+                        'max_bytes': recording_uploads.max_bytes}), 413
+    if not meta['accepted']:
+        return jsonify({'error': 'Out of order chunk', 'next_index': meta['next_index']}), 409
+    return jsonify({'success': True, 'next_index': meta['next_index'], 'bytes': meta['bytes']})
+
+@app.route('/recordings/<recording_id>/finish', methods=['POST'])
+@cancellable
+def finish_recording(recording_id):
+    data = request.json or {}
+    started = time.time()
+    try:
+        meta = recording_uploads.finish(recording_id, data.get('total_chunks'))
+    except KeyError:
+        return jsonify({'error': 'Unknown recording'}), 404
+    
+    if not meta['finished']:
+        return jsonify({'error': 'Missing chunks', 'next_index': meta['next_index']}), 409
+    
+    transcription = None
+    streamed = False
+    try:
+        if meta['streaming_upload']:
+            # The upload has been running since the first chunk; it ends once the stream is sealed
+            deadline = time.time() + 60
+            while not meta['upload_url'] and time.time() < deadline:
+                time.sleep(0.05)
+                meta = recording_uploads.status(recording_id)
+            if meta['upload_url'] and not meta['upload_url'].startswith('❌'):
+                cancel = request_cancel_token()
+                transcription = voice_manager.transcribe_upload_url(meta['upload_url'], cancel)
+                cancel.raise_if_cancelled()
+                streamed = not transcription.startswith('❌')
+        
+        if not streamed:
+            source = recording_uploads.data_path(recording_id)
+            temp_path = os.path.join('temp', f"recording_{recording_id}{EXTENSIONS[sniff_file(source)]}")
+            os.replace(source, temp_path)
+            transcription = _transcription_job({'path': temp_path})['transcription']
+    finally:
+        recording_uploads.remove(recording_id)
+    
+    elapsed = time.time() - started
+    recording_uploads.record_transcript(elapsed, streamed)
+    print(f"✅ Recording transcribed {elapsed:.2f}s after release (streamed upload: {streamed})")
+    
+    return jsonify({
+        'success': True,
+        'transcription': transcription,
+        'timings': {'finish_to_transcript': elapsed, 'streamed_upload': streamed}
+    })
+
 @app.route('/text_to_speech', methods=['POST'])
 def text_to_speech():
     try:
@@ -159,11 +862,18 @@ def text_to_speech():
         if not text:
             return jsonify({'error': 'No text provided'}), 400
         
-        audio_path = voice_manager.text_to_speech(
-            text, 
-            session.get('debate_id', 'unknown'),
-            theme
-        )
+        payload = {'text': text, 'debate_id': session.get('debate_id', 'unknown'), 'theme': theme}
+        
+        if data.get('async'):
+            return accepted(job_queue.submit('tts', payload, tag=payload['debate_id']))
+        
+        audio_path = speculative_tts.result(text, theme) if speculative_tts_enabled() else None
+        if not audio_path:
+            audio_path = voice_manager.text_to_speech(
+                text, 
+                payload['debate_id'],
+                theme
+            )
         
         return jsonify({
             'success': True,
@@ -173,18 +883,148 @@ def text_to_speech():
     except Exception as e:
         return jsonify({'error': f'TTS failed: {str(e)}'}), 500
 
+@app.route('/summarize_debate', methods=['POST'])
+def summarize_debate():
+    if not len(session_history()):
+        return jsonify({'error': 'No debate in progress'}), 400
+    
+    return accepted(job_queue.submit('summary', {
+        'topic': session['debate_topic'],
+        'user_side': session['user_side'],
+        'theme': session['ai_theme'],
+        'debate_id': session['debate_id'],
+        'debate_history': session['debate_history']
+    }, tag=session.get('debate_id')))
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    def generate():
+        last_status = None
+        while True:
+            job = job_queue.wait(job_id, timeout=15)
+            if job is None:
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+            if job['status'] in FINISHED_STATES:
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @app.route('/get_debate_history')
 def get_debate_history():
     return jsonify({
-        'history': session.get('debate_history', []),
+        'history': [turn.to_dict() for turn in session_history().all(transcripts, session.get('debate_id'))],
         'topic': session.get('debate_topic', ''),
         'user_side': session.get('user_side', ''),
         'theme': session.get('ai_theme', '')
     })
 
+def debate_filters():
+    """Filters for /debates from the query string; user=me means this browser's debates"""
+    user_id = request.args.get('user')
+    if user_id == 'me':
+        user_id = session.get('user_id', '')
+    filters = {
+        'user_id': user_id,
+        'topic': request.args.get('topic'),
+        'theme': request.args.get('theme')
+    }
+    for name in ('since', 'until'):
+        if request.args.get(name):
+            filters[name] = datetime.fromisoformat(request.args[name]).timestamp()
+    return filters
+
+@app.route('/debates')
+def list_debates():
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE)
+        debates, next_cursor = transcripts.list_debates(
+            limit=limit, cursor=request.args.get('cursor'), **debate_filters()
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'debates': debates, 'next_cursor': next_cursor})
+
+@app.route('/debates/export')
+def export_debates():
+    """All matching debates with full history as NDJSON, streamed"""
+    try:
+        filters = debate_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        for debate in transcripts.export(**filters):
+            yield json.dumps(debate) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/search')
+def search_messages():
+    """Ranked full-text search over every stored turn"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), MAX_PAGE_SIZE)
+        offset = min(int(request.args.get('offset', 0)), MAX_SEARCH_OFFSET)
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    try:
+        filters = debate_filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    found = transcripts.search(query, limit=limit, offset=offset, speaker=request.args.get('speaker'), **filters)
+    return jsonify(dict(found, query=query))
+
+@app.route('/debates/<debate_id>')
+def get_debate(debate_id):
+    debate = transcripts.get_debate(debate_id)
+    if debate is None:
+        return jsonify({'error': 'Unknown debate'}), 404
+    try:
+        after = int(request.args.get('after', 0))
+        limit = min(int(request.args.get('limit', 200)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'after and limit must be integers'}), 400
+    messages, next_after = transcripts.get_messages(debate_id, after, limit)
+    return jsonify(dict(debate, history=messages, next_after=next_after))
+
+@app.route('/cancel', methods=['POST'])
+def cancel_in_flight():
+    """Sent as a beacon when the page is closed: stop that tab's in-flight requests (by X-Request-Id)"""
+    request_ids = (request.get_json(force=True, silent=True) or {}).get('request_ids') or []
+    if not isinstance(request_ids, list):
+        return jsonify({'error': 'request_ids must be a list'}), 400
+    cancelled = cancellations.cancel_requests([str(request_id) for request_id in request_ids], 'client_left')
+    if cancelled:
+        print(f"🛑 Cancelled {cancelled} in-flight requests of a closed page")
+    return jsonify({'success': True, 'cancelled': cancelled})
+
 @app.route('/reset_debate', methods=['POST'])
 def reset_debate():
+    cancel_debate(session.get('debate_id'), 'reset')
+    # The debate itself stays in the transcript store; keep the user id so it can be found
+    user_id = session.get('user_id')
     session.clear()
+    if user_id:
+        session['user_id'] = user_id
     return jsonify({'success': True})
 
 def create_self_signed_cert():
@@ -0,0 +1,83 @@
+"""
+Upload size reduction and CPU cost per recorded second of the audio pipeline.
+
+Synthesizes speech-like 48 kHz stereo recordings (and a WebM/Opus copy
+when ffmpeg is installed, matching MediaRecorder output), then normalizes
+each to 16 kHz mono in every available output format.
+
+    python benchmarks/bench_audio_pipeline.py [--seconds 30,300]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_pipeline import SOUNDFILE_AVAILABLE, AudioNormalizer, ffmpeg_available
+
+
+def synthesize_recording(path, seconds, rate=48000):
+    """Voiced harmonics with a syllable-rate envelope plus room noise"""
+    rng = np.random.default_rng(0)
+    with wave.open(path, 'wb') as writer:
+        writer.setnchannels(2)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        for start in range(0, seconds * rate, rate):
+            t = np.arange(start, start + rate) / rate
+            pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+            phase = 2 * np.pi * np.cumsum(pitch) / rate
+            voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+            mono = 0.2 * voice * envelope + 0.01 * rng.standard_normal(rate)
+            stereo = np.stack((mono, 0.9 * mono), axis=1)
+            writer.writeframes((np.clip(stereo, -1, 1) * 32767).astype('<i2').tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', default='30,300')
+    args = parser.parse_args()
+
+    formats = ['wav'] + (['flac'] if SOUNDFILE_AVAILABLE else []) + (['opus'] if ffmpeg_available() else [])
+    workdir = tempfile.mkdtemp(prefix='audio_bench_')
+    normalizer = AudioNormalizer()
+
+    print(f"formats={formats} ffmpeg={ffmpeg_available()}")
+    print(f"{'input':<16} {'secs':>5} {'out':<5} {'in KB':>9} {'out KB':>9} {'reduction':>9} "
+          f"{'ms CPU/s':>9} {'peak MB':>8}")
+
+    for seconds in [int(s) for s in args.seconds.split(',')]:
+        sources = []
+        wav_path = os.path.join(workdir, f'rec_{seconds}.wav')
+        synthesize_recording(wav_path, seconds)
+        sources.append(('wav 48k stereo', wav_path))
+
+        if ffmpeg_available():
+            webm_path = os.path.join(workdir, f'rec_{seconds}.webm')
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-i', wav_path, '-c:a', 'libopus',
+                            '-b:a', '128k', webm_path], check=True)
+            sources.append(('webm/opus 128k', webm_path))
+
+        for label, source in sources:
+            for fmt in formats:
+                tracemalloc.start()
+                result = normalizer.normalize(source, fmt=fmt, dst_path=os.path.join(workdir, f'out.{fmt}'))
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+                if result is None:
+                    continue
+                print(f"{label:<16} {seconds:>5} {fmt:<5} {result['input_bytes'] / 1024:>9.0f} "
+                      f"{result['output_bytes'] / 1024:>9.0f} "
+                      f"{(1 - result['output_bytes'] / result['input_bytes']) * 100:>8.1f}% "
+                      f"{result['cpu_per_audio_second'] * 1000:>9.2f} {peak:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
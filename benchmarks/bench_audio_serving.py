@@ -0,0 +1,160 @@
+"""
+Audio playback load: /audio (ETags, ranges, immutable caching, sendfile) against Flask's /static handler.
+
+Writes a set of reply-sized WAV files into static/audio, starts serve.py
+and has concurrent clients play them the way a browser does: a full fetch,
+a seek (Range request) and replays. On /static a replay downloads the
+file again, as the old client's per-click `new Audio()` did; on /audio
+the file is immutable, so a replay never leaves the browser cache.
+
+    python benchmarks/bench_audio_serving.py [--clients 32] [--seconds 10] [--files 50] [--kb 400] [--replays 3]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_DIR = os.path.join(ROOT, 'static', 'audio')
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url + '/voice_status', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def write_files(count, kb):
+    names = []
+    for _ in range(count):
+        # Content-addressed names like voice_python313 writes, so /audio marks them immutable
+        name = f"ai_response_{random.getrandbits(80):020x}.wav"
+        with open(os.path.join(AUDIO_DIR, name), 'wb') as f:
+            f.write(b'RIFF' + os.urandom(kb * 1024 - 4))
+        names.append(name)
+    return names
+
+
+def play(client, url, prefix, names, replays, stats):
+    """One playback session: play, seek, replay"""
+    name = random.choice(names)
+    path = f"{url}{prefix}{name}"
+
+    started = time.perf_counter()
+    response = client.get(path)
+    stats['latency'].append(time.perf_counter() - started)
+    stats['bytes'] += len(response.content)
+    stats['requests'] += 1
+    immutable = 'immutable' in response.headers.get('Cache-Control', '')
+
+    # Seek to the middle
+    size = len(response.content)
+    started = time.perf_counter()
+    response = client.get(path, headers={'Range': f'bytes={size // 2}-{size // 2 + 65535}'})
+    stats['range_latency'].append(time.perf_counter() - started)
+    stats['bytes'] += len(response.content)
+    stats['requests'] += 1
+    stats['errors'] += response.status_code != 206
+
+    for _ in range(replays):
+        if immutable:
+            continue
+        started = time.perf_counter()
+        response = client.get(path)
+        stats['replay_latency'].append(time.perf_counter() - started)
+        stats['bytes'] += len(response.content)
+        stats['requests'] += 1
+
+
+def run(url, prefix, names, clients, seconds, replays):
+    stats = {'latency': [], 'range_latency': [], 'replay_latency': [], 'bytes': 0, 'requests': 0,
+             'errors': 0, 'sessions': 0}
+    lock = threading.Lock()
+
+    def drive():
+        client = requests.Session()
+        local = {'latency': [], 'range_latency': [], 'replay_latency': [], 'bytes': 0, 'requests': 0,
+                 'errors': 0, 'sessions': 0}
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            play(client, url, prefix, names, replays, local)
+            local['sessions'] += 1
+        with lock:
+            for key, value in local.items():
+                stats[key] += value
+
+    threads = [threading.Thread(target=drive) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+
+def ms(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--kb', type=int, default=400, help="file size; a 12 s reply at 16 kHz mono is ~400 KB")
+    parser.add_argument('--replays', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5078)
+    args = parser.parse_args()
+
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    names = write_files(args.files, args.kb)
+    url = f'http://127.0.0.1:{args.port}'
+    env = dict(os.environ, DEBATE_DATA_DIR=tempfile.mkdtemp(prefix='audio_bench_'), STARTUP_WARMUP='0',
+               OPENING_POOL='0', REBUTTAL_REUSE='0')
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--http', '--workers', str(args.workers), '--threads', str(args.threads),
+         '--bind', f'127.0.0.1:{args.port}'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_up(url):
+            sys.exit("❌ server did not start")
+        print(f"clients={args.clients} files={args.files}x{args.kb} KB replays={args.replays} "
+              f"workers={args.workers}x{args.threads}")
+        print(f"{'endpoint':<15} {'sessions/s':>10} {'MB/s':>7} {'req/sess':>8} {'MB/sess':>8} "
+              f"{'p50 ms':>7} {'p95 ms':>7} {'range p95':>9} {'replay p95':>10} {'errors':>6}")
+        for prefix in ('/static/audio/', '/audio/'):
+            stats = run(url, prefix, names, args.clients, args.seconds, args.replays)
+            sessions = max(stats['sessions'], 1)
+            print(f"{prefix:<15} {stats['sessions'] / stats['elapsed']:>10.1f} "
+                  f"{stats['bytes'] / stats['elapsed'] / 1e6:>7.1f} {stats['requests'] / sessions:>8.1f} "
+                  f"{stats['bytes'] / sessions / 1e6:>8.2f} {ms(stats['latency'], 0.5):>7.1f} "
+                  f"{ms(stats['latency'], 0.95):>7.1f} {ms(stats['range_latency'], 0.95):>9.1f} "
+                  f"{ms(stats['replay_latency'], 0.95):>10.1f} {stats['errors']:>6}")
+        print("\np50/p95 are first plays; replays on /audio come from the browser cache and send no request")
+    finally:
+        server.terminate()
+        server.wait()
+        for name in names:
+            os.remove(os.path.join(AUDIO_DIR, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Batch analysis speedup over sequential analyze_argument calls.
+
+    python benchmarks/bench_batch_analysis.py [--round-trip 0.25] [--sizes 10,50,200]
+"""
+import argparse
+import time
+
+from mock_llm import mock_engine
+
+
+def run(label, fn):
+    start = time.perf_counter()
+    fn()
+    return label, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--round-trip', type=float, default=0.25)
+    parser.add_argument('--per-token', type=float, default=0.001)
+    parser.add_argument('--sizes', default='10,50,200')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'n':>5} {'mode':<12} {'seconds':>9} {'calls':>6} {'speedup':>8}")
+    for n in [int(size) for size in args.sizes.split(',')]:
+        arguments = [f"Argument {i}: remote work improves productivity because of reason {i}." for i in range(n)]
+
+        baseline = None
+        for mode in ('sequential', 'concurrent', 'packed'):
+            engine, llm = mock_engine(round_trip=args.round_trip, per_token=args.per_token)
+            if mode == 'sequential':
+                job = lambda: [engine.analyze_argument(a, 'teacher') for a in arguments]
+            else:
+                job = lambda: engine.analyze_arguments(arguments, 'teacher', mode=mode, max_workers=args.workers)
+
+            _, elapsed = run(mode, job)
+            baseline = baseline or elapsed
+            print(f"{n:>5} {mode:<12} {elapsed:>9.2f} {llm.calls:>6} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
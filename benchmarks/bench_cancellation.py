@@ -0,0 +1,139 @@
+"""
+Worker-seconds spent on abandoned requests, with and without cancellation.
+
+Runs the app in-process on a threaded Werkzeug server against a slow mock
+Groq endpoint. Each client starts a debate, then keeps submitting
+arguments; a --churn fraction of submissions is abandoned after a random
+delay (the client times out and drops the connection, like a closed tab).
+A WSGI middleware sums the time every request held its worker thread.
+With cancellation off, an abandoned request still waits out the full LLM
+call; with it on, the disconnect watcher aborts it.
+
+    python benchmarks/bench_cancellation.py [--clients 16] [--seconds 20] [--churn 0.5] [--llm-latency 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from mock_llm import start_mock_groq_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BusyTime:
+    """WSGI middleware: total seconds requests spent in the app, by path"""
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.seconds = {}
+        self.active = 0
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        with self.lock:
+            self.active += 1
+        try:
+            return list(self.app(environ, start_response))
+        finally:
+            with self.lock:
+                path = environ.get('PATH_INFO')
+                self.seconds[path] = self.seconds.get(path, 0.0) + time.perf_counter() - start
+                self.active -= 1
+
+
+def drive(url, seconds, churn, latency, rng, results):
+    results.update({'completed': 0, 'abandoned': 0, 'errors': 0})
+    client = requests.Session()
+    client.post(url + '/start_debate', json={
+        'topic': 'Remote work is better than office work', 'side': 'FOR', 'theme': 'objective'
+    }, timeout=60)
+    deadline = time.time() + seconds
+    turn = 0
+    while time.time() < deadline:
+        turn += 1
+        abandon = rng.random() < churn
+        try:
+            response = client.post(url + '/submit_argument', json={
+                'argument': f'Commuting wastes hours every week, point {turn}'
+            }, timeout=rng.uniform(0.2, latency * 0.6) if abandon else 60)
+            results['completed' if response.status_code == 200 else 'errors'] += 1
+        except requests.Timeout:
+            results['abandoned'] += 1
+        except requests.RequestException:
+            results['errors'] += 1
+
+
+def run(app_module, url, busy, args, cancel):
+    app_module.disconnect_watcher = app_module.DisconnectWatcher() if cancel else None
+    busy.seconds.clear()
+    rng = random.Random(0)
+    per_client = [{} for _ in range(args.clients)]
+    threads = [threading.Thread(target=drive, args=(url, args.seconds, args.churn, args.llm_latency,
+                                                    random.Random(rng.random()), results))
+               for results in per_client]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Abandoned requests may still hold a thread; count them once they let go
+    while busy.active:
+        time.sleep(0.1)
+    results = {key: sum(client[key] for client in per_client) for key in per_client[0]}
+    return results, busy.seconds.get('/submit_argument', 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--churn', type=float, default=0.5, help="fraction of submissions abandoned")
+    parser.add_argument('--llm-latency', type=float, default=3.0)
+    args = parser.parse_args()
+
+    mock = start_mock_groq_server(latency=args.llm_latency)
+    os.environ.update({
+        'GROQ_API_KEY': 'mock',
+        'GROQ_API_URL': f'http://127.0.0.1:{mock.server_port}/chat/completions',
+        'DEBATE_DATA_DIR': tempfile.mkdtemp(prefix='cancel_bench_'),
+        'SPECULATIVE_TTS': '0',
+        'OPENING_POOL_DEPTH': '0',
+        'REBUTTAL_REUSE': '0'
+    })
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    busy = BusyTime(app_module.app.wsgi_app)
+    app_module.app.wsgi_app = busy
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    print(f"clients={args.clients} seconds={args.seconds} churn={args.churn} llm_latency={args.llm_latency}s")
+    print(f"{'cancellation':>12} {'completed':>9} {'abandoned':>9} {'worker-s':>9} {'worker-s/turn':>13} "
+          f"{'turns/s':>8}")
+    measured = {}
+    for cancel in (False, True):
+        results, worker_seconds = run(app_module, url, busy, args, cancel)
+        measured[cancel] = worker_seconds
+        print(f"{'on' if cancel else 'off':>12} {results['completed']:>9} {results['abandoned']:>9} "
+              f"{worker_seconds:>9.1f} {worker_seconds / max(results['completed'], 1):>13.2f} "
+              f"{results['completed'] / args.seconds:>8.2f}")
+
+    reclaimed = measured[False] - measured[True]
+    print(f"\nworker-seconds reclaimed: {reclaimed:.1f} ({reclaimed / measured[False]:.0%})")
+    print(f"cancellation stats: {app_module.cancellations.stats()}")
+    server.shutdown()
+    mock.shutdown()
+
+
+if __name__ == '__main__':
+    main()
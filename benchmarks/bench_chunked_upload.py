@@ -0,0 +1,75 @@
+"""
+Release-of-button to transcript: one upload after recording vs chunked upload.
+
+A simulated MediaRecorder emits one chunk per second. The provider upload
+consumes bytes at the uplink bandwidth and the transcript takes a fixed
+time once the upload completes. The chunked path streams
+RecordingUploads.stream() to the provider while recording continues.
+
+    python benchmarks/bench_chunked_upload.py [--seconds 10,30,60] [--kbps 256] [--uplink-kbps 512]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunked_upload import RecordingUploads
+
+
+def upload(chunks, uplink_bytes_per_second):
+    for chunk in chunks:
+        time.sleep(len(chunk) / uplink_bytes_per_second)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', default='10,30,60')
+    parser.add_argument('--kbps', type=float, default=128, help='recording bitrate')
+    parser.add_argument('--uplink-kbps', type=float, default=512)
+    parser.add_argument('--transcribe', type=float, default=1.5, help='provider time after upload (s)')
+    parser.add_argument('--speedup', type=float, default=10, help='simulate N seconds of recording per second')
+    args = parser.parse_args()
+
+    chunk_bytes = int(args.kbps * 1000 / 8)
+    uplink = args.uplink_kbps * 1000 / 8 * args.speedup
+    tick = 1 / args.speedup
+
+    print(f"bitrate={args.kbps} kbps uplink={args.uplink_kbps} kbps transcribe={args.transcribe}s "
+          f"(time compressed {args.speedup}x, results scaled back)")
+    print(f"{'seconds':>8} {'single (s)':>11} {'chunked (s)':>12} {'saved':>7}")
+
+    for seconds in [int(s) for s in args.seconds.split(',')]:
+        # Single upload: nothing moves until release
+        released = time.perf_counter()
+        upload([b'x' * chunk_bytes] * seconds, uplink)
+        time.sleep(args.transcribe / args.speedup)
+        single = (time.perf_counter() - released) * args.speedup
+
+        directory = tempfile.mkdtemp(prefix='chunk_bench_')
+        uploads = RecordingUploads(directory)
+        recording_id = uploads.create('bench')['id']
+        uploader = threading.Thread(
+            target=upload, args=(uploads.stream(recording_id, poll_interval=tick / 10), uplink)
+        )
+        uploader.start()
+        for index in range(seconds):
+            time.sleep(tick)
+            uploads.append(recording_id, index, b'x' * chunk_bytes)
+
+        released = time.perf_counter()
+        uploads.finish(recording_id, seconds)
+        uploader.join()
+        time.sleep(args.transcribe / args.speedup)
+        chunked = (time.perf_counter() - released) * args.speedup
+        shutil.rmtree(directory)
+
+        print(f"{seconds:>8} {single:>11.2f} {chunked:>12.2f} {(1 - chunked / single) * 100:>6.1f}%")
+
+
+if __name__ == '__main__':
+    main()
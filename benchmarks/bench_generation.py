@@ -0,0 +1,89 @@
+"""
+Output tokens and latency per spoken reply, with and without length control.
+
+A local mock Groq endpoint answers every plain-text prompt with a long,
+rambling reply (--reply-words, one word every --per-word seconds, capped
+by the request's max_tokens), the way a model ignores "keep it under 200
+words". Compared:
+
+    fixed     the old settings: max_tokens 1000 for every task, whole reply kept
+    budget    per-task max_tokens from utils.generation, reply trimmed to the word budget
+    stream    budget plus streaming, stopping at the word budget (the default)
+
+    python benchmarks/bench_generation.py [--calls 24] [--reply-words 400] [--per-word 0.004]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from mock_llm import start_mock_groq_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from debate_engine import DebateEngine
+from utils.generation import word_count
+
+TOPIC = 'Remote work is better than office work'
+HISTORY = [{'speaker': 'ai', 'message': 'Offices build culture.'},
+           {'speaker': 'user', 'message': 'Commuting wastes hours every week.'}]
+
+
+def make_engine(mode):
+    engine = DebateEngine({'GROQ_API_KEY': 'mock'})
+    engine.stream_generation = mode == 'stream'
+    if mode == 'fixed':
+        fixed = {'max_tokens': 1000, 'temperature': 0.8}
+        engine._get_ai_response = lambda prompt, use_groq=True, json_mode=False, cancel=None, **kwargs: \
+            engine._call_providers(prompt, use_groq, json_mode, cancel, fixed)
+    return engine
+
+
+def run(mode, calls, themes):
+    engine = make_engine(mode)
+    seconds, words = [], []
+    for i in range(calls):
+        theme = themes[i % len(themes)]
+        start = time.perf_counter()
+        if i % 2:
+            reply = engine.generate_opening(TOPIC, 'FOR', theme)
+        else:
+            reply = engine.generate_response(f'Point {i}: commuting wastes hours', TOPIC, 'FOR', theme, HISTORY)
+        seconds.append(time.perf_counter() - start)
+        words.append(word_count(reply))
+    usage = engine.get_usage_stats().get('groq', {})
+    return {
+        'p50': statistics.median(seconds),
+        'p95': sorted(seconds)[int(len(seconds) * 0.95) - 1],
+        'words': statistics.mean(words),
+        'max_words': max(words),
+        'output_tokens': usage.get('completion_tokens', 0) / calls,
+        'stats': engine.get_generation_stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=24)
+    parser.add_argument('--reply-words', type=int, default=400)
+    parser.add_argument('--per-word', type=float, default=0.004, help="seconds to generate one word")
+    parser.add_argument('--themes', default='objective,sassy,innocent,teacher')
+    args = parser.parse_args()
+
+    server = start_mock_groq_server(latency=0.05, reply_words=args.reply_words, per_word=args.per_word)
+    os.environ['GROQ_API_URL'] = f'http://127.0.0.1:{server.server_port}/chat/completions'
+    themes = args.themes.split(',')
+
+    print(f"calls={args.calls} reply_words={args.reply_words} per_word={args.per_word}s themes={args.themes}")
+    print(f"{'mode':>7} {'p50 s':>7} {'p95 s':>7} {'words':>6} {'max':>5} {'out tok':>8}")
+    for mode in ('fixed', 'budget', 'stream'):
+        result = run(mode, args.calls, themes)
+        print(f"{mode:>7} {result['p50']:>7.2f} {result['p95']:>7.2f} {result['words']:>6.0f} "
+              f"{result['max_words']:>5} {result['output_tokens']:>8.0f}")
+    print(f"\nper-task stats (stream): {result['stats']}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Memory held by debate state: the old dict-per-turn history against compact turns with a cap.
+
+Builds --debates sessions of --turns turns each and loads them all at
+once, the way they are decoded from the session store, then reports the
+traced heap, the part of it that is not message text, and the session
+row size. "dicts" is the old representation ({'speaker', 'message',
+'timestamp'} per turn, ISO timestamps, a fresh topic/theme string per
+session); "compact" is utils.turns with interned topic/theme, uncapped
+and at the default cap (older turns stay in the transcript store only).
+
+    python benchmarks/bench_history_memory.py [--debates 10000] [--turns 50] [--words 40]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.turns import DEFAULT_CAP, DebateHistory
+
+TOPICS = ['Remote work is better than office work', 'Social media does more harm than good',
+          'Nuclear power is the answer to climate change', 'Homework should be banned']
+THEMES = ['sassy', 'ruthless', 'sweet', 'innocent', 'bestie', 'flirty', 'objective', 'teacher', 'philosopher']
+WORDS = ['evidence', 'commute', 'productivity', 'culture', 'however', 'studies', 'clearly', 'because',
+         'people', 'argument', 'flawed', 'therefore', 'cost', 'time', 'value', 'real']
+
+
+def old_session(rng, turns, words):
+    started = time.time() - rng.random() * 86400
+    return json.dumps({
+        'debate_topic': rng.choice(TOPICS), 'user_side': rng.choice(['FOR', 'AGAINST']),
+        'ai_theme': rng.choice(THEMES), 'debate_id': f"{rng.getrandbits(64):016x}",
+        'debate_history': [{
+            'speaker': 'ai' if i % 2 == 0 else 'user',
+            'message': " ".join(rng.choice(WORDS) for _ in range(words)),
+            'timestamp': datetime.fromtimestamp(started + i * 30).isoformat()
+        } for i in range(turns)]
+    }, separators=(',', ':'))
+
+
+def load_dicts(rows):
+    return [json.loads(row) for row in rows]
+
+
+def load_compact(rows, cap):
+    sessions = []
+    for row in rows:
+        data = json.loads(row)
+        for key in ('debate_topic', 'user_side', 'ai_theme'):
+            data[key] = sys.intern(data[key])
+        data['debate_history'] = DebateHistory.decode(data['debate_history'], cap=cap)
+        sessions.append(data)
+    return sessions
+
+
+def message_bytes(sessions):
+    return sum(sys.getsizeof(turn['message']) for session in sessions for turn in session['debate_history'])
+
+
+def measure(name, load, rows, turns_total):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    sessions = load(rows)
+    seconds = time.perf_counter() - started
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    text = message_bytes(sessions)
+    print(f"{name:<16} {held / 1e6:>9.1f} {(held - text) / 1e6:>12.1f} {(held - text) / turns_total:>13.0f} "
+          f"{seconds:>8.2f}")
+    return sessions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--debates', type=int, default=10000)
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--words', type=int, default=40, help="words per message")
+    parser.add_argument('--cap', type=int, default=DEFAULT_CAP)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    old_rows = [old_session(rng, args.turns, args.words) for _ in range(args.debates)]
+    uncapped = load_compact(old_rows, cap=args.turns)
+    new_rows = [json.dumps(dict(session, debate_history=session['debate_history'].encode()), separators=(',', ':'))
+                for session in uncapped]
+    capped_rows = []
+    for session in uncapped:
+        history = DebateHistory(cap=args.cap)
+        for turn in session['debate_history']:
+            history.append(turn['speaker'], turn.message, turn.at)
+        capped_rows.append(json.dumps(dict(session, debate_history=history.encode()), separators=(',', ':')))
+    del uncapped
+    total_turns = args.debates * args.turns
+
+    print(f"{args.debates} debates x {args.turns} turns, {args.words} words per message")
+    print(f"{'representation':<16} {'heap MB':>9} {'non-text MB':>12} {'bytes/turn':>13} {'load s':>8}")
+    measure('dicts', load_dicts, old_rows, total_turns)
+    measure('compact', lambda rows: load_compact(rows, args.turns), new_rows, total_turns)
+    measure(f'compact cap {args.cap}', lambda rows: load_compact(rows, args.cap), capped_rows, total_turns)
+
+    print(f"\n{'session row':<16} {'avg bytes':>9}")
+    for name, rows in (('dicts', old_rows), ('compact', new_rows), (f'compact cap {args.cap}', capped_rows)):
+        print(f"{name:<16} {sum(len(row) for row in rows) / len(rows):>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
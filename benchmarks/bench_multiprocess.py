@@ -0,0 +1,111 @@
+"""
+Throughput scaling of serve.py from 1 to N worker processes.
+
+Starts a local mock Groq endpoint, then for each worker count launches
+serve.py against it and drives /start_debate + /submit_argument from
+concurrent clients, each with its own session cookie.
+
+    python benchmarks/bench_multiprocess.py [--workers 1,2,4] [--clients 16] [--seconds 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from mock_llm import start_mock_groq_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url + '/voice_status', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def drive(url, seconds, counts, errors):
+    client = requests.Session()
+    client.post(url + '/start_debate', json={
+        'topic': 'Remote work is better than office work', 'side': 'FOR', 'theme': 'objective'
+    }, timeout=30)
+    deadline = time.time() + seconds
+    turn = 0
+    while time.time() < deadline:
+        turn += 1
+        try:
+            response = client.post(url + '/submit_argument', json={
+                'argument': f'Commuting wastes hours every week, point {turn}'
+            }, timeout=30)
+            if response.status_code == 200:
+                counts.append(1)
+            else:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default=','.join(str(2 ** i) for i in range(os.cpu_count().bit_length())))
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--llm-latency', type=float, default=0.02)
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    mock = start_mock_groq_server(latency=args.llm_latency)
+    url = f'http://127.0.0.1:{args.port}'
+    print(f"cpus={os.cpu_count()} clients={args.clients} llm_latency={args.llm_latency}s")
+    print(f"{'workers':>8} {'req/s':>9} {'errors':>7} {'scaling':>8}")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        data_dir = tempfile.mkdtemp(prefix='debate_bench_')
+        env = dict(
+            os.environ,
+            GROQ_API_KEY='mock',
+            GROQ_API_URL=f'http://127.0.0.1:{mock.server_port}/chat/completions',
+            DEBATE_DATA_DIR=data_dir,
+            SPECULATIVE_TTS='0'
+        )
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--http', '--workers', str(workers), '--threads', '1',
+             '--bind', f'127.0.0.1:{args.port}'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_until_up(url):
+                print(f"{workers:>8} server did not start")
+                continue
+
+            counts, errors = [], []
+            threads = [threading.Thread(target=drive, args=(url, args.seconds, counts, errors))
+                       for _ in range(args.clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            throughput = len(counts) / (time.perf_counter() - start)
+
+            baseline = baseline or throughput
+            print(f"{workers:>8} {throughput:>9.1f} {len(errors):>7} {throughput / baseline:>7.2f}x")
+        finally:
+            server.terminate()
+            server.wait()
+
+    mock.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Time from the end of speech to the rebuttal, with and without speculating on partial transcripts.
+
+Each turn is a user speaking a --words-word argument at --wps words per
+second. The recognizer emits a partial transcript every --partial-every
+seconds, lagging the speaker by --asr-lag, and the final transcript
+--final-lag after speech ends. In a --diverge fraction of turns the final
+transcript rewrites a third of the words (the recognizer correcting
+itself, or the user rephrasing at the end), so a speculation may have to
+be thrown away. Replies come from a local mock Groq endpoint that takes
+--per-word seconds per generated word.
+
+    baseline     generate_response once the final transcript is in
+    speculative  utils.speculative_reply: partials start the reply, the final turn takes it
+
+    python benchmarks/bench_realtime_speculation.py [--turns 24] [--concurrency 4] [--diverge 0.25]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from mock_llm import start_mock_groq_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from debate_engine import DebateEngine
+from utils.cancellation import Cancelled
+from utils.jobs import JobQueue
+from utils.speculative_reply import SpeculativeReplies
+
+TOPIC = 'Remote work is better than office work'
+HISTORY = [{'speaker': 'ai', 'message': 'Offices build culture.'}]
+WORDS = ['commuting', 'wastes', 'hours', 'every', 'week', 'and', 'people', 'focus', 'better', 'at', 'home',
+         'because', 'studies', 'show', 'productivity', 'rises', 'when', 'meetings', 'shrink', 'costs', 'fall',
+         'families', 'benefit', 'from', 'flexible', 'schedules', 'while', 'teams', 'still', 'collaborate']
+
+
+def script(rng, words, diverge):
+    spoken = [rng.choice(WORDS) for _ in range(words)]
+    final = list(spoken)
+    if rng.random() < diverge:
+        start = rng.randrange(words // 3, words - words // 3)
+        final[start:start + words // 3] = [rng.choice(WORDS) for _ in range(words // 3)]
+    return spoken, " ".join(final)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+def run(mode, scripts, args):
+    engine = DebateEngine({'GROQ_API_KEY': 'mock'})
+    job_queue = JobQueue(workers=args.concurrency * 2)
+
+    def speculate(payload):
+        with engine.usage_meter() as meter:
+            try:
+                reply = engine.generate_response(payload['argument'], TOPIC, 'FOR', 'objective', HISTORY,
+                                                 cancel=job_queue.current_token(), remember=False)
+            except Cancelled:
+                speculative.cancelled(sum(usage['completion_tokens'] for usage in meter.values()))
+                raise
+        return {'reply': reply, 'completion_tokens': sum(usage['completion_tokens'] for usage in meter.values())}
+
+    job_queue.register('speculative_reply', speculate)
+    speculative = SpeculativeReplies(job_queue, min_words=args.min_words, reissue_below=args.reissue_below,
+                                     accept_at=args.accept_at, min_interval=args.partial_every)
+    latencies = []
+    lock = threading.Lock()
+
+    def turn(index, spoken, final):
+        debate_id = f'debate-{index}'
+        started = time.perf_counter()
+        speech_seconds = len(spoken) / args.wps
+        if mode == 'speculative':
+            while True:
+                elapsed = time.perf_counter() - started
+                if elapsed >= speech_seconds + args.asr_lag:
+                    break
+                heard = int(max(elapsed - args.asr_lag, 0) * args.wps)
+                if heard:
+                    speculative.partial(debate_id, 1, " ".join(spoken[:heard]), {})
+                time.sleep(args.partial_every)
+        time.sleep(max(started + speech_seconds + args.final_lag - time.perf_counter(), 0))
+
+        final_at = time.perf_counter()
+        reply = speculative.take(debate_id, 1, final) if mode == 'speculative' else None
+        if reply is None:
+            engine.generate_response(final, TOPIC, 'FOR', 'objective', HISTORY)
+        with lock:
+            latencies.append(time.perf_counter() - final_at)
+
+    threads = []
+    for index, (spoken, final) in enumerate(scripts):
+        while sum(thread.is_alive() for thread in threads) >= args.concurrency:
+            time.sleep(0.01)
+        thread = threading.Thread(target=turn, args=(index, spoken, final))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    usage = engine.get_usage_stats().get('groq', {})
+    return latencies, usage.get('completion_tokens', 0), speculative.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=24)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--words', type=int, default=18, help="words per argument")
+    parser.add_argument('--wps', type=float, default=2.5, help="speaking rate, words per second")
+    parser.add_argument('--partial-every', type=float, default=0.4)
+    parser.add_argument('--asr-lag', type=float, default=0.3)
+    parser.add_argument('--final-lag', type=float, default=0.3)
+    parser.add_argument('--diverge', type=float, default=0.25)
+    parser.add_argument('--min-words', type=int, default=10)
+    parser.add_argument('--reissue-below', type=float, default=0.85)
+    parser.add_argument('--accept-at', type=float, default=0.8)
+    parser.add_argument('--reply-words', type=int, default=120)
+    parser.add_argument('--per-word', type=float, default=0.01, help="seconds to generate one word")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_mock_groq_server(latency=0.3, reply_words=args.reply_words, per_word=args.per_word)
+    os.environ['GROQ_API_URL'] = f'http://127.0.0.1:{server.server_port}/chat/completions'
+    rng = random.Random(args.seed)
+    scripts = [script(rng, args.words, args.diverge) for _ in range(args.turns)]
+
+    print(f"{args.turns} turns x {args.words} words at {args.wps} words/s, partials every {args.partial_every}s, "
+          f"diverge={args.diverge}, concurrency={args.concurrency}")
+    print(f"{'mode':<12} {'p50 s':>6} {'p95 s':>6} {'mean s':>7} {'out tok':>8} {'hits':>5} {'rejected':>8} "
+          f"{'accuracy':>8} {'reissued':>8} {'wasted tok':>10} {'cancelled':>9}")
+    for mode in ('baseline', 'speculative'):
+        latencies, tokens, stats = run(mode, scripts, args)
+        print(f"{mode:<12} {percentile(latencies, 0.5):>6.2f} {percentile(latencies, 0.95):>6.2f} "
+              f"{statistics.mean(latencies):>7.2f} {tokens:>8} {stats['hits']:>5} {stats['rejected']:>8} "
+              f"{stats['accuracy']:>8.0%} {stats['reissued']:>8} {stats['wasted_completion_tokens']:>10} "
+              f"{stats['cancelled_in_flight']:>9}")
+        if mode == 'speculative':
+            print(f"latency saved per hit (generation already done at the final transcript): "
+                  f"{stats['avg_latency_saved_seconds']:.2f}s")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
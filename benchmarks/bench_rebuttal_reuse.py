@@ -0,0 +1,94 @@
+"""
+Hit rate, false reuse and lookup cost of the near-duplicate rebuttal index.
+
+A stream of arguments for one (topic, side, theme) mixes fresh arguments
+with near-duplicates of earlier ones (case, punctuation, a dropped or
+swapped word, a filler phrase). A hit on a fresh argument is counted as
+a false reuse.
+
+    python benchmarks/bench_rebuttal_reuse.py [--arguments 5000] [--duplicate-rate 0.3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.similarity import RebuttalIndex
+
+VOCABULARY = ("money happiness security freedom stress income wealth people studies show research "
+              "evidence poverty rich poor life satisfaction time family health choice comfort status "
+              "debt anxiety experiences purchases community work career savings inequality growth "
+              "because therefore however clearly most many often rarely always never buys creates "
+              "reduces improves causes matters").split()
+FILLERS = ["honestly", "I think", "basically", "to be fair", "look"]
+
+
+def fresh_argument(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(12, 40)))
+
+
+def near_duplicate(argument, rng):
+    words = argument.split()
+    edit = rng.choice(['case', 'punctuation', 'drop', 'swap', 'filler'])
+    if edit == 'case':
+        return argument.upper() if rng.random() < 0.5 else argument.capitalize()
+    if edit == 'punctuation':
+        return argument.replace(" ", ", ", 1) + rng.choice(["!", "?", "..."])
+    if edit == 'drop' and len(words) > 5:
+        del words[rng.randrange(len(words))]
+    elif edit == 'swap':
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    else:
+        words.insert(0, rng.choice(FILLERS))
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--arguments', type=int, default=5000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.3)
+    parser.add_argument('--thresholds', default='0.7,0.8,0.85,0.9,0.95')
+    args = parser.parse_args()
+
+    print(f"arguments={args.arguments} duplicate_rate={args.duplicate_rate}")
+    print(f"{'threshold':>9} {'hit rate':>9} {'dup recall':>10} {'false reuse':>11} "
+          f"{'LLM calls':>10} {'avoided':>8} {'lookup ms':>10}")
+
+    for threshold in [float(t) for t in args.thresholds.split(',')]:
+        rng = random.Random(0)
+        index = RebuttalIndex(default_threshold=threshold, max_per_key=args.arguments)
+        seen = []
+        duplicates = duplicate_hits = false_hits = calls = 0
+        lookups = []
+
+        for i in range(args.arguments):
+            is_duplicate = seen and rng.random() < args.duplicate_rate
+            argument = near_duplicate(rng.choice(seen), rng) if is_duplicate else fresh_argument(rng)
+
+            start = time.perf_counter()
+            match = index.find('topic', 'FOR', 'sassy', argument)
+            lookups.append((time.perf_counter() - start) * 1000)
+
+            if is_duplicate:
+                duplicates += 1
+                duplicate_hits += 1 if match else 0
+            elif match:
+                false_hits += 1
+            if not match:
+                calls += 1
+                index.add('topic', 'FOR', 'sassy', argument, f"rebuttal {i}")
+                seen.append(argument)
+
+        stats = index.stats()
+        fresh = args.arguments - duplicates
+        print(f"{threshold:>9.2f} {stats['hit_rate']:>9.1%} {duplicate_hits / max(duplicates, 1):>10.1%} "
+              f"{false_hits / max(fresh, 1):>11.2%} {calls:>10} {stats['llm_calls_avoided']:>8} "
+              f"{statistics.median(lookups):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
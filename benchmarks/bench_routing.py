@@ -0,0 +1,73 @@
+"""
+Routing policies replayed against a model-call trace.
+
+Record a trace from the running app with MODEL_TRACE=trace.jsonl (one line
+per provider call), or let this script synthesise one: every model in the
+table serving every task, with a latency incident on the fast Groq model
+partway through. Each policy then routes the same requests and is scored
+on latency, SLO misses, cost and the quality tier that served them.
+
+    python benchmarks/bench_routing.py [--trace trace.jsonl] [--requests 3000]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.routing import MODEL_TABLE, load_trace, replay
+
+# Rough output sizes per task, in tokens
+TASK_TOKENS = {'opening': (600, 200), 'rebuttal': (900, 260), 'summary': (1500, 280), 'analysis': (500, 380)}
+TASK_MIX = ['rebuttal'] * 5 + ['analysis'] * 4 + ['opening', 'summary']
+
+
+def synthetic_trace(requests, seed=0, incident=(0.4, 0.6)):
+    """(requests, calls): every request sent to every model in the table"""
+    rng = random.Random(seed)
+    trace, requested = [], []
+    for i in range(requests):
+        at = float(i)
+        task = rng.choice(TASK_MIX)
+        prompt_tokens, completion_tokens = TASK_TOKENS[task]
+        requested.append((at, task))
+        slow = incident[0] * requests <= i < incident[1] * requests
+        for provider, entries in MODEL_TABLE.items():
+            for entry in entries:
+                # Base latency scales with the output; the fast groq model degrades during the incident
+                seconds = entry['latency'] * completion_tokens / 250 * rng.lognormvariate(0, 0.3)
+                if slow and entry['model'] == MODEL_TABLE['groq'][0]['model']:
+                    seconds *= 6
+                trace.append({
+                    'at': at, 'task': task, 'provider': provider, 'model': entry['model'],
+                    'seconds': seconds, 'ok': rng.random() > 0.01,
+                    'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens
+                })
+    return requested, trace
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trace', help="JSONL trace recorded with MODEL_TRACE")
+    parser.add_argument('--requests', type=int, default=3000)
+    args = parser.parse_args()
+
+    if args.trace:
+        requests, trace = None, load_trace(args.trace)
+    else:
+        requests, trace = synthetic_trace(args.requests)
+
+    print(f"{len(requests) if requests else 'traced'} requests, {len(trace)} recorded calls")
+    print(f"{'policy':<10} {'task':<9} {'p50 s':>6} {'p95 s':>6} {'SLO miss':>8} {'tier':>5}  models")
+    for policy in ('table', 'fastest', 'strongest', 'cheapest'):
+        result = replay(trace, policy=None if policy == 'table' else policy, requests=requests)
+        for task, stats in sorted(result['tasks'].items()):
+            models = ", ".join(f"{name} {count}" for name, count in sorted(stats['models'].items()))
+            print(f"{policy:<10} {task:<9} {stats['p50']:>6.2f} {stats['p95']:>6.2f} "
+                  f"{stats['slo_miss_rate']:>8.1%} {stats['avg_tier']:>5.2f}  {models}")
+        print(f"{policy:<10} cost ${result['cost']:.4f}, fallbacks {result['fallbacks']}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Full-text search latency over stored turns at growing corpus sizes.
+
+Messages are drawn from a Zipf-distributed synthetic vocabulary with
+debate phrases ("universal basic income", ...) mixed in, so there are
+both very common and rare terms. At each size the FTS5 queries are timed
+against a LIKE scan of the same data as the baseline. Queries matching
+more than the store's rank_limit come back newest first ("recent").
+
+    python benchmarks/bench_search.py [--sizes 100000,1000000]
+"""
+import argparse
+import itertools
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.opening_pool import load_catalog
+from utils.transcripts import TranscriptStore, fts_query
+
+PHRASES = ['universal basic income', 'climate change', 'remote work', 'social media', 'artificial intelligence']
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'qu', 'di', 'fe', 'go', 'hu']
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def timed(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--turns', type=int, default=20)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    catalog = load_catalog(os.path.join(root, 'templates', 'index.html'))
+    rng = random.Random(0)
+    words = vocabulary(20000, rng)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    workdir = tempfile.mkdtemp(prefix='search_bench_')
+    store = TranscriptStore(os.path.join(workdir, 'transcripts.db'), flush_interval=0.05)
+    written = 0
+    debate = 0
+
+    queries = [
+        ('common word', words[0], {}),
+        ('mid-frequency word', words[500], {}),
+        ('rare word', words[15000], {}),
+        ('phrase', '"universal basic income"', {}),
+        ('three words (AND)', 'universal basic income', {}),
+        ('prefix', 'univ*', {}),
+        ('phrase + theme filter', '"climate change"', {'theme': catalog['themes'][0]}),
+        ('common word, page 10', words[0], {'offset': 180})
+    ]
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        start = time.perf_counter()
+        while written < size:
+            debate_id = f"bench_{debate:08d}"
+            store.start_debate(debate_id, rng.choice(catalog['topics']), 'FOR', rng.choice(catalog['themes']))
+            for turn in range(args.turns):
+                message = rng.choices(words, cum_weights=cum_weights, k=rng.randint(15, 60))
+                if rng.random() < 0.02:
+                    message.insert(rng.randrange(len(message)), rng.choice(PHRASES))
+                store.append(debate_id, 'user' if turn % 2 else 'ai', " ".join(message))
+            written += args.turns
+            debate += 1
+        store.flush(timeout=600)
+        build = time.perf_counter() - start
+        conn = store.db.conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        disk = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir))
+
+        print(f"\n{written} messages (+{build:.1f}s to write incl. index, {disk / 1e6:.0f} MB on disk)")
+        print(f"{'query':<24} {'matches':>8} {'ranked':>7} {'p50 ms':>8} {'p95 ms':>8}")
+        for label, query, options in queries:
+            offset = options.get('offset', 0)
+            filters = {key: value for key, value in options.items() if key != 'offset'}
+            matches = conn.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?",
+                                   (fts_query(query),)).fetchone()[0]
+            ranked = store.search(query, limit=20, offset=offset, **filters)['ranked']
+            p50, p95 = timed(lambda: store.search(query, limit=20, offset=offset, **filters))
+            print(f"{label:<24} {matches:>8} {'yes' if ranked else 'recent':>7} {p50:>8.2f} {p95:>8.2f}")
+
+        p50, _ = timed(lambda: conn.execute(
+            "SELECT id FROM messages WHERE message LIKE ? LIMIT 20", ('%universal basic income%',)
+        ).fetchall(), repeat=3)
+        scan, _ = timed(lambda: conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE message LIKE ?", ('%universal basic income%',)
+        ).fetchone(), repeat=3)
+        print(f"{'LIKE scan, first 20':<24} {'':>8} {'':>7} {p50:>8.2f}")
+        print(f"{'LIKE scan, all matches':<24} {'':>8} {'':>7} {scan:>8.2f}")
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Time-to-audio per turn with and without speculative TTS.
+
+Simulates one debate turn end to end: the LLM call, the /submit_argument
+response, the client's /text_to_speech round-trip and synthesis. Network
+hops sleep for half the round-trip time each.
+
+    python benchmarks/bench_speculative_tts.py [--llm 1.0] [--tts 0.8] [--rtt 0.1] [--turns 10]
+"""
+import argparse
+import os
+import sys
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.jobs import JobQueue
+from utils.speculative_tts import SpeculativeTTS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--llm', type=float, default=1.0, help='generate_response latency (s)')
+    parser.add_argument('--tts', type=float, default=0.8, help='synthesis time (s)')
+    parser.add_argument('--rtt', type=float, default=0.1, help='client round-trip time (s)')
+    parser.add_argument('--turns', type=int, default=10)
+    args = parser.parse_args()
+
+    def synthesize(payload):
+        time.sleep(args.tts)
+        return {'audio_path': f"/static/audio/{abs(hash(payload['text']))}.wav"}
+
+    job_queue = JobQueue(workers=2)
+    job_queue.register('tts', synthesize)
+    speculative = SpeculativeTTS(job_queue)
+    hop = args.rtt / 2
+
+    def sequential_turn(turn):
+        start = time.perf_counter()
+        time.sleep(args.llm)                      # generate_response
+        time.sleep(hop)                           # /submit_argument response
+        time.sleep(hop)                           # /text_to_speech request
+        synthesize({'text': f"reply {turn}"})
+        time.sleep(hop)                           # /text_to_speech response
+        return time.perf_counter() - start
+
+    def speculative_turn(turn):
+        start = time.perf_counter()
+        time.sleep(args.llm)
+        text = f"speculative reply {turn}"
+        speculative.start(text, 'sassy', 'bench')
+        time.sleep(hop)
+        time.sleep(hop)
+        speculative.result(text, 'sassy')
+        time.sleep(hop)
+        return time.perf_counter() - start
+
+    baseline = [sequential_turn(i) for i in range(args.turns)]
+    improved = [speculative_turn(i) for i in range(args.turns)]
+
+    base_ms = statistics.median(baseline) * 1000
+    spec_ms = statistics.median(improved) * 1000
+    print(f"llm={args.llm}s tts={args.tts}s rtt={args.rtt}s turns={args.turns}")
+    print(f"sequential   median time-to-audio: {base_ms:8.1f} ms")
+    print(f"speculative  median time-to-audio: {spec_ms:8.1f} ms")
+    print(f"saved per turn: {base_ms - spec_ms:.1f} ms ({(1 - spec_ms / base_ms) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Cold-start cost of `import app`, measured with `python -X importtime`, against a budget.
+
+Each run imports the app in a fresh interpreter (per-worker warmup
+deferred, as under serve.py before post_fork) and takes the cumulative
+import time of `app`, interpreter startup excluded. The median over
+--runs is checked against --budget-ms, and no provider SDK may be
+imported on this path at all; either failure exits non-zero, so this
+can gate CI.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 500] [--top 12]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or by the background warmup, never by `import app`
+DEFERRED_MODULES = ('google.generativeai', 'grpc', 'assemblyai', 'httpx', 'pyttsx3', 'comtypes')
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_once(data_dir):
+    env = dict(os.environ, DEBATE_DATA_DIR=data_dir, DEBATE_DEFER_WARMUP='1')
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"❌ import app failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(cumulative_us), len(indent) // 2))
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=500.0, help="median cumulative import time allowed")
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='startup_bench_')
+    import_once(data_dir)  # compile bytecode and create the databases first
+    runs = [import_once(data_dir) for _ in range(args.runs)]
+
+    totals = [next(cumulative for name, cumulative, depth in modules if name == 'app' and depth == 0) / 1000
+              for _, modules in runs]
+    walls = [wall * 1000 for wall, _ in runs]
+    median = statistics.median(totals)
+    print(f"import app: {median:.0f} ms imports (min {min(totals):.0f}), "
+          f"{statistics.median(walls):.0f} ms wall incl. interpreter, median of {args.runs}")
+
+    _, modules = runs[-1]
+    # importtime lists a module after its imports, so app's direct imports are the depth-1 lines
+    print(f"\n{'cumulative ms':>13}  imported by app")
+    for name, cumulative, _ in sorted((m for m in modules if m[2] == 1), key=lambda m: -m[1])[:args.top]:
+        print(f"{cumulative / 1000:>13.1f}  {name}")
+
+    eager = sorted({name for name, _, _ in modules
+                    if any(name == deferred or name.startswith(deferred + '.') for deferred in DEFERRED_MODULES)})
+    failed = False
+    if eager:
+        print(f"\n❌ Imported at startup but should be deferred: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\n❌ Over budget: {median:.0f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\n✅ Within budget ({args.budget_ms:.0f} ms), no provider SDKs on the import path")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
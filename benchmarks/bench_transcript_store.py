@@ -0,0 +1,147 @@
+"""
+Write amplification and query latency of the transcript store.
+
+Writes --messages turns across debates of --turns messages each, either
+one commit per turn or group-committed every --flush-ms, then times the
+listing, paging, history and export queries coaches use.
+
+Write amplification is bytes the process actually wrote (/proc/self/io,
+includes WAL and checkpoints) divided by the logical bytes of the
+messages; where /proc is unavailable the final file sizes are used.
+
+    python benchmarks/bench_transcript_store.py [--messages 1000000] [--turns 20] [--flush-ms 50]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.opening_pool import load_catalog
+from utils.transcripts import TranscriptStore
+
+WORDS = ("money time happiness freedom evidence studies people work society future risk value "
+         "argument clearly because however therefore research shows most never always").split()
+
+
+def io_written():
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('write_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--flush-ms', type=float, default=0,
+                        help='group-commit interval; 0 commits every turn')
+    parser.add_argument('--dir', default=None, help='directory for the database (default: a temp dir)')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    catalog = load_catalog(os.path.join(root, 'templates', 'index.html'))
+    rng = random.Random(0)
+    workdir = args.dir or tempfile.mkdtemp(prefix='transcripts_bench_')
+    db_path = os.path.join(workdir, 'transcripts.db')
+    store = TranscriptStore(db_path, flush_interval=args.flush_ms / 1000)
+
+    debates = args.messages // args.turns
+    year_ago = time.time() - 365 * 24 * 3600
+    logical = 0
+    written_before = io_written()
+    start = time.perf_counter()
+    debate_ids = []
+    for d in range(debates):
+        debate_id = f"bench_{d:08d}"
+        debate_ids.append(debate_id)
+        started_at = year_ago + d * (365 * 24 * 3600 / debates)
+        store.start_debate(debate_id, rng.choice(catalog['topics']), rng.choice(('FOR', 'AGAINST')),
+                           rng.choice(catalog['themes']), user_id=f"user{rng.randrange(args.users)}",
+                           started_at=started_at)
+        for turn in range(args.turns):
+            message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 60)))
+            logical += len(message.encode()) + len(debate_id) + 16
+            store.append(debate_id, 'user' if turn % 2 else 'ai', message, started_at + turn * 30)
+        if (d + 1) % max(debates // 10, 1) == 0:
+            print(f"  {(d + 1) * args.turns:>9} messages  {(d + 1) * args.turns / (time.perf_counter() - start):>8.0f} msg/s")
+    store.flush(timeout=600)
+    write_seconds = time.perf_counter() - start
+    written = io_written()
+    commits = store.stats()['commits']
+
+    store.db.conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    on_disk = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir))
+
+    print(f"\nmessages={debates * args.turns} debates={debates} write={write_seconds:.1f}s "
+          f"({debates * args.turns / write_seconds:.0f} msg/s, "
+          f"{commits} commits, {(debates * args.turns + debates) / commits:.1f} rows/commit)")
+    print(f"logical {logical / 1e6:.1f} MB, on disk {on_disk / 1e6:.1f} MB "
+          f"(space amplification {on_disk / logical:.2f}x)")
+    if written_before is not None and written:
+        print(f"bytes written {(written - written_before) / 1e6:.1f} MB "
+              f"(write amplification {(written - written_before) / logical:.2f}x)")
+
+    topic = catalog['topics'][0]
+    theme = catalog['themes'][0]
+    month = year_ago + 180 * 24 * 3600
+
+    def deep_pages(pages=50, **filters):
+        cursor = None
+        for _ in range(pages):
+            _, cursor = store.list_debates(limit=50, cursor=cursor, **filters)
+
+    queries = [
+        ('latest 50 debates', lambda: store.list_debates(limit=50)),
+        ('by user', lambda: store.list_debates(limit=50, user_id=f"user{rng.randrange(args.users)}")),
+        ('by topic', lambda: store.list_debates(limit=50, topic=topic)),
+        ('by theme', lambda: store.list_debates(limit=50, theme=theme)),
+        ('by date range', lambda: store.list_debates(limit=50, since=month, until=month + 30 * 24 * 3600)),
+        ('topic+theme', lambda: store.list_debates(limit=50, topic=topic, theme=theme)),
+        ('50 pages by topic (per page)', lambda: deep_pages(topic=topic)),
+        ('one debate history', lambda: store.get_messages(rng.choice(debate_ids))),
+    ]
+    print(f"\n{'query':<30} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, fn in queries:
+        p50, p95 = timed(fn, 50 if 'pages' not in label else 5)
+        if 'pages' in label:
+            p50, p95 = p50 / 50, p95 / 50
+        print(f"{label:<30} {p50:>8.2f} {p95:>8.2f}")
+
+    start = time.perf_counter()
+    exported = sum(1 for _ in zip(range(2000), store.export(topic=topic)))
+    elapsed = time.perf_counter() - start
+    print(f"\nexport: {exported} debates in {elapsed:.2f}s ({exported / elapsed:.0f} debates/s)")
+
+    plan = store.db.conn().execute(
+        "EXPLAIN QUERY PLAN SELECT debate_id FROM debates WHERE topic = ? AND (started_at, debate_id) < (?, ?) "
+        "ORDER BY started_at DESC, debate_id DESC LIMIT 50", (topic, month, 'x')
+    ).fetchall()
+    print("plan:", "; ".join(row[-1] for row in plan))
+
+    if not args.dir:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Sequential fallback chain vs TranscriptionOrchestrator against stub backends.
+
+Each stub sleeps a random latency (scaled down by --speedup) and fails
+with a fixed probability, honouring the cancel event like the polling
+backends do. Results are scaled back to real seconds.
+
+    python benchmarks/bench_transcription.py [--runs 40] [--stagger 5] [--speedup 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.transcription import TranscriptionOrchestrator
+
+# name: (median latency s, failure rate, latency of a failure s)
+PROFILES = {
+    'assemblyai_sdk': (9.0, 0.25, 60.0),
+    'assemblyai_api': (7.0, 0.10, 30.0),
+    'google_speech': (3.0, 0.30, 2.0)
+}
+
+
+def stub(name, speedup, rng):
+    median, failure_rate, failure_latency = PROFILES[name]
+
+    def backend(audio_file_path, cancel_event: threading.Event):
+        failed = rng.random() < failure_rate
+        latency = failure_latency if failed else median * rng.lognormvariate(0, 0.3)
+        if cancel_event.wait(latency / speedup):
+            return None
+        return None if failed else f"transcript from {name}"
+    return backend
+
+
+def sequential(backends):
+    for _, fn in backends:
+        text = fn('stub.wav', threading.Event())
+        if text:
+            return text
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=40)
+    parser.add_argument('--stagger', type=float, default=5.0)
+    parser.add_argument('--speedup', type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    backends = [(name, stub(name, args.speedup, rng)) for name in PROFILES]
+    orchestrator = TranscriptionOrchestrator(stagger=args.stagger / args.speedup, timeout=300 / args.speedup)
+
+    results = {}
+    for label, run in (
+        ('sequential', lambda: sequential(backends)),
+        ('orchestrated', lambda: orchestrator.transcribe('stub.wav', backends))
+    ):
+        latencies, failures = [], 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            if not run():
+                failures += 1
+            latencies.append((time.perf_counter() - start) * args.speedup)
+        results[label] = (latencies, failures)
+
+    print(f"runs={args.runs} stagger={args.stagger}s (time compressed {args.speedup}x, results scaled back)")
+    print(f"{'mode':<13} {'mean (s)':>9} {'p50 (s)':>8} {'p95 (s)':>8} {'failed':>7}")
+    for label, (latencies, failures) in results.items():
+        latencies.sort()
+        print(f"{label:<13} {statistics.mean(latencies):>9.2f} {statistics.median(latencies):>8.2f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:>8.2f} {failures:>7}")
+
+    print("\nlearned order:", [name for name, _ in orchestrator.order(backends)])
+    for name, stats in orchestrator.stats()['backends'].items():
+        print(f"  {name:<15} attempts={stats['attempts']:>3} wins={stats['wins']:>3} "
+              f"cancelled={stats['cancelled']:>3} success_rate={stats['success_rate'] or 0:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Lost updates and throughput when several tabs of one debate submit at once.
+
+Starts a mock Groq endpoint and serve.py, opens --debates debates and has
+--tabs clients share each debate's session cookie, all submitting
+different arguments concurrently. Afterwards each debate's history is
+compared with the replies the tabs received: a reply whose turn is
+missing from the history is a lost update. Runs once per
+DEBATE_TURN_ORDER mode.
+
+    python benchmarks/bench_turn_ordering.py [--debates 16] [--tabs 3] [--rounds 5] [--modes off,queue,reject]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from mock_llm import start_mock_groq_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url + '/voice_status', timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def run_debate(url, debate, tabs, rounds, results):
+    opener = requests.Session()
+    opener.post(url + '/start_debate', json={
+        'topic': 'Remote work is better than office work', 'side': 'FOR', 'theme': 'objective'
+    }, timeout=60)
+    replies, statuses, latencies = [], [], []
+    lock = threading.Lock()
+
+    def tab(index):
+        client = requests.Session()
+        client.cookies.update(opener.cookies)
+        for turn in range(rounds):
+            argument = f"Debate {debate} tab {index} point {turn}: commuting wastes hours"
+            started = time.perf_counter()
+            response = client.post(url + '/submit_argument', json={'argument': argument}, timeout=300)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                statuses.append(response.status_code)
+                if response.status_code == 200:
+                    replies.append(argument)
+
+    threads = [threading.Thread(target=tab, args=(i,)) for i in range(tabs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    history = opener.get(url + '/get_debate_history', timeout=60).json()['history']
+    recorded = [entry['message'] for entry in history if entry['speaker'] == 'user']
+    speakers = [entry['speaker'] for entry in history]
+    # Opening, then strict user/ai alternation
+    ordered = speakers == ['ai'] + ['user', 'ai'] * ((len(speakers) - 1) // 2)
+    results.append({
+        'accepted': len(replies),
+        'lost': sum(1 for argument in replies if argument not in recorded),
+        'statuses': statuses,
+        'latencies': latencies,
+        'ordered': ordered
+    })
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--debates', type=int, default=16)
+    parser.add_argument('--tabs', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--modes', default='off,queue,reject')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--llm-latency', type=float, default=0.2)
+    parser.add_argument('--port', type=int, default=5079)
+    args = parser.parse_args()
+
+    mock = start_mock_groq_server(latency=args.llm_latency)
+    url = f'http://127.0.0.1:{args.port}'
+    print(f"{args.debates} debates x {args.tabs} tabs x {args.rounds} submissions, "
+          f"workers={args.workers}x{args.threads}, llm_latency={args.llm_latency}s")
+    print(f"{'mode':<7} {'submitted':>9} {'accepted':>8} {'409':>5} {'lost':>5} {'lost %':>7} "
+          f"{'misordered':>10} {'turns/s':>8} {'p50 s':>6} {'p95 s':>6}")
+
+    for mode in args.modes.split(','):
+        env = dict(
+            os.environ,
+            GROQ_API_KEY='mock',
+            GROQ_API_URL=f'http://127.0.0.1:{mock.server_port}/chat/completions',
+            DEBATE_DATA_DIR=tempfile.mkdtemp(prefix='turn_bench_'),
+            DEBATE_TURN_ORDER=mode,
+            SPECULATIVE_TTS='0',
+            REBUTTAL_REUSE='0',
+            STARTUP_WARMUP='0',
+            DEBATE_TURN_QUEUE=str(args.tabs)
+        )
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--http', '--workers', str(args.workers), '--threads', str(args.threads),
+             '--bind', f'127.0.0.1:{args.port}'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_until_up(url):
+                print(f"{mode:<7} server did not start")
+                continue
+            results = []
+            threads = [threading.Thread(target=run_debate, args=(url, debate, args.tabs, args.rounds, results))
+                       for debate in range(args.debates)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            statuses = [status for result in results for status in result['statuses']]
+            accepted = sum(result['accepted'] for result in results)
+            lost = sum(result['lost'] for result in results)
+            latencies = [latency for result in results for latency in result['latencies']]
+            print(f"{mode:<7} {len(statuses):>9} {accepted:>8} {statuses.count(409):>5} {lost:>5} "
+                  f"{lost / max(accepted, 1):>7.1%} {sum(not r['ordered'] for r in results):>10} "
+                  f"{(accepted - lost) / elapsed:>8.1f} {percentile(latencies, 0.5):>6.2f} "
+                  f"{percentile(latencies, 0.95):>6.2f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    mock.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Local mock LLM provider for offline benchmarks
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from debate_engine import DebateEngine
+
+
+class MockLLM:
+    """Stands in for DebateEngine._get_ai_response with provider-like latency.
+
+    Each call costs a fixed round-trip plus a per-output-token generation
+    time, so packing many arguments into one prompt pays the round-trip once
+    but still pays for every generated token.
+    """
+
+    def __init__(self, engine: DebateEngine, round_trip: float = 0.25, per_token: float = 0.001):
+        self.engine = engine
+        self.round_trip = round_trip
+        self.per_token = per_token
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._generate = engine._generate_mock_response
+
+    def __call__(self, prompt: str, use_groq: bool = True, json_mode: bool = False, **kwargs) -> str:
+        with self._lock:
+            self.calls += 1
+        text = self._generate(prompt, json_mode=json_mode)
+        time.sleep(self.round_trip + self.per_token * (len(text) / 4))
+        return text
+
+
+def mock_engine(**kwargs):
+    engine = DebateEngine({})
+    llm = MockLLM(engine, **kwargs)
+    engine._get_ai_response = llm
+    return engine, llm
+
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions endpoint (what _get_groq_response calls)"""
+
+    latency = 0.02
+    # Verbose mode: plain-text replies run to `reply_words` words (capped by max_tokens), each word taking `per_word`
+    reply_words = 0
+    per_word = 0.0
+    engine = None
+
+    def _reply(self, prompt, json_mode, max_tokens):
+        text = self.engine._generate_mock_response(prompt, json_mode=json_mode)
+        if json_mode or not self.reply_words:
+            return text, False
+        words = []
+        while len(words) < self.reply_words:
+            words.extend(text.split())
+        limit = min(self.reply_words, int(max_tokens / 1.4))
+        return " ".join(words[:limit]), limit < self.reply_words
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        json_mode = body.get('response_format', {}).get('type') == 'json_object'
+        text, cut = self._reply(prompt, json_mode, body.get('max_tokens', 1000))
+        time.sleep(self.latency)
+
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            try:
+                for word in text.split(' '):
+                    time.sleep(self.per_word)
+                    chunk = {'choices': [{'delta': {'content': word + ' '}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading, like a provider seeing its stream closed
+                pass
+            return
+
+        time.sleep(self.per_word * len(text.split()))
+        payload = json.dumps({
+            'choices': [{'message': {'content': text}, 'finish_reason': 'length' if cut else 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 4}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_groq_server(port: int = 0, latency: float = 0.02, reply_words: int = 0,
+                           per_word: float = 0.0) -> ThreadingHTTPServer:
+    handler = type('Handler', (MockGroqHandler,), {
+        'latency': latency, 'reply_words': reply_words, 'per_word': per_word, 'engine': DebateEngine({})
+    })
+    # The default listen backlog of 5 resets connections under concurrent clients
+    server_class = type('MockServer', (ThreadingHTTPServer,), {'request_queue_size': 256, 'daemon_threads': True})
+    server = server_class(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
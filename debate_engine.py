@@ -1,20 +1,58 @@
 import json
 import random
 import os
+import re
+import threading
+import time
 import requests
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, Optional, Tuple
+from utils import provider_tape
+from utils.cancellation import CancelToken, run_cancellable
+from utils.generation import TaskStats, generation_params, trim_to_words, word_count
+from utils.json_stream import IncrementalJSONParser, extract_first_json, validate_feedback, validate_field
+from utils.response_cache import LRUCache, cache_key
+from utils.routing import ModelRouter
+
+FALLBACK_FEEDBACK = {
+    "strengths": ["Clear communication"],
+    "weaknesses": ["Could use more evidence"],
+    "fallacies": [],
+    "suggestions": ["Add more supporting facts"],
+    "grade": "B",
+    "overall_feedback": "Good effort! Keep practicing."
+}
 
 class DebateEngine:
-    def __init__(self, api_keys):
+    def __init__(self, api_keys, analysis_cache=None, rebuttal_index=None, router=None):
         self.api_keys = api_keys
         self.groq_client = None
-        self.gemini_model = None
+        self.groq_api_key = None
+        self.gemini_api_key = None
+        # Picks the provider model per task (fast for live turns, strong for analysis)
+        self.router = router if router is not None else ModelRouter.from_env()
+        # The Gemini SDK is slow to import; it is loaded on first use or by warmup()
+        self._genai = None
+        self._gemini_lock = threading.Lock()
+        self._gemini_models = {}
+        self.analysis_stats = {'calls': 0, 'parsed': 0, 'parse_failures': 0}
+        self.analysis_cache = analysis_cache if analysis_cache is not None else LRUCache(max_size=4096)
+        self._stats_lock = threading.Lock()
+        # Token usage per provider; estimated (~4 chars per token) where the provider reports none
+        self.usage_stats = {}
+        # Spoken replies stream and stop at a sentence boundary once their word budget is reached
+        self.stream_generation = os.getenv('GENERATION_STREAM', '1') != '0'
+        self.task_stats = TaskStats()
+        # Near-duplicate arguments reuse an earlier rebuttal instead of a new LLM call
+        self.rebuttal_index = rebuttal_index
+        self._call_state = threading.local()
         
         if api_keys.get('GROQ_API_KEY'):
             try:
                 self.groq_api_key = api_keys['GROQ_API_KEY']
-                self.groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
-                self.groq_model = "llama3-8b-8192"
+                self.groq_api_url = os.getenv('GROQ_API_URL', "https://api.groq.com/openai/v1/chat/completions")
+                self.groq_model = self.router.default_model('groq') or "llama3-8b-8192"
                 print("✅ Groq API configured successfully")
             except Exception as e:
                 print(f"⚠️ Groq initialization failed: {e}")
@@ -23,18 +61,13 @@ class DebateEngine:
             print("⚠️ No Groq API key provided")
             
         if api_keys.get('GEMINI_API_KEY'):
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=api_keys['GEMINI_API_KEY'])
-                self.gemini_model = genai.GenerativeModel('gemini-pro')
-                print("✅ Gemini client initialized successfully")
-            except Exception as e:
-                print(f"⚠️ Gemini initialization failed: {e}")
-                self.gemini_model = None
+            self.gemini_api_key = api_keys['GEMINI_API_KEY']
+            self.gemini_model_name = self.router.default_model('gemini') or 'gemini-pro'
+            print("✅ Gemini API configured (client created on first use)")
         else:
             print("⚠️ No Gemini API key provided")
         
-        if not self.groq_api_key and not self.gemini_model:
+        if not self.has_providers():
             print("⚠️ No AI APIs available - using mock responses")
         
         self.themes = {
@@ -76,7 +109,9 @@ class DebateEngine:
             }
         }
     
-    def _get_groq_response(self, prompt: str) -> str:
+    def _get_groq_response(self, prompt: str, json_mode: bool = False, cancel: Optional[CancelToken] = None,
+                           params: Optional[Dict] = None, model: Optional[str] = None) -> str:
+        params = params or {}
         try:
             headers = {
                 "Authorization": f"Bearer {self.groq_api_key}",
@@ -84,16 +119,23 @@ class DebateEngine:
             }
             
             payload = {
-                "model": self.groq_model,
+                "model": model or self.groq_model,
                 "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.8,
-                "max_tokens": 1000
+                "temperature": params.get('temperature', 0.8),
+                "max_tokens": params.get('max_tokens', 1000)
             }
+            if json_mode:
+                payload["response_format"] = {"type": "json_object"}
             
-            response = requests.post(self.groq_api_url, headers=headers, json=payload)
+            response = run_cancellable(requests.post, cancel, self.groq_api_url, headers=headers, json=payload)
             
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
+                body = response.json()
+                text = body["choices"][0]["message"]["content"]
+                self._call_state.truncated = body["choices"][0].get("finish_reason") == "length"
+                usage = body.get("usage") or {}
+                self._record_usage('groq', prompt, text, usage.get("prompt_tokens"), usage.get("completion_tokens"))
+                return text
             else:
                 print(f"⚠️ Groq API error: {response.status_code} - {response.text}")
                 return None
@@ -102,25 +144,306 @@ class DebateEngine:
             print(f"⚠️ Groq API error: {e}")
             return None
     
-    def _get_ai_response(self, prompt: str, use_groq: bool = True) -> str:
+    def _stream_groq_response(self, prompt: str, json_mode: bool = False, cancel: Optional[CancelToken] = None,
+                              params: Optional[Dict] = None, model: Optional[str] = None) -> Iterator[str]:
+        params = params or {}
+        headers = {
+            "Authorization": f"Bearer {self.groq_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": model or self.groq_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": params.get('temperature', 0.8),
+            "max_tokens": params.get('max_tokens', 1000),
+            "stream": True
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        
+        response = requests.post(self.groq_api_url, headers=headers, json=payload, stream=True)
         try:
-            if use_groq and self.groq_api_key:
-                groq_response = self._get_groq_response(prompt)
-                if groq_response:
-                    return groq_response
+            if response.status_code != 200:
+                print(f"⚠️ Groq API error: {response.status_code} - {response.text}")
+                return
             
-            if self.gemini_model:
+            for line in response.iter_lines(decode_unicode=True):
+                if cancel is not None:
+                    # Closing the response (finally) drops the connection and stops generation
+                    cancel.raise_if_cancelled()
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+        finally:
+            response.close()
+    
+    def _gemini_config(self, params: Optional[Dict], json_mode: bool = False) -> Optional[Dict]:
+        config = {}
+        if params:
+            config = {"max_output_tokens": params['max_tokens'], "temperature": params['temperature']}
+        if json_mode:
+            config["response_mime_type"] = "application/json"
+        return config or None
+    
+    def has_providers(self) -> bool:
+        return bool(self.groq_api_key or self.gemini_api_key)
+    
+    @property
+    def gemini_model(self):
+        """The default Gemini model (importing the SDK if needed), or None without a key"""
+        return self._gemini(None) if self.gemini_api_key else None
+    
+    def warmup(self):
+        """Import the Gemini SDK and create its default model ahead of the first request"""
+        if self.gemini_api_key:
+            try:
+                self._gemini(None)
+                print("✅ Gemini client initialized successfully")
+            except Exception as e:
+                print(f"⚠️ Gemini initialization failed: {e}")
+    
+    def _gemini(self, model: Optional[str]):
+        model = model or self.gemini_model_name
+        if model in self._gemini_models:
+            return self._gemini_models[model]
+        with self._gemini_lock:
+            if model not in self._gemini_models:
+                tape = provider_tape.active()
+                # A replayed tape stands in for the SDK, so it need not be installed
+                if tape is not None and tape.replaying:
+                    self._gemini_models[model] = tape.gemini_model(model)
+                elif tape is not None:
+                    self._gemini_models[model] = tape.gemini_model(model, self._genai_module().GenerativeModel(model))
+                else:
+                    self._gemini_models[model] = self._genai_module().GenerativeModel(model)
+        return self._gemini_models[model]
+    
+    def _genai_module(self):
+        if self._genai is None:
+            try:
                 import google.generativeai as genai
-                response = self.gemini_model.generate_content(prompt)
+            except ImportError:
+                # Without the SDK, route around Gemini from now on
+                print("⚠️ google-generativeai is not installed; Gemini disabled")
+                self.gemini_api_key = None
+                raise
+            genai.configure(api_key=self.gemini_api_key)
+            self._genai = genai
+        return self._genai
+    
+    def _get_gemini_response(self, prompt: str, json_mode: bool = False, cancel: Optional[CancelToken] = None,
+                             params: Optional[Dict] = None, model: Optional[str] = None) -> str:
+        gemini = self._gemini(model)
+        if json_mode:
+            try:
+                response = run_cancellable(
+                    gemini.generate_content,
+                    cancel,
+                    prompt,
+                    generation_config=self._gemini_config(params, json_mode=True)
+                )
+                self._record_gemini_usage(prompt, response)
                 return response.text
-            
-            return self._generate_mock_response(prompt)
-                
-        except Exception as e:
-            print(f"⚠️ AI API Error: {e}")
-            return self._generate_mock_response(prompt)
+            except Exception as e:
+                # Older SDKs and models reject response_mime_type
+                print(f"⚠️ Gemini JSON mode unavailable: {e}")
+        
+        response = run_cancellable(gemini.generate_content, cancel, prompt,
+                                   generation_config=self._gemini_config(params))
+        self._record_gemini_usage(prompt, response)
+        return response.text
+    
+    def _record_gemini_usage(self, prompt: str, response):
+        metadata = getattr(response, 'usage_metadata', None)
+        self._record_usage('gemini', prompt, response.text,
+                           getattr(metadata, 'prompt_token_count', None),
+                           getattr(metadata, 'candidates_token_count', None))
     
-    def _generate_mock_response(self, prompt: str) -> str:
+    def _record_usage(self, provider: str, prompt: str, text: str,
+                      prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            prompt_tokens = len(prompt) // 4
+        if completion_tokens is None:
+            completion_tokens = len(text or "") // 4
+        self._call_state.completion_tokens = getattr(self._call_state, 'completion_tokens', 0) + completion_tokens
+        self._call_state.last_usage = (prompt_tokens, completion_tokens)
+        
+        with self._stats_lock:
+            totals = self.usage_stats.setdefault(provider, {
+                'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'estimated_calls': 0
+            })
+            totals['calls'] += 1
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['estimated_calls'] += 1 if estimated else 0
+        
+        meter = getattr(self._call_state, 'meter', None)
+        if meter is not None:
+            counts = meter.setdefault(provider, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+            counts['calls'] += 1
+            counts['prompt_tokens'] += prompt_tokens
+            counts['completion_tokens'] += completion_tokens
+    
+    @contextmanager
+    def usage_meter(self):
+        """Collects {provider: usage} for every call made on this thread inside the block"""
+        meter = {}
+        previous = getattr(self._call_state, 'meter', None)
+        self._call_state.meter = meter
+        try:
+            yield meter
+        finally:
+            self._call_state.meter = previous
+    
+    def get_generation_stats(self) -> Dict:
+        return self.task_stats.stats()
+    
+    def get_model_stats(self) -> Dict:
+        return self.router.stats()
+    
+    def get_usage_stats(self) -> Dict:
+        with self._stats_lock:
+            return {provider: dict(totals) for provider, totals in self.usage_stats.items()}
+    
+    def generation_params(self, task: str, theme: Optional[str] = None) -> Dict:
+        return generation_params(task, theme)
+    
+    def _get_ai_response(self, prompt: str, use_groq: bool = True, json_mode: bool = False,
+                         cancel: Optional[CancelToken] = None, task: Optional[str] = None,
+                         theme: Optional[str] = None, params: Optional[Dict] = None) -> str:
+        """Raises Cancelled (not caught by the fallbacks) once `cancel` is set.
+        
+        With a `task`, generation parameters come from the task and theme, the
+        reply is held to the task's word budget, and tokens/latency are
+        recorded per task.
+        """
+        self._call_state.mocked = False
+        self._call_state.truncated = False
+        if task is None:
+            return self._call_providers(prompt, use_groq, json_mode, cancel, params)
+        
+        params = params or self.generation_params(task, theme)
+        max_words = params.get('max_words')
+        started = time.perf_counter()
+        self._call_state.completion_tokens = 0
+        early_stop = False
+        
+        if max_words and self.stream_generation and not json_mode:
+            text, early_stop = self._generate_within_budget(prompt, max_words, cancel, params, task)
+        else:
+            text = self._call_providers(prompt, use_groq, json_mode, cancel, params, task)
+        
+        reply = text
+        if max_words and text:
+            reply = trim_to_words(text, max_words, truncated=early_stop or self._call_state.truncated)
+        self.task_stats.record(task, time.perf_counter() - started, self._call_state.completion_tokens,
+                               trimmed=reply != text, early_stop=early_stop)
+        return reply
+    
+    def _providers(self, use_groq: bool = True) -> List[str]:
+        providers = []
+        if use_groq and self.groq_api_key:
+            providers.append('groq')
+        if self.gemini_api_key:
+            providers.append('gemini')
+        return providers
+    
+    def _record_route(self, provider: str, model: str, task: Optional[str], started: float, ok: bool,
+                      attempt: int):
+        usage = getattr(self._call_state, 'last_usage', None) or (0, 0)
+        self.router.record(provider, model, task, time.perf_counter() - started, ok, *usage, fallback=attempt > 0)
+    
+    def _call_providers(self, prompt: str, use_groq: bool, json_mode: bool, cancel: Optional[CancelToken],
+                        params: Optional[Dict], task: Optional[str] = None) -> str:
+        """Try the task's models in route order, then fall back to a mock response"""
+        for attempt, (provider, model) in enumerate(self.router.route(task, self._providers(use_groq))):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            self._call_state.last_usage = None
+            started = time.perf_counter()
+            try:
+                if provider == 'groq':
+                    text = self._get_groq_response(prompt, json_mode=json_mode, cancel=cancel, params=params,
+                                                   model=model)
+                else:
+                    text = self._get_gemini_response(prompt, json_mode=json_mode, cancel=cancel, params=params,
+                                                     model=model)
+            except Exception as e:
+                print(f"⚠️ AI API Error ({provider}/{model}): {e}")
+                text = None
+            self._record_route(provider, model, task, started, bool(text), attempt)
+            if text:
+                return text
+        
+        return self._generate_mock_response(prompt, json_mode=json_mode)
+    
+    def _generate_within_budget(self, prompt: str, max_words: int, cancel: Optional[CancelToken],
+                                params: Dict, task: Optional[str] = None) -> Tuple[str, bool]:
+        """Stream the reply and stop reading once it passes `max_words`. Returns (text, stopped_early)."""
+        parts = []
+        stream = self._stream_ai_response(prompt, cancel=cancel, params=params, task=task)
+        try:
+            for chunk in stream:
+                parts.append(chunk)
+                # Closing the stream closes the provider connection, which stops generation
+                if word_count("".join(parts)) > max_words:
+                    return "".join(parts), True
+        finally:
+            stream.close()
+        return "".join(parts), False
+    
+    def _stream_gemini_response(self, prompt: str, json_mode: bool = False, cancel: Optional[CancelToken] = None,
+                                params: Optional[Dict] = None, model: Optional[str] = None) -> Iterator[str]:
+        config = self._gemini_config(params, json_mode=json_mode)
+        for chunk in self._gemini(model).generate_content(prompt, generation_config=config, stream=True):
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            yield chunk.text
+    
+    def _stream_ai_response(self, prompt: str, json_mode: bool = False, cancel: Optional[CancelToken] = None,
+                            params: Optional[Dict] = None, task: Optional[str] = None) -> Iterator[str]:
+        for attempt, (provider, model) in enumerate(self.router.route(task, self._providers())):
+            stream = self._stream_groq_response if provider == 'groq' else self._stream_gemini_response
+            produced = []
+            self._call_state.last_usage = None
+            started = time.perf_counter()
+            try:
+                for chunk in stream(prompt, json_mode=json_mode, cancel=cancel, params=params, model=model):
+                    produced.append(chunk)
+                    yield chunk
+            except Exception as e:
+                print(f"⚠️ {provider} streaming error ({model}): {e}")
+            finally:
+                # Also counts streams the caller stopped reading early; cancelled calls say nothing about the model
+                if produced:
+                    self._record_usage(provider, prompt, "".join(produced))
+                if cancel is None or not cancel.is_set():
+                    self._record_route(provider, model, task, started, bool(produced), attempt)
+            if produced:
+                return
+        
+        yield self._generate_mock_response(prompt, json_mode=json_mode)
+    
+    def _generate_mock_response(self, prompt: str, json_mode: bool = False) -> str:
+        response = self._mock_text(prompt, json_mode=json_mode)
+        self._record_usage('mock', prompt, response)
+        return response
+    
+    def _mock_text(self, prompt: str, json_mode: bool = False) -> str:
+        self._call_state.mocked = True
+        if json_mode:
+            batch_size = len(re.findall(r'^\s*ARGUMENT \d+:', prompt, flags=re.MULTILINE))
+            if batch_size:
+                return json.dumps({"results": [dict(FALLBACK_FEEDBACK, index=i) for i in range(batch_size)]})
+            return json.dumps(FALLBACK_FEEDBACK)
+        
         theme_style = "objective"
         for theme_name, theme_info in self.themes.items():
             if theme_info['personality'] in prompt:
@@ -178,8 +501,11 @@ class DebateEngine:
         theme_responses = mock_responses.get(theme_style, mock_responses['objective'])
         return random.choice(theme_responses)
     
-    def generate_opening(self, topic: str, user_side: str, theme: str) -> str:
+    def generate_opening(self, topic: str, user_side: str, theme: str, angle: Optional[str] = None,
+                         cancel: Optional[CancelToken] = None) -> str:
         theme_info = self.themes.get(theme, self.themes['objective'])
+        angle_line = f"Open with {angle}." if angle else ""
+        params = self.generation_params('opening', theme)
         
         prompt = f"""
         {theme_info['personality']}
@@ -196,18 +522,34 @@ class DebateEngine:
         3. Gives a preview of your main arguments
         4. Challenges the human to bring their best arguments
         
-        Keep it under 150 words and match your personality perfectly.
+        Keep it under {params['max_words']} words and match your personality perfectly.
+        {angle_line}
         """
         
-        return self._get_ai_response(prompt)
+        return self._get_ai_response(prompt, cancel=cancel, task='opening', params=params)
     
-    def generate_response(self, user_argument: str, topic: str, user_side: str, theme: str, debate_history: List[Dict]) -> str:
+    def generate_response(self, user_argument: str, topic: str, user_side: str, theme: str, debate_history: List[Dict],
+                          cancel: Optional[CancelToken] = None, remember: bool = True) -> str:
+        """Rebuttal to the user's argument; remember=False keeps it out of the reuse index (speculative calls).
+        
+        last_rebuttal_source() then tells whether it was 'generated', 'reused' or a 'mock' fallback.
+        """
         theme_info = self.themes.get(theme, self.themes['objective'])
+        self._call_state.rebuttal_source = 'reused'
+        
+        if self.rebuttal_index is not None:
+            # Never repeat a rebuttal already used in this debate
+            used = [entry['message'] for entry in debate_history if entry['speaker'] == 'ai']
+            reuse = self.rebuttal_index.find(topic, user_side, theme, user_argument, exclude=used)
+            if reuse:
+                print(f"♻️ Reusing rebuttal for a near-duplicate argument (similarity {reuse[1]:.2f})")
+                return reuse[0]
         
         history_context = ""
         for entry in debate_history[-4:]:
             speaker = "Human" if entry['speaker'] == 'user' else "AI"
             history_context += f"{speaker}: {entry['message']}\n"
+        params = self.generation_params('rebuttal', theme)
         
         prompt = f"""
         {theme_info['personality']}
@@ -229,22 +571,68 @@ class DebateEngine:
         4. Making your own strong points
         5. Challenging them for their next response
         
-        Stay in character and keep response under 200 words.
+        Stay in character and keep response under {params['max_words']} words.
         Be engaging and match your personality perfectly!
         """
         
-        return self._get_ai_response(prompt)
+        response = self._get_ai_response(prompt, cancel=cancel, task='rebuttal', params=params)
+        self._call_state.rebuttal_source = 'mock' if self._call_state.mocked else 'generated'
+        if remember and not self._call_state.mocked:
+            self.remember_rebuttal(topic, user_side, theme, user_argument, response)
+        return response
     
-    def analyze_argument(self, argument: str, theme: str) -> Dict:
-        theme_info = self.themes.get(theme, self.themes['teacher'])
+    def last_call_mocked(self) -> bool:
+        """Whether this thread's last _get_ai_response() fell back to the canned mock reply"""
+        return getattr(self._call_state, 'mocked', False)
+    
+    def last_rebuttal_source(self) -> Optional[str]:
+        """Where this thread's last generate_response() reply came from"""
+        return getattr(self._call_state, 'rebuttal_source', None)
+    
+    def remember_rebuttal(self, topic: str, user_side: str, theme: str, user_argument: str, response: str):
+        """Make a rebuttal available for reuse on near-duplicate arguments"""
+        if self.rebuttal_index is not None:
+            self.rebuttal_index.add(topic, user_side, theme, user_argument, response)
+    
+    def summarize_debate(self, topic: str, user_side: str, theme: str, debate_history: List[Dict],
+                         cancel: Optional[CancelToken] = None) -> str:
+        theme_info = self.themes.get(theme, self.themes['objective'])
+        
+        transcript = ""
+        for entry in debate_history:
+            speaker = "Human" if entry['speaker'] == 'user' else "AI"
+            transcript += f"{speaker}: {entry['message']}\n"
+        params = self.generation_params('summary', theme)
         
         prompt = f"""
         {theme_info['personality']}
         
+        Debate Topic: "{topic}"
+        Human's Position: {user_side}
+        
+        Full Debate Transcript:
+        {transcript}
+        
+        Summarize this debate for the human:
+        1. The strongest argument each side made
+        2. Where the human's reasoning was weakest
+        3. Who won and why
+        
+        Stay in character and keep the summary under {params['max_words']} words.
+        """
+        
+        return self._get_ai_response(prompt, cancel=cancel, task='summary', params=params)
+    
+    def _analysis_prompt(self, argument: str, theme: str) -> str:
+        theme_info = self.themes.get(theme, self.themes['teacher'])
+        
+        return f"""
+        {theme_info['personality']}
+        
         Analyze this argument and provide detailed feedback:
         "{argument}"
         
-        Provide feedback in JSON format:
+        Respond with only a JSON object, no other text, in this format:
         {{
             "strengths": ["list of strong points"],
             "weaknesses": ["list of weak points"],
@@ -254,16 +642,171 @@ class DebateEngine:
             "overall_feedback": "summary feedback in your personality style"
         }}
         """
+    
+    def _record_analysis(self, parsed: bool):
+        with self._stats_lock:
+            self.analysis_stats['calls'] += 1
+            if parsed:
+                self.analysis_stats['parsed'] += 1
+            else:
+                self.analysis_stats['parse_failures'] += 1
+    
+    def get_analysis_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.analysis_stats)
+        stats['parse_failure_rate'] = stats['parse_failures'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+    
+    def parse_feedback(self, response: str) -> Optional[Dict]:
+        parser = IncrementalJSONParser()
+        parser.feed(response or "")
+        feedback, errors = validate_feedback(parser.close())
+        if errors:
+            print(f"⚠️ Analysis output rejected: {'; '.join(errors)}")
+        return feedback
+    
+    def analyze_argument(self, argument: str, theme: str, cancel: Optional[CancelToken] = None) -> Dict:
+        key = cache_key('analysis', theme, argument)
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            return dict(cached)
         
-        response = self._get_ai_response(prompt)
-        try:
-            return json.loads(response)
-        except:
-            return {
-                "strengths": ["Clear communication"],
-                "weaknesses": ["Could use more evidence"],
-                "fallacies": [],
-                "suggestions": ["Add more supporting facts"],
-                "grade": "B",
-                "overall_feedback": "Good effort! Keep practicing."
-            }
+        prompt = self._analysis_prompt(argument, theme)
+        
+        response = self._get_ai_response(prompt, json_mode=True, cancel=cancel, task='analysis')
+        feedback = self.parse_feedback(response)
+        self._record_analysis(feedback is not None)
+        
+        if feedback is None:
+            return dict(FALLBACK_FEEDBACK)
+        self.analysis_cache.set(key, feedback)
+        return dict(feedback)
+    
+    def _batch_analysis_prompt(self, arguments: List[str], theme: str) -> str:
+        theme_info = self.themes.get(theme, self.themes['teacher'])
+        
+        numbered = "\n".join(
+            f"ARGUMENT {i}: {json.dumps(argument)}" for i, argument in enumerate(arguments)
+        )
+        
+        return f"""
+        {theme_info['personality']}
+        
+        Analyze each of these {len(arguments)} arguments separately and provide detailed feedback:
+{numbered}
+        
+        Respond with only a JSON object, no other text, in this format:
+        {{
+            "results": [
+                {{
+                    "index": 0,
+                    "strengths": ["list of strong points"],
+                    "weaknesses": ["list of weak points"],
+                    "fallacies": ["any logical fallacies found"],
+                    "suggestions": ["how to improve"],
+                    "grade": "A-F grade",
+                    "overall_feedback": "summary feedback in your personality style"
+                }}
+            ]
+        }}
+        Include exactly one entry per argument, using the ARGUMENT number as "index".
+        """
+    
+    def _analyze_packed(self, arguments: List[str], theme: str, cancel: Optional[CancelToken] = None) -> Dict[int, Dict]:
+        # One analysis' worth of output per packed argument
+        params = self.generation_params('analysis', theme)
+        params['max_tokens'] = min(params['max_tokens'] * len(arguments), 8000)
+        response = self._get_ai_response(self._batch_analysis_prompt(arguments, theme), json_mode=True,
+                                         cancel=cancel, task='analysis_packed', params=params)
+        data = extract_first_json(response or "")
+        results = data.get('results') if isinstance(data, dict) else None
+        
+        parsed = {}
+        for position, entry in enumerate(results if isinstance(results, list) else []):
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get('index', position)
+            if not isinstance(index, int) or not 0 <= index < len(arguments) or index in parsed:
+                continue
+            feedback, errors = validate_feedback(entry)
+            if feedback is not None:
+                parsed[index] = feedback
+        
+        for index in range(len(arguments)):
+            self._record_analysis(index in parsed)
+        return parsed
+    
+    def analyze_arguments(self, arguments: List[str], theme: str, mode: str = 'packed',
+                          pack_size: int = 10, max_workers: int = 4,
+                          cancel: Optional[CancelToken] = None) -> List[Dict]:
+        """Analyze many arguments at once.
+        
+        'packed' sends up to pack_size arguments per prompt and splits the
+        results back out; anything the model drops is retried individually.
+        'concurrent' issues one call per argument with bounded parallelism.
+        Results are cached per argument either way. Once `cancel` is set
+        every call still running raises Cancelled.
+        """
+        results = [None] * len(arguments)
+        pending = {}
+        for i, argument in enumerate(arguments):
+            cached = self.analysis_cache.get(cache_key('analysis', theme, argument))
+            if cached is not None:
+                results[i] = dict(cached)
+            else:
+                pending.setdefault(argument, []).append(i)
+        
+        unique = list(pending)
+        analyzed = {}
+        
+        if mode == 'packed' and unique:
+            packs = [unique[i:i + pack_size] for i in range(0, len(unique), pack_size)]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for pack, parsed in zip(packs, executor.map(lambda p: self._analyze_packed(p, theme, cancel), packs)):
+                    for index, feedback in parsed.items():
+                        analyzed[pack[index]] = feedback
+                        self.analysis_cache.set(cache_key('analysis', theme, pack[index]), feedback)
+        
+        missing = [argument for argument in unique if argument not in analyzed]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for argument, feedback in zip(missing, executor.map(lambda a: self.analyze_argument(a, theme, cancel), missing)):
+                    analyzed[argument] = feedback
+        
+        for argument, indexes in pending.items():
+            for i in indexes:
+                results[i] = dict(analyzed[argument])
+        return results
+    
+    def analyze_argument_stream(self, argument: str, theme: str,
+                                cancel: Optional[CancelToken] = None) -> Iterator[Tuple[str, object]]:
+        """Yield ('field', (key, value)) as fields parse, then ('result'|'fallback', feedback)"""
+        key = cache_key('analysis', theme, argument)
+        cached = self.analysis_cache.get(key)
+        if cached is not None:
+            for field in cached.items():
+                yield 'field', field
+            yield 'result', dict(cached)
+            return
+        
+        prompt = self._analysis_prompt(argument, theme)
+        parser = IncrementalJSONParser()
+        
+        params = self.generation_params('analysis', theme)
+        for chunk in self._stream_ai_response(prompt, json_mode=True, cancel=cancel, params=params, task='analysis'):
+            for field, value in parser.feed(chunk):
+                value = validate_field(field, value)
+                if value is not None:
+                    yield 'field', (field, value)
+            if parser.done:
+                break
+        
+        feedback, errors = validate_feedback(parser.close())
+        self._record_analysis(feedback is not None)
+        
+        if feedback is None:
+            print(f"⚠️ Streamed analysis rejected: {'; '.join(errors)}")
+            yield 'fallback', dict(FALLBACK_FEEDBACK)
+        else:
+            self.analysis_cache.set(key, feedback)
+            yield 'result', feedback
@@ -0,0 +1,108 @@
+"""
+Production server: several worker processes sharing sessions, caches and jobs.
+
+    python serve.py --workers 4 [--threads 4] [--bind 0.0.0.0:5000] [--http]
+
+Uses gunicorn where it is available (Linux/macOS). Otherwise falls back to
+a single threaded process on Werkzeug, still without debug or reloader.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+# Shared state for every worker: server-side sessions, response cache, durable jobs
+DATA_DIR = os.getenv('DEBATE_DATA_DIR', 'data')
+os.environ.setdefault('JOB_QUEUE_DB', os.path.join(DATA_DIR, 'jobs.db'))
+os.environ['DEBATE_DEFER_WARMUP'] = '1'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run Rhetoric Arena in production mode")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count())))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '4')))
+    parser.add_argument('--bind', default=os.getenv('WEB_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--timeout', type=int, default=180, help="worker timeout, covers long transcriptions")
+    parser.add_argument('--http', action='store_true', help="serve plain HTTP even if cert.pem/key.pem exist")
+    return parser.parse_args()
+
+
+def post_worker_init(worker):
+    import app as debate_app
+    debate_app.warmup()
+
+
+def run_gunicorn(args, ssl_files):
+    from gunicorn.app.base import BaseApplication
+
+    class DebateServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported inside each worker so no engine, thread or connection crosses a fork
+            import app as debate_app
+            return debate_app.app
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'timeout': args.timeout,
+        'preload_app': False,
+        'reload': False,
+        'post_worker_init': post_worker_init,
+        'accesslog': '-',
+    }
+    if ssl_files:
+        options['certfile'], options['keyfile'] = ssl_files
+
+    print(f"🚀 Starting {args.workers} workers x {args.threads} threads on {args.bind}")
+    DebateServer(options).run()
+
+
+def run_werkzeug(args, ssl_files):
+    from werkzeug.serving import run_simple
+    import app as debate_app
+
+    debate_app.warmup()
+    host, _, port = args.bind.rpartition(':')
+    print(f"⚠️ gunicorn not available - single process on {args.bind}")
+    run_simple(
+        host or '0.0.0.0',
+        int(port),
+        debate_app.app,
+        threaded=True,
+        use_reloader=False,
+        use_debugger=False,
+        ssl_context=ssl_files
+    )
+
+
+def main():
+    args = parse_args()
+
+    ssl_files = None
+    if not args.http and os.path.exists('cert.pem') and os.path.exists('key.pem'):
+        ssl_files = ('cert.pem', 'key.pem')
+
+    try:
+        import gunicorn
+        use_gunicorn = sys.platform != 'win32'
+    except ImportError:
+        use_gunicorn = False
+
+    if use_gunicorn:
+        run_gunicorn(args, ssl_files)
+    else:
+        run_werkzeug(args, ssl_files)
+
+
+if __name__ == '__main__':
+    main()
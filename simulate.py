@@ -0,0 +1,116 @@
+"""
+Tournament mode: many AI-vs-scripted-user debates for evaluating themes and prompts offline.
+
+    python simulate.py --debates 2000 [--turns 3] [--concurrency 16] [--themes sassy,teacher]
+                       [--out results.jsonl] [--summary summary.json] [--mock [--mock-latency 0.3]]
+
+Each debate runs generate_opening, then generate_response and
+analyze_argument for every scripted argument. One JSON line per debate is
+appended to --out as it finishes; the per-theme tokens, latency and cost
+summary is printed at the end (and written to --summary).
+
+Uses the configured providers (see utils/api_keys.py) unless --mock is
+given, which serves an OpenAI-compatible endpoint locally and points the
+engine's Groq client at it. --record TAPE saves every provider call;
+--replay TAPE serves a saved run again offline, with its latencies scaled
+by --tape-scale (use the same --seed so the same prompts are sent).
+"""
+import argparse
+import json
+import os
+import sys
+
+from utils.opening_pool import load_catalog
+from utils.provider_tape import ProviderTape
+from utils.response_cache import LRUCache
+from utils.simulation import DEFAULT_PRICES, Tournament, plan_debates
+
+
+def parse_prices(specs):
+    """['groq=0.05:0.08'] -> {'groq': (0.05, 0.08)} on top of the defaults (USD per 1M tokens)"""
+    prices = dict(DEFAULT_PRICES)
+    for spec in specs or []:
+        provider, _, value = spec.partition('=')
+        price_in, _, price_out = value.partition(':')
+        prices[provider.strip()] = (float(price_in), float(price_out or price_in))
+    return prices
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run batch debates against real or mock providers")
+    parser.add_argument('--debates', type=int, default=100)
+    parser.add_argument('--turns', type=int, default=3, help="scripted user arguments per debate")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--themes', help="comma-separated, defaults to every theme on the start screen")
+    parser.add_argument('--topics', help="comma-separated, defaults to every topic on the start screen")
+    parser.add_argument('--out', default='simulation.jsonl')
+    parser.add_argument('--summary', help="also write the per-theme summary as JSON")
+    parser.add_argument('--price', action='append', metavar='PROVIDER=IN:OUT',
+                        help="USD per 1M input:output tokens, e.g. groq=0.05:0.08")
+    parser.add_argument('--cache', action='store_true', help="let repeated arguments hit the analysis cache")
+    parser.add_argument('--mock', action='store_true', help="use a local mock provider instead of real APIs")
+    parser.add_argument('--mock-latency', type=float, default=0.3, help="seconds per mock provider call")
+    parser.add_argument('--record', metavar='TAPE', help="record provider calls to TAPE (.jsonl or .jsonl.gz)")
+    parser.add_argument('--replay', metavar='TAPE', help="replay provider calls from TAPE instead of calling out")
+    parser.add_argument('--tape-scale', type=float, default=1.0, help="multiply replayed latencies (0 = instant)")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def build_engine(args):
+    if args.record or args.replay:
+        tape = ProviderTape(args.replay or args.record, 'replay' if args.replay else 'record', scale=args.tape_scale)
+        tape.install()
+    if args.mock and not args.replay:
+        from benchmarks.mock_llm import start_mock_groq_server
+        server = start_mock_groq_server(latency=args.mock_latency)
+        os.environ['GROQ_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+        api_keys = {'GROQ_API_KEY': 'mock'}
+    else:
+        from utils.api_keys import get_api_keys
+        api_keys = get_api_keys()
+
+    from debate_engine import DebateEngine
+    # Without --cache every scripted argument is analysed, so analysis cost is measured too
+    cache = LRUCache(max_size=4096 if args.cache else 0)
+    return DebateEngine(api_keys, analysis_cache=cache)
+
+
+def print_summary(summary):
+    print(f"\n🏆 {summary['debates']} debates in {summary['seconds']:.1f}s "
+          f"({summary['debates_per_hour']:.0f}/hour), total cost ${summary['cost']:.4f}")
+    print(f"{'theme':<12} {'debates':>7} {'fail':>5} {'tokens/debate':>13} {'$/debate':>10} "
+          f"{'debate p50':>10} {'p95':>7} {'reply p50':>9} {'p95':>7} {'analysis p50':>12} {'p95':>7}")
+    for theme, stats in summary['themes'].items():
+        print(f"{theme:<12} {stats['debates']:>7} {stats['failures']:>5} {stats['tokens_per_debate']:>13.0f} "
+              f"{stats['cost_per_debate']:>10.6f} {stats['debate_p50']:>10.2f} {stats['debate_p95']:>7.2f} "
+              f"{stats['response_p50']:>9.2f} {stats['response_p95']:>7.2f} "
+              f"{stats['analysis_p50']:>12.2f} {stats['analysis_p95']:>7.2f}")
+
+
+def main():
+    args = parse_args()
+    root = os.path.dirname(os.path.abspath(__file__))
+    catalog = load_catalog(os.path.join(root, 'templates', 'index.html'))
+    topics = args.topics.split(',') if args.topics else catalog['topics']
+    themes = args.themes.split(',') if args.themes else catalog['themes']
+    if not topics or not themes:
+        sys.exit("❌ No topics or themes to simulate")
+
+    engine = build_engine(args)
+    tournament = Tournament(engine, turns=args.turns, concurrency=args.concurrency,
+                            prices=parse_prices(args.price), seed=args.seed)
+    print(f"🎬 Simulating {args.debates} debates x {args.turns} turns over {len(themes)} themes "
+          f"with {args.concurrency} workers -> {args.out}")
+
+    with open(args.out, 'w', encoding='utf-8') as out:
+        summary = tournament.run(plan_debates(args.debates, topics, themes, seed=args.seed), out)
+
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,13 +6,30 @@ class DebateApp {
     this.isRecording = false
     this.mediaRecorder = null
     this.audioChunks = []
+    this.recordingId = null
+    this.uploadChain = Promise.resolve()
+    this.chunkUploadFailed = false
+    this.releasedAt = null
     this.voiceStatus = null
+    // X-Request-Id of this tab's requests still in flight, cancelled by the page-close beacon
+    this.inFlight = new Set()
 
     this.initializeEventListeners()
     this.checkVoiceStatus()
     this.checkBrowserCompatibility()
   }
 
+  newId() {
+    return window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`
+  }
+
+  request(url, options = {}) {
+    const requestId = this.newId()
+    this.inFlight.add(requestId)
+    const headers = { ...(options.headers || {}), "X-Request-Id": requestId }
+    return fetch(url, { ...options, headers }).finally(() => this.inFlight.delete(requestId))
+  }
+
   checkBrowserCompatibility() {
     console.log("🔍 Checking browser compatibility...")
     console.log("Navigator:", !!navigator)
@@ -143,6 +160,13 @@ class DebateApp {
     document.getElementById("reset-debate").addEventListener("click", () => {
       this.resetDebate()
     })
+
+    // Closing the tab stops the server's in-flight AI calls for this tab's requests (not other tabs')
+    window.addEventListener("pagehide", () => {
+      if (!navigator.sendBeacon || !this.inFlight.size) return
+      const body = JSON.stringify({ request_ids: [...this.inFlight] })
+      navigator.sendBeacon("/cancel", new Blob([body], { type: "application/json" }))
+    })
   }
 
   selectTopic(topic) {
@@ -208,7 +232,7 @@ class DebateApp {
     this.showLoading(true)
 
     try {
-      const response = await fetch("/start_debate", {
+      const response = await this.request("/start_debate", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -232,7 +256,7 @@ class DebateApp {
 
         this.addMessage("ai", data.ai_response)
 
-        this.enableTTS(data.ai_response, data.theme)
+        this.enableTTS(data.ai_response, data.theme, data.audio)
       }
     } catch (error) {
       console.error("Error starting debate:", error)
@@ -253,23 +277,35 @@ class DebateApp {
 
     this.showLoading(true)
 
-    try {
-      const response = await fetch("/submit_argument", {
+    // Sent again on retry so the server answers a duplicate with the original response
+    const idempotencyKey = this.newId()
+    const send = () =>
+      this.request("/submit_argument", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKey,
         },
         body: JSON.stringify({
           argument: argument,
         }),
       })
 
+    try {
+      let response
+      try {
+        response = await send()
+      } catch (networkError) {
+        console.warn("Retrying argument submission:", networkError)
+        response = await send()
+      }
+
       const data = await response.json()
 
       if (data.success) {
         this.addMessage("ai", data.ai_response)
 
-        this.enableTTS(data.ai_response, data.theme)
+        this.enableTTS(data.ai_response, data.theme, data.audio)
       }
     } catch (error) {
       console.error("Error submitting argument:", error)
@@ -460,12 +496,14 @@ class DebateApp {
       console.log("📹 MediaRecorder state:", this.mediaRecorder.state)
 
       this.audioChunks = []
+      this.beginChunkedUpload(mimeType)
 
       // Set up event handlers
       this.mediaRecorder.ondataavailable = (event) => {
         console.log("📊 Data available:", event.data.size, "bytes")
         if (event.data && event.data.size > 0) {
           this.audioChunks.push(event.data)
+          this.queueChunkUpload(this.audioChunks.length - 1)
         }
       }
 
@@ -535,10 +573,12 @@ class DebateApp {
         try {
           this.mediaRecorder = new MediaRecorder(stream)
           this.audioChunks = []
+          this.beginChunkedUpload(this.mediaRecorder.mimeType)
 
           this.mediaRecorder.ondataavailable = (event) => {
             if (event.data && event.data.size > 0) {
               this.audioChunks.push(event.data)
+              this.queueChunkUpload(this.audioChunks.length - 1)
             }
           }
 
@@ -606,6 +646,7 @@ class DebateApp {
     }
 
     console.log("⏹️ Stopping recording...")
+    this.releasedAt = performance.now()
 
     try {
       if (this.mediaRecorder.state === "recording") {
@@ -656,17 +697,26 @@ class DebateApp {
     this.showLoading(true)
 
     try {
-      // Create blob from chunks
-      const audioBlob = new Blob(this.audioChunks, { type: "audio/wav" })
+      // Most of the audio is already on the server; this only seals it and transcribes
+      const chunked = await this.finishChunkedUpload()
+      if (chunked) {
+        this.showTranscription(chunked)
+        this.showLoading(false)
+        return
+      }
+
+      // Label the blob with what MediaRecorder actually produced; the server sniffs it anyway
+      const mimeType = this.mediaRecorder?.mimeType || this.audioChunks[0].type || "audio/webm"
+      const audioBlob = new Blob(this.audioChunks, { type: mimeType })
       console.log("📦 Created audio blob:", audioBlob.size, "bytes, type:", audioBlob.type)
 
       // Create form data
       const formData = new FormData()
-      formData.append("audio", audioBlob, "recording.wav")
+      formData.append("audio", audioBlob, `recording.${this.extensionFor(mimeType)}`)
 
       console.log("📤 Sending audio for transcription...")
 
-      const response = await fetch("/transcribe_audio", {
+      const response = await this.request("/transcribe_audio", {
         method: "POST",
         body: formData,
       })
@@ -674,16 +724,8 @@ class DebateApp {
       console.log("📥 Transcription response status:", response.status)
 
       const data = await response.json()
-      console.log("📝 Transcription result:", data)
-
-      if (data.success && data.transcription) {
-        document.getElementById("argument-input").value = data.transcription
-        this.addMessage("system", `🎤 Transcribed: "${data.transcription}"`)
-        console.log("✅ Transcription successful:", data.transcription)
-      } else {
-        console.error("❌ Transcription failed:", data)
-        this.addMessage("system", "❌ Transcription failed. Please try again or type your argument.")
-      }
+      console.log(`⏱️ Release to transcript: ${(performance.now() - this.releasedAt).toFixed(0)} ms (single upload)`)
+      this.showTranscription(data)
     } catch (error) {
       console.error("❌ Error processing recording:", error)
       this.addMessage("system", "❌ Recording processing failed. Please try again.")
@@ -692,13 +734,121 @@ class DebateApp {
     this.showLoading(false)
   }
 
-  async enableTTS(text, theme) {
+  showTranscription(data) {
+    console.log("📝 Transcription result:", data)
+
+    if (data.success && data.transcription) {
+      document.getElementById("argument-input").value = data.transcription
+      this.addMessage("system", `🎤 Transcribed: "${data.transcription}"`)
+      console.log("✅ Transcription successful:", data.transcription)
+    } else {
+      console.error("❌ Transcription failed:", data)
+      this.addMessage("system", "❌ Transcription failed. Please try again or type your argument.")
+    }
+  }
+
+  // Chunked upload: every MediaRecorder chunk is sent while recording continues
+  beginChunkedUpload(mimeType) {
+    this.recordingId = null
+    this.chunkUploadFailed = false
+    this.uploadChain = fetch("/recordings", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ mime_type: mimeType || "" }),
+    })
+      .then((response) => response.json())
+      .then((data) => {
+        this.recordingId = data.recording_id
+      })
+      .catch((error) => {
+        console.warn("⚠️ Chunked upload unavailable, will send the whole recording:", error)
+        this.chunkUploadFailed = true
+      })
+  }
+
+  queueChunkUpload(index) {
+    this.uploadChain = this.uploadChain.then(() => this.uploadChunk(index))
+  }
+
+  async uploadChunk(index) {
+    for (let attempt = 0; attempt < 4; attempt++) {
+      if (this.chunkUploadFailed || !this.recordingId) return
+
+      try {
+        const response = await fetch(`/recordings/${this.recordingId}/chunks/${index}`, {
+          method: "PUT",
+          body: this.audioChunks[index],
+        })
+        if (response.ok) return
+
+        if (response.status === 409) {
+          // An earlier request was aborted - resume from the chunk the server has not seen
+          const data = await response.json()
+          for (let missing = data.next_index; missing < index; missing++) {
+            await this.uploadChunk(missing)
+          }
+          continue
+        }
+      } catch (error) {
+        console.warn(`⚠️ Chunk ${index} upload failed (attempt ${attempt + 1}):`, error)
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, 500 * (attempt + 1)))
+    }
+
+    this.chunkUploadFailed = true
+  }
+
+  async finishChunkedUpload() {
+    await this.uploadChain
+    if (this.chunkUploadFailed || !this.recordingId) return null
+
+    try {
+      const response = await this.request(`/recordings/${this.recordingId}/finish`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({ total_chunks: this.audioChunks.length }),
+      })
+      if (!response.ok) return null
+
+      const data = await response.json()
+      console.log(
+        `⏱️ Release to transcript: ${(performance.now() - this.releasedAt).toFixed(0)} ms (chunked upload)`,
+        data.timings,
+      )
+      return data
+    } catch (error) {
+      console.warn("⚠️ Finishing chunked upload failed:", error)
+      return null
+    }
+  }
+
+  extensionFor(mimeType) {
+    if (mimeType.includes("webm")) return "webm"
+    if (mimeType.includes("ogg")) return "ogg"
+    if (mimeType.includes("mp4")) return "m4a"
+    if (mimeType.includes("wav")) return "wav"
+    return "bin"
+  }
+
+  async enableTTS(text, theme, audio) {
     if (!this.voiceStatus?.tts_available) {
       return
     }
 
+    // The server starts synthesis as soon as the reply exists; use it if it already finished
+    if (audio?.status === "ready" && audio.audio_path) {
+      this.showPlayButton(audio.audio_path)
+      return
+    }
+
     try {
-      const response = await fetch("/text_to_speech", {
+      // For a pending speculative job this attaches to the running synthesis
+      const response = await this.request("/text_to_speech", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -712,19 +862,26 @@ class DebateApp {
       const data = await response.json()
 
       if (data.success && data.audio_path) {
-        const playBtn = document.getElementById("play-ai-response")
-        playBtn.classList.remove("hidden")
-
-        playBtn.onclick = () => {
-          const audio = new Audio(data.audio_path)
-          audio.play()
-        }
+        this.showPlayButton(data.audio_path)
       }
     } catch (error) {
       console.error("TTS error:", error)
     }
   }
 
+  showPlayButton(audioPath) {
+    const playBtn = document.getElementById("play-ai-response")
+    playBtn.classList.remove("hidden")
+
+    // One element per reply: replays rewind it instead of fetching the file again
+    const audio = new Audio(audioPath)
+
+    playBtn.onclick = () => {
+      audio.currentTime = 0
+      audio.play()
+    }
+  }
+
   async resetDebate() {
     if (confirm("Are you sure you want to start a new debate?")) {
       try {
@@ -1,6 +1,10 @@
 import os
 from typing import Dict
 
+from utils import provider_tape
+
+TAPE_PROVIDER_KEYS = {'groq': 'GROQ_API_KEY', 'gemini': 'GEMINI_API_KEY', 'assemblyai': 'ASSEMBLYAI_API_KEY'}
+
 def get_api_keys() -> Dict[str, str]:
     
     api_keys = {}
@@ -25,5 +29,13 @@ def get_api_keys() -> Dict[str, str]:
         print("⚠️  API keys config file not found. Create utils/api_keys_config.py")
         print("📝 See utils/api_keys_config_template.py for template")
     
+    # Replaying recorded provider calls needs no real keys, only the providers enabled
+    tape = provider_tape.active()
+    if tape is not None and tape.replaying:
+        for provider in tape.providers():
+            key = TAPE_PROVIDER_KEYS.get(provider)
+            if key and not api_keys.get(key):
+                api_keys[key] = 'replay'
+    
     # Filter out None values
     return {k: v for k, v in api_keys.items() if v}
\ No newline at end of file
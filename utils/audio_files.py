@@ -0,0 +1,91 @@
+"""
+Serving synthesized audio: strong ETags, long-lived caching, byte ranges and sendfile
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict
+
+from flask import send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+# voice_python313 names files after a hash of theme, voice and text and never rewrites them
+CONTENT_ADDRESSED = re.compile(r'^ai_response_[0-9a-f]{20}\.wav$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+AUDIO_DIR = os.path.join('static', 'audio')
+AUDIO_URL_PREFIX = '/audio/'
+
+
+def local_path(audio_url: str) -> str:
+    """File behind an audio URL: /audio/x.wav, or /static/audio/x.wav from before /audio existed"""
+    if audio_url.startswith(AUDIO_URL_PREFIX):
+        return os.path.join(AUDIO_DIR, audio_url[len(AUDIO_URL_PREFIX):])
+    return audio_url.lstrip('/')
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AudioFiles:
+    """Sends files out of the audio directory with HTTP caching done properly.
+
+    The ETag is the file's content hash (computed once per file version),
+    so If-None-Match revalidations and If-Range resumes are exact.
+    Content-addressed files are marked immutable for a year; anything else
+    must revalidate. Werkzeug answers Range requests with 206 and hands
+    whole-file responses to the server's file wrapper, which gunicorn turns
+    into sendfile().
+    """
+
+    def __init__(self, directory: str = AUDIO_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.totals = {'requests': 0, 'full': 0, 'partial': 0, 'not_modified': 0, 'not_found': 0, 'bytes': 0}
+
+    def send(self, filename: str):
+        path = safe_join(self.directory, filename)
+        if path is None or not os.path.isfile(path):
+            self._count('not_found')
+            raise NotFound()
+        st = os.stat(path)
+
+        immutable = bool(CONTENT_ADDRESSED.match(os.path.basename(path)))
+        response = send_file(
+            path,
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            conditional=True,
+            etag=_content_hash(path, st.st_mtime_ns, st.st_size),
+            last_modified=st.st_mtime,
+            max_age=IMMUTABLE_MAX_AGE if immutable else 0
+        )
+        if immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+
+        kind = {200: 'full', 206: 'partial', 304: 'not_modified'}.get(response.status_code)
+        self._count(kind, response.content_length or 0)
+        return response
+
+    def _count(self, kind: str, sent: int = 0):
+        with self._lock:
+            self.totals['requests'] += 1
+            if kind:
+                self.totals[kind] += 1
+            self.totals['bytes'] += sent
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+        stats['hash_cache'] = _content_hash.cache_info()._asdict()
+        return stats
@@ -0,0 +1,346 @@
+"""
+Streaming decode -> downmix -> resample -> encode for uploaded recordings.
+
+Browsers send MediaRecorder output (usually WebM/Opus) whatever the form
+field says. This stage sniffs the real container, decodes it in chunks,
+downmixes and resamples with NumPy and writes a compact 16 kHz mono file,
+so memory stays flat no matter how long the recording is.
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDFILE_AVAILABLE = False
+
+TARGET_RATE = 16000
+CHUNK_FRAMES = 32768
+
+EXTENSIONS = {
+    'wav': '.wav',
+    'webm': '.webm',
+    'ogg': '.ogg',
+    'mp4': '.m4a',
+    'flac': '.flac',
+    'mp3': '.mp3',
+    'unknown': '.bin'
+}
+
+
+def detect_container(header: bytes) -> str:
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    if header[:3] == b'ID3' or header[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2'):
+        return 'mp3'
+    return 'unknown'
+
+
+def sniff_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return detect_container(f.read(16))
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+class StreamingResampler:
+    """Windowed-sinc low-pass followed by linear interpolation, chunk by chunk.
+
+    Filter history and the fractional read position carry across calls, so
+    feeding a signal in pieces gives the same output as feeding it whole.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_RATE, taps: int = 63):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.step = src_rate / dst_rate
+        self.pos = 0.0
+        self.prev = None
+
+        if src_rate > dst_rate:
+            cutoff = 0.45 * dst_rate / src_rate
+            n = np.arange(taps) - (taps - 1) / 2
+            kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+            self.kernel = (kernel / kernel.sum()).astype(np.float32)
+            self.history = np.zeros(taps - 1, dtype=np.float32)
+        else:
+            self.kernel = None
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.src_rate == self.dst_rate or not len(samples):
+            return samples
+
+        if self.kernel is not None:
+            padded = np.concatenate((self.history, samples))
+            samples = np.convolve(padded, self.kernel, mode='valid').astype(np.float32)
+            self.history = padded[-(len(self.kernel) - 1):]
+
+        if self.prev is not None:
+            samples = np.concatenate(([self.prev], samples))
+
+        n = len(samples)
+        count = int(np.ceil((n - 1 - self.pos) / self.step)) if n - 1 > self.pos else 0
+        positions = self.pos + np.arange(count) * self.step
+        out = np.interp(positions, np.arange(n), samples).astype(np.float32)
+
+        self.pos = self.pos + count * self.step - (n - 1)
+        self.prev = samples[-1]
+        return out
+
+
+def downmix(frames: np.ndarray, channels: int) -> np.ndarray:
+    if channels == 1:
+        return frames
+    return frames.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+def _pcm_to_float(raw: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    if sample_width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (data[:, 0].astype(np.int32) | (data[:, 1].astype(np.int32) << 8)
+                | (data[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608
+    if sample_width == 4:
+        return np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    raise ValueError(f"Unsupported sample width: {sample_width}")
+
+
+def _decode_wav(path: str) -> Tuple[int, int, Iterator[np.ndarray]]:
+    reader = wave.open(path, 'rb')
+    rate, channels, width = reader.getframerate(), reader.getnchannels(), reader.getsampwidth()
+
+    def chunks():
+        try:
+            while True:
+                raw = reader.readframes(CHUNK_FRAMES)
+                if not raw:
+                    break
+                yield _pcm_to_float(raw, width)
+        finally:
+            reader.close()
+
+    return rate, channels, chunks()
+
+
+def _decode_ffmpeg(path: str) -> Tuple[int, int, Iterator[np.ndarray]]:
+    probe = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+         '-show_entries', 'stream=sample_rate,channels', '-of', 'json', path],
+        capture_output=True, text=True, timeout=30
+    )
+    stream = json.loads(probe.stdout or '{}').get('streams', [{}])[0]
+    rate = int(stream.get('sample_rate', 48000))
+    channels = int(stream.get('channels', 1))
+
+    process = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', path, '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+    def chunks():
+        frame_bytes = 2 * channels
+        try:
+            while True:
+                raw = process.stdout.read(CHUNK_FRAMES * frame_bytes)
+                if not raw:
+                    break
+                raw = raw[:len(raw) - len(raw) % frame_bytes]
+                yield _pcm_to_float(raw, 2)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    return rate, channels, chunks()
+
+
+class _WavWriter:
+    def __init__(self, path: str, rate: int):
+        self.writer = wave.open(path, 'wb')
+        self.writer.setnchannels(1)
+        self.writer.setsampwidth(2)
+        self.writer.setframerate(rate)
+
+    def write(self, samples: np.ndarray):
+        self.writer.writeframes((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+
+    def close(self):
+        self.writer.close()
+
+
+class _FlacWriter:
+    def __init__(self, path: str, rate: int):
+        self.writer = sf.SoundFile(path, 'w', samplerate=rate, channels=1, format='FLAC', subtype='PCM_16')
+
+    def write(self, samples: np.ndarray):
+        self.writer.write(np.clip(samples, -1, 1))
+
+    def close(self):
+        self.writer.close()
+
+
+class _OpusWriter:
+    """Pipes resampled PCM into ffmpeg's Opus encoder - smallest upload"""
+
+    def __init__(self, path: str, rate: int, bitrate: str = '24k'):
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-v', 'error', '-y', '-f', 's16le', '-ar', str(rate), '-ac', '1', '-i', 'pipe:0',
+             '-c:a', 'libopus', '-b:a', bitrate, '-application', 'voip', path],
+            stdin=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    def write(self, samples: np.ndarray):
+        self.process.stdin.write((np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes())
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError("ffmpeg opus encode failed")
+
+
+class AudioNormalizer:
+    def __init__(self, target_rate: int = TARGET_RATE):
+        self.target_rate = target_rate
+        self._lock = threading.Lock()
+        self.totals = {
+            'files': 0, 'failures': 0, 'skipped': 0,
+            'input_bytes': 0, 'output_bytes': 0,
+            'audio_seconds': 0.0, 'cpu_seconds': 0.0
+        }
+
+    def default_format(self) -> str:
+        if ffmpeg_available():
+            return 'opus'
+        if SOUNDFILE_AVAILABLE:
+            return 'flac'
+        return 'wav'
+
+    def can_decode(self, container: str) -> bool:
+        return container == 'wav' or (container != 'unknown' and ffmpeg_available())
+
+    def normalize(self, src_path: str, fmt: Optional[str] = None, dst_path: Optional[str] = None) -> Optional[Dict]:
+        """Write a 16 kHz mono copy of src_path. Returns None if it can't be decoded here.
+
+        fmt is 'opus' (smallest, for uploads), 'flac' or 'wav' (for decoders
+        such as SpeechRecognition that need PCM).
+        """
+        container = sniff_file(src_path)
+        fmt = fmt or self.default_format()
+        if fmt == 'opus' and not ffmpeg_available():
+            fmt = 'flac' if SOUNDFILE_AVAILABLE else 'wav'
+        if fmt == 'flac' and not SOUNDFILE_AVAILABLE:
+            fmt = 'wav'
+
+        if not self.can_decode(container):
+            with self._lock:
+                self.totals['skipped'] += 1
+            print(f"⚠️ Cannot decode {container} audio without ffmpeg - using original upload")
+            return None
+
+        extension = {'opus': '.ogg', 'flac': '.flac', 'wav': '.wav'}[fmt]
+        dst_path = dst_path or os.path.splitext(src_path)[0] + f'.16k{extension}'
+
+        cpu_start = time.process_time()
+        children_start = os.times()
+        wall_start = time.perf_counter()
+        output_samples = 0
+        try:
+            if container == 'wav':
+                rate, channels, chunks = _decode_wav(src_path)
+            else:
+                rate, channels, chunks = _decode_ffmpeg(src_path)
+
+            resampler = StreamingResampler(rate, self.target_rate)
+            writer = {'opus': _OpusWriter, 'flac': _FlacWriter, 'wav': _WavWriter}[fmt](dst_path, self.target_rate)
+            try:
+                for chunk in chunks:
+                    mono = resampler.process(downmix(chunk, channels))
+                    output_samples += len(mono)
+                    writer.write(mono)
+            finally:
+                writer.close()
+        except Exception as e:
+            print(f"❌ Audio normalization failed: {e}")
+            with self._lock:
+                self.totals['failures'] += 1
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            return None
+
+        children_end = os.times()
+        cpu_seconds = (time.process_time() - cpu_start
+                       + (children_end.children_user - children_start.children_user)
+                       + (children_end.children_system - children_start.children_system))
+        duration = output_samples / self.target_rate
+
+        result = {
+            'path': dst_path,
+            'container': container,
+            'format': fmt,
+            'input_bytes': os.path.getsize(src_path),
+            'output_bytes': os.path.getsize(dst_path),
+            'duration': duration,
+            'cpu_seconds': cpu_seconds,
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_per_audio_second': cpu_seconds / duration if duration else 0.0
+        }
+
+        with self._lock:
+            self.totals['files'] += 1
+            self.totals['input_bytes'] += result['input_bytes']
+            self.totals['output_bytes'] += result['output_bytes']
+            self.totals['audio_seconds'] += duration
+            self.totals['cpu_seconds'] += cpu_seconds
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+        stats['size_reduction'] = 1 - stats['output_bytes'] / stats['input_bytes'] if stats['input_bytes'] else 0.0
+        stats['cpu_per_audio_second'] = (stats['cpu_seconds'] / stats['audio_seconds']
+                                         if stats['audio_seconds'] else 0.0)
+        stats['ffmpeg_available'] = ffmpeg_available()
+        stats['default_format'] = self.default_format()
+        return stats
+
+
+@contextmanager
+def pcm_audio(path: str, normalizer: Optional[AudioNormalizer] = None):
+    """Yield a WAV/FLAC path for decoders like sr.AudioFile that can't read WebM/Opus"""
+    if sniff_file(path) in ('wav', 'flac'):
+        yield path
+        return
+
+    normalized = (normalizer or AudioNormalizer()).normalize(path, fmt='flac' if SOUNDFILE_AVAILABLE else 'wav')
+    if normalized is None:
+        yield path
+        return
+    try:
+        yield normalized['path']
+    finally:
+        if os.path.exists(normalized['path']):
+            os.remove(normalized['path'])
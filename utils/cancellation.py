@@ -0,0 +1,223 @@
+"""
+Cancellation tokens for provider calls whose requester has gone away
+"""
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+class Cancelled(BaseException):
+    """Raised where a cancelled token aborts work.
+
+    A BaseException (like asyncio.CancelledError) so the provider fallbacks'
+    `except Exception` handlers don't swallow it and retry another provider.
+    """
+
+
+class CancelToken(threading.Event):
+    """An Event that also records why it was set and notifies children.
+
+    Poll loops can keep using is_set() and wait(); blocking calls go
+    through run_cancellable(). child() tokens are cancelled with their
+    parent but can also be cancelled on their own.
+    """
+
+    def __init__(self, parent: Optional['CancelToken'] = None):
+        super().__init__()
+        self.reason = None
+        self.cancelled_at = None
+        self.request_id = None
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+        if parent is not None:
+            parent.on_cancel(lambda: self.cancel(parent.reason))
+
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        with self._callbacks_lock:
+            if self.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.time()
+            callbacks, self._callbacks = self._callbacks, []
+            super().set()
+        for callback in callbacks:
+            callback()
+        return True
+
+    def set(self):
+        self.cancel()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call `callback` once when cancelled (now, if already). Returns a function that unregisters it."""
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def child(self) -> 'CancelToken':
+        return CancelToken(parent=self)
+
+    def raise_if_cancelled(self):
+        if self.is_set():
+            raise Cancelled(self.reason)
+
+
+def run_cancellable(fn: Callable, cancel: Optional[CancelToken], *args, **kwargs):
+    """fn(*args, **kwargs), or Cancelled as soon as `cancel` is set.
+
+    The call runs on a helper thread so the caller is freed immediately;
+    an abandoned call finishes in the background and its result is dropped.
+    """
+    if cancel is None:
+        return fn(*args, **kwargs)
+    cancel.raise_if_cancelled()
+
+    done = threading.Event()
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            done.set()
+
+    unregister = cancel.on_cancel(done.set)
+    try:
+        threading.Thread(target=target, daemon=True).start()
+        done.wait()
+    finally:
+        unregister()
+    if 'error' in outcome:
+        raise outcome['error']
+    if 'result' not in outcome:
+        raise Cancelled(cancel.reason)
+    return outcome['result']
+
+
+class CancelRegistry:
+    """Live tokens by key (the debate id), so /reset_debate can cancel a debate's in-flight work.
+
+    A token opened with a request id (sent by the client) can also be
+    cancelled on its own, so one tab can stop its requests without
+    touching another tab's requests on the same debate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._requests = {}
+        self.totals = {'opened': 0, 'cancelled': 0, 'abort_seconds': 0.0}
+        self.reasons = {}
+
+    def open(self, key: str, request_id: Optional[str] = None) -> CancelToken:
+        token = CancelToken()
+        token.request_id = request_id
+        with self._lock:
+            self._tokens.setdefault(key, set()).add(token)
+            if request_id:
+                self._requests[request_id] = token
+            self.totals['opened'] += 1
+        return token
+
+    def close(self, key: str, token: CancelToken):
+        with self._lock:
+            tokens = self._tokens.get(key)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens[key]
+            if token.request_id and self._requests.get(token.request_id) is token:
+                del self._requests[token.request_id]
+            if token.is_set():
+                self.totals['cancelled'] += 1
+                # How long the request kept its worker after being cancelled
+                self.totals['abort_seconds'] += time.time() - token.cancelled_at
+                self.reasons[token.reason] = self.reasons.get(token.reason, 0) + 1
+
+    def cancel(self, key: str, reason: str = 'cancelled') -> int:
+        with self._lock:
+            tokens = list(self._tokens.get(key, ()))
+        return sum(1 for token in tokens if token.cancel(reason))
+
+    def cancel_requests(self, request_ids: Iterable[str], reason: str = 'cancelled') -> int:
+        with self._lock:
+            tokens = [self._requests[request_id] for request_id in request_ids if request_id in self._requests]
+        return sum(1 for token in tokens if token.cancel(reason))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+            stats['live'] = sum(len(tokens) for tokens in self._tokens.values())
+            stats['reasons'] = dict(self.reasons)
+        stats['avg_abort_ms'] = stats['abort_seconds'] / stats['cancelled'] * 1000 if stats['cancelled'] else 0.0
+        return stats
+
+
+def request_socket(environ: Dict) -> Optional[socket.socket]:
+    """The client connection of a WSGI request, where the server exposes it (not for TLS)"""
+    sock = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if not isinstance(sock, socket.socket) or isinstance(sock, ssl.SSLSocket):
+        return None
+    return sock
+
+
+class DisconnectWatcher:
+    """Cancels a request's token when its client closes the connection.
+
+    One background thread checks every watched socket each `interval`: a
+    socket that is readable but has nothing to peek at has been closed by
+    the client (tab closed, fetch aborted, client timeout).
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._watched = {}
+        self._thread = None
+        self.disconnects = 0
+
+    def watch(self, sock: socket.socket, token: CancelToken):
+        with self._lock:
+            self._watched[sock] = token
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='disconnect-watcher', daemon=True)
+                self._thread.start()
+
+    def unwatch(self, sock: socket.socket):
+        with self._lock:
+            self._watched.pop(sock, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                watched = dict(self._watched)
+            if not watched:
+                continue
+            try:
+                readable, _, _ = select.select(list(watched), [], [], 0)
+            except (OSError, ValueError):
+                readable = [sock for sock in watched if sock.fileno() < 0]
+            for sock in readable:
+                try:
+                    closed = sock.fileno() < 0 or sock.recv(1, socket.MSG_PEEK) == b''
+                except (BlockingIOError, InterruptedError):
+                    closed = False
+                except OSError:
+                    closed = True
+                if closed:
+                    self.unwatch(sock)
+                    if watched[sock].cancel('disconnected'):
+                        self.disconnects += 1
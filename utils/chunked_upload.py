@@ -0,0 +1,205 @@
+"""
+Chunked, resumable uploads of recordings while the user is still speaking
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker process, the thread lock is enough
+    fcntl = None
+
+RECORDING_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class RecordingUploads:
+    """Per-recording append-only buffers on disk.
+
+    Chunks must arrive in index order; a chunk that was already stored is
+    acknowledged again (so client retries are harmless) and a gap is
+    rejected with the index the client should resume from. State lives in
+    a small JSON file next to the data, so any worker process can accept
+    the next chunk or report status; updates hold an flock on the data
+    file, so a retry landing on another worker waits for the first attempt
+    instead of appending the chunk a second time. A chunk that would take
+    the recording past max_bytes is refused.
+    """
+
+    def __init__(self, directory: str = os.path.join('temp', 'recordings'), ttl: float = 3600,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.totals = {'recordings': 0, 'streamed_uploads': 0, 'finish_to_transcript_seconds': 0.0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, recording_id: str):
+        if not RECORDING_ID.match(recording_id or ''):
+            raise KeyError(recording_id)
+        base = os.path.join(self.directory, recording_id)
+        return base + '.part', base + '.json'
+
+    def _lock(self, recording_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(recording_id, threading.Lock())
+
+    @contextmanager
+    def _locked(self, recording_id: str):
+        """Exclusive access to one recording across threads and worker processes"""
+        data_path, _ = self._paths(recording_id)
+        with self._lock(recording_id):
+            if fcntl is None:
+                yield
+                return
+            try:
+                f = open(data_path, 'rb')
+            except FileNotFoundError:
+                raise KeyError(recording_id)
+            with f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                yield
+
+    def _read_meta(self, recording_id: str) -> Dict:
+        _, meta_path = self._paths(recording_id)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(recording_id)
+
+    def _write_meta(self, recording_id: str, meta: Dict):
+        _, meta_path = self._paths(recording_id)
+        partial = f"{meta_path}.{uuid.uuid4().hex[:8]}"
+        with open(partial, 'w') as f:
+            json.dump(meta, f)
+        os.replace(partial, meta_path)
+
+    def create(self, debate_id: str, mime_type: str = '') -> Dict:
+        recording_id = uuid.uuid4().hex
+        data_path, _ = self._paths(recording_id)
+        open(data_path, 'wb').close()
+        meta = {
+            'id': recording_id,
+            'debate_id': debate_id,
+            'mime_type': mime_type,
+            'next_index': 0,
+            'bytes': 0,
+            'finished': False,
+            'created_at': time.time(),
+            'updated_at': time.time(),
+            'finished_at': None,
+            'upload_url': None,
+            'streaming_upload': False
+        }
+        self._write_meta(recording_id, meta)
+        return meta
+
+    def append(self, recording_id: str, index: int, data: bytes) -> Dict:
+        """Store chunk `index`. Returns the meta; 'accepted' is False on a gap, and
+        'too_large' is set when the chunk would exceed max_bytes."""
+        data_path, _ = self._paths(recording_id)
+        with self._locked(recording_id):
+            meta = self._read_meta(recording_id)
+            if meta['finished'] or index > meta['next_index']:
+                return dict(meta, accepted=False)
+            if index < meta['next_index']:
+                return dict(meta, accepted=True, duplicate=True)
+            if meta['bytes'] + len(data) > self.max_bytes:
+                return dict(meta, accepted=False, too_large=True)
+
+            with open(data_path, 'ab') as f:
+                f.write(data)
+            meta['next_index'] += 1
+            meta['bytes'] += len(data)
+            meta['updated_at'] = time.time()
+            self._write_meta(recording_id, meta)
+            return dict(meta, accepted=True)
+
+    def status(self, recording_id: str) -> Dict:
+        return self._read_meta(recording_id)
+
+    def update(self, recording_id: str, **fields) -> Dict:
+        with self._locked(recording_id):
+            meta = self._read_meta(recording_id)
+            meta.update(fields)
+            self._write_meta(recording_id, meta)
+            return meta
+
+    def finish(self, recording_id: str, total_chunks: Optional[int] = None) -> Dict:
+        """Seal the recording. Fails (finished=False) if chunks are still missing."""
+        with self._locked(recording_id):
+            meta = self._read_meta(recording_id)
+            if total_chunks is not None and meta['next_index'] < total_chunks:
+                return meta
+            if not meta['finished']:
+                meta['finished'] = True
+                meta['finished_at'] = time.time()
+                self._write_meta(recording_id, meta)
+            return meta
+
+    def data_path(self, recording_id: str) -> str:
+        return self._paths(recording_id)[0]
+
+    def stream(self, recording_id: str, poll_interval: float = 0.05, idle_timeout: float = 120) -> Iterator[bytes]:
+        """Yield bytes as they are appended until the recording is finished"""
+        data_path, _ = self._paths(recording_id)
+        last_growth = time.time()
+        with open(data_path, 'rb') as f:
+            while True:
+                data = f.read(65536)
+                if data:
+                    last_growth = time.time()
+                    yield data
+                    continue
+                if self._read_meta(recording_id)['finished']:
+                    data = f.read()
+                    if data:
+                        yield data
+                    return
+                if time.time() - last_growth > idle_timeout:
+                    raise TimeoutError(f"Recording {recording_id} stalled")
+                time.sleep(poll_interval)
+
+    def remove(self, recording_id: str):
+        for path in self._paths(recording_id):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._locks_guard:
+            self._locks.pop(recording_id, None)
+
+    def record_transcript(self, finish_to_transcript: float, streamed: bool):
+        with self._locks_guard:
+            self.totals['recordings'] += 1
+            self.totals['streamed_uploads'] += 1 if streamed else 0
+            self.totals['finish_to_transcript_seconds'] += finish_to_transcript
+
+    def stats(self) -> Dict:
+        with self._locks_guard:
+            stats = dict(self.totals)
+        stats['avg_finish_to_transcript_seconds'] = (
+            stats['finish_to_transcript_seconds'] / stats['recordings'] if stats['recordings'] else 0.0
+        )
+        return stats
+
+    def purge_stale(self) -> int:
+        removed = 0
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            recording_id, extension = os.path.splitext(name)
+            if extension != '.json':
+                continue
+            try:
+                if self._read_meta(recording_id)['updated_at'] < cutoff:
+                    self.remove(recording_id)
+                    removed += 1
+            except (KeyError, ValueError):
+                continue
+        return removed
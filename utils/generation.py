@@ -0,0 +1,97 @@
+"""
+Generation parameters per task and theme, and server-side reply length enforcement
+"""
+import re
+import threading
+from typing import Dict, Optional
+
+# max_words is enforced on the reply; max_tokens (if not given) leaves headroom over it
+TASK_GENERATION = {
+    'opening': {'max_words': 150, 'temperature': 0.9},
+    'rebuttal': {'max_words': 200, 'temperature': 0.8},
+    'summary': {'max_words': 200, 'temperature': 0.7},
+    'analysis': {'max_tokens': 900, 'temperature': 0.3}
+}
+
+# Adjustments for spoken-reply tasks; analysis keeps its own low temperature for every theme
+THEME_GENERATION = {
+    'objective': {'temperature': 0.4},
+    'teacher': {'temperature': 0.5},
+    'ruthless': {'temperature': 0.7},
+    'sassy': {'temperature': 0.95},
+    'flirty': {'temperature': 0.95},
+    'innocent': {'word_scale': 0.75},
+    'sweet': {'word_scale': 0.85}
+}
+
+TOKENS_PER_WORD = 1.4
+TOKEN_HEADROOM = 24
+
+WORD = re.compile(r"\S+")
+SENTENCE_END = re.compile(r"[.!?…][\"')\]]*(?=\s|$)")
+
+
+def generation_params(task: str, theme: Optional[str] = None, tasks: Optional[Dict] = None,
+                      themes: Optional[Dict] = None) -> Dict:
+    """{'max_tokens', 'temperature'[, 'max_words']} for one call"""
+    params = dict((tasks or TASK_GENERATION).get(task, {}))
+    if 'max_words' in params:
+        adjust = (themes or THEME_GENERATION).get(theme, {})
+        if 'temperature' in adjust:
+            params['temperature'] = adjust['temperature']
+        params['max_words'] = max(20, int(params['max_words'] * adjust.get('word_scale', 1.0)))
+        params.setdefault('max_tokens', int(params['max_words'] * TOKENS_PER_WORD) + TOKEN_HEADROOM)
+    params.setdefault('max_tokens', 1000)
+    params.setdefault('temperature', 0.8)
+    return params
+
+
+def word_count(text: str) -> int:
+    return len(WORD.findall(text or ""))
+
+
+def trim_to_words(text: str, max_words: int, truncated: bool = False) -> str:
+    """Cut `text` back to its last full sentence within `max_words`.
+
+    Text already within budget is returned as is, unless `truncated` says
+    generation was cut off mid-sentence. Without any sentence end inside
+    the budget the cut falls on a word boundary.
+    """
+    words = list(WORD.finditer(text or ""))
+    if len(words) <= max_words and not truncated:
+        return text
+    limit = words[min(max_words, len(words)) - 1].end() if words else 0
+
+    last_end = None
+    for match in SENTENCE_END.finditer(text, 0, limit):
+        last_end = match.end()
+    if last_end is not None:
+        return text[:last_end].strip()
+    return text[:limit].rstrip(",;:- ") + "…"
+
+
+class TaskStats:
+    """Calls, output tokens and latency per task type"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tasks = {}
+
+    def record(self, task: str, seconds: float, output_tokens: int, trimmed: bool, early_stop: bool):
+        with self._lock:
+            stats = self.tasks.setdefault(task, {
+                'calls': 0, 'output_tokens': 0, 'seconds': 0.0, 'trimmed': 0, 'early_stops': 0
+            })
+            stats['calls'] += 1
+            stats['output_tokens'] += output_tokens
+            stats['seconds'] += seconds
+            stats['trimmed'] += 1 if trimmed else 0
+            stats['early_stops'] += 1 if early_stop else 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tasks = {task: dict(values) for task, values in self.tasks.items()}
+        for values in tasks.values():
+            values['avg_output_tokens'] = values['output_tokens'] / values['calls']
+            values['avg_seconds'] = values['seconds'] / values['calls']
+        return tasks
@@ -0,0 +1,145 @@
+"""
+Idempotent request handling: duplicate submissions share one call and its result
+"""
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from utils.cancellation import CancelToken, Cancelled
+from utils.shared_store import ThreadLocalDB
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SubmissionCoalescer:
+    """Runs `fn` once per key; duplicates attach to the running call or replay its result.
+
+    Duplicates in the same process wait on the leader's call. Across worker
+    processes a `submissions` row claims the key: other processes poll for
+    the stored result instead of calling again, and take over if the
+    owner's lease (`wait_timeout`) runs out. Finished results are kept for
+    `ttl` seconds so a client retry after a timeout gets the same answer.
+    A failed or cancelled call is forgotten, so retrying it runs it again;
+    duplicates attached to a call that was cancelled get Cancelled and can
+    retry to take it over.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 600.0, wait_timeout: float = 120.0, poll_interval: float = 0.1):
+        self.db = ThreadLocalDB(db_path)
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._claims = 0
+        self.totals = {'new': 0, 'coalesced': 0, 'replayed': 0, 'takeovers': 0, 'errors': 0, 'cancelled': 0}
+        self.db.conn().execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def run(self, key: str, fn: Callable[[], object], cancel: Optional[CancelToken] = None) -> Tuple[object, str]:
+        """(result, 'new' | 'coalesced' | 'replayed'); a duplicate stops waiting once `cancel` is set"""
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            while not call.done.wait(self.poll_interval):
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+            self._count('coalesced')
+            if call.error is not None:
+                raise call.error
+            return call.result[0], 'coalesced'
+
+        try:
+            call.result = self._run_once(key, fn, cancel)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self._count('cancelled' if isinstance(e, Cancelled) else 'errors')
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    def _run_once(self, key: str, fn: Callable[[], object], cancel: Optional[CancelToken]) -> Tuple[object, str]:
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+        deadline = time.time() + self.wait_timeout
+        waited = False
+        while True:
+            if self._claim(key, owner):
+                try:
+                    result = fn()
+                except BaseException:
+                    self.db.conn().execute("DELETE FROM submissions WHERE key = ? AND owner = ?", (key, owner))
+                    raise
+                self.db.conn().execute(
+                    "UPDATE submissions SET status = 'done', result = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                    (json.dumps(result), time.time() + self.ttl, key, owner)
+                )
+                self._count('new')
+                return result, 'new'
+
+            row = self.db.conn().execute(
+                "SELECT status, result FROM submissions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] == 'done':
+                # Waiting on another process's call is coalescing; a finished one is a replay
+                outcome = 'coalesced' if waited else 'replayed'
+                self._count(outcome)
+                return json.loads(row[1]), outcome
+            waited = True
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            if time.time() > deadline:
+                # The other process is stuck; its lease has expired by now, so the next claim wins
+                self._count('takeovers')
+                deadline = time.time() + self.wait_timeout
+            time.sleep(self.poll_interval)
+
+    def _claim(self, key: str, owner: str) -> bool:
+        now = time.time()
+        conn = self.db.conn()
+        cursor = conn.execute("""
+            INSERT INTO submissions (key, owner, status, result, expires_at) VALUES (?, ?, 'running', NULL, ?)
+            ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, status = 'running', result = NULL,
+                expires_at = excluded.expires_at
+            WHERE submissions.expires_at < ?
+        """, (key, owner, now + self.wait_timeout, now))
+
+        with self._lock:
+            self._claims += 1
+            purge = self._claims % 100 == 0
+        if purge:
+            conn.execute("DELETE FROM submissions WHERE expires_at < ?", (now,))
+        return cursor.rowcount > 0
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.totals[outcome] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+            stats['inflight'] = len(self._inflight)
+        requests = stats['new'] + stats['coalesced'] + stats['replayed']
+        stats['duplicates'] = stats['coalesced'] + stats['replayed']
+        stats['duplicate_rate'] = stats['duplicates'] / requests if requests else 0.0
+        return stats
@@ -0,0 +1,415 @@
+"""
+In-process background job queue with an optional SQLite-backed durable mode
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from utils.cancellation import CancelToken, Cancelled
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """Worker pool that runs registered handlers off the request thread.
+
+    Jobs are plain JSON payloads dispatched by kind, so a durable queue can
+    re-run whatever was still queued (or interrupted mid-run) after a
+    restart. Without db_path everything lives in memory.
+
+    In durable mode a running row names the process that claimed it, which
+    refreshes a heartbeat on its rows every `heartbeat_interval` seconds.
+    A running row is only re-queued once its owner's process is gone or
+    its heartbeat is older than `stale_after`, so a job still running in
+    another worker is not run twice. Finished rows beyond the newest
+    `keep_finished` are deleted.
+    """
+
+    def __init__(self, workers: int = 4, db_path: Optional[str] = None, keep_finished: int = 1000,
+                 stale_after: float = 300.0, heartbeat_interval: float = 30.0):
+        self.workers = workers
+        self.db_path = db_path
+        self.stale_after = stale_after
+        self.heartbeat_interval = min(heartbeat_interval, stale_after / 4)
+        self.keep_finished = keep_finished
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers = {}
+        self.jobs = {}
+        self.finished_order = []
+        self.counts = {'submitted': 0, DONE: 0, FAILED: 0, CANCELLED: 0, 'recovered': 0, 'pruned': 0}
+        # Running jobs' cancel tokens; handlers read theirs with current_token()
+        self.tokens = {}
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+        self._local = threading.local()
+        self._started = False
+
+        if self.db_path:
+            self._init_db()
+
+    def register(self, kind: str, handler: Callable[[Dict], object]):
+        self.handlers[kind] = handler
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        if self.db_path:
+            self._recover()
+            self._prune()
+            threading.Thread(target=self._maintain, name="job-heartbeat", daemon=True).start()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind: str, payload: Dict, tag: Optional[str] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'payload': payload,
+            'tag': tag,
+            'status': QUEUED,
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+
+        with self._lock:
+            self.jobs[job['id']] = job
+            self.counts['submitted'] += 1
+        if self.db_path:
+            self._db_insert(job)
+
+        self.start()
+        self._queue.put(job['id'])
+        return job['id']
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+        if self.db_path:
+            job = self._db_get(job_id)
+            if job is not None:
+                return self._public(job)
+        return None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the job finishes or timeout elapses, then return its state"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._changed:
+                job = self.jobs.get(job_id)
+                if job is not None and job['status'] not in FINISHED_STATES:
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return self._public(job)
+                    # Durable jobs may be finished by another process, so re-check periodically
+                    self._changed.wait(remaining if not self.db_path else min(remaining or 0.5, 0.5))
+                    continue
+
+            state = self.get(job_id)
+            if state is None or state['status'] in FINISHED_STATES or not self.db_path:
+                return state
+            if deadline is not None and time.time() >= deadline:
+                return state
+            time.sleep(0.2)
+
+    def cancel(self, job_id: str, reason: Optional[str] = None) -> bool:
+        """Cancel a job that has not started yet; with a reason, also signal it if it is running here"""
+        with self._changed:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job['status'] == RUNNING and reason is not None and job_id in self.tokens:
+                return self.tokens[job_id].cancel(reason)
+            if job['status'] != QUEUED:
+                return False
+            self._finish(job, CANCELLED, error='Cancelled before start')
+            return True
+
+    def cancel_tag(self, tag: str, reason: str = 'cancelled') -> int:
+        """Cancel every queued job with this tag and signal the running ones"""
+        cancelled = 0
+        with self._changed:
+            for job in list(self.jobs.values()):
+                if job['tag'] != tag:
+                    continue
+                if job['status'] == QUEUED:
+                    self._finish(job, CANCELLED, error=f'Cancelled before start ({reason})')
+                    cancelled += 1
+                elif job['status'] == RUNNING and job['id'] in self.tokens:
+                    cancelled += 1 if self.tokens[job['id']].cancel(reason) else 0
+        if self.db_path:
+            # Queued copies other processes would otherwise still claim
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE tag = ? AND status = ?",
+                (CANCELLED, f'Cancelled before start ({reason})', time.time(), tag, QUEUED)
+            )
+            cancelled += cursor.rowcount
+        return cancelled
+
+    def current_token(self) -> Optional[CancelToken]:
+        """Cancel token of the job running on this thread, if any"""
+        return getattr(self._local, 'token', None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job['status']] = states.get(job['status'], 0) + 1
+            return {
+                'workers': self.workers,
+                'durable': bool(self.db_path),
+                'queue_depth': self._queue.qsize(),
+                'states': states,
+                'totals': dict(self.counts)
+            }
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                print(f"❌ Job worker error for {job_id}: {e}")
+
+    def _run(self, job_id: str):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                return
+        if self.db_path and not self._db_claim(job_id):
+            # Another process picked it up
+            with self._lock:
+                self.jobs.pop(job_id, None)
+            return
+
+        token = CancelToken()
+        with self._changed:
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            self.tokens[job_id] = token
+            self._changed.notify_all()
+
+        self._local.token = token
+        try:
+            result = self.handlers[job['kind']](job['payload'])
+        except Cancelled as e:
+            print(f"🛑 Job {job['kind']} {job_id} cancelled: {e}")
+            with self._changed:
+                self._finish(job, CANCELLED, error=f'Cancelled while running ({e})')
+            return
+        except Exception as e:
+            print(f"❌ Job {job['kind']} {job_id} failed: {e}")
+            with self._changed:
+                self._finish(job, FAILED, error=str(e))
+            return
+        finally:
+            self._local.token = None
+            with self._lock:
+                self.tokens.pop(job_id, None)
+
+        with self._changed:
+            self._finish(job, DONE, result=result)
+
+    def _finish(self, job: Dict, status: str, result=None, error: Optional[str] = None):
+        # Caller holds self._lock
+        job['status'] = status
+        job['result'] = result
+        job['error'] = error
+        job['finished_at'] = time.time()
+        self.counts[status] += 1
+        if self.db_path:
+            self._db_finish(job)
+
+        self.finished_order.append(job['id'])
+        while len(self.finished_order) > self.keep_finished:
+            self.jobs.pop(self.finished_order.pop(0), None)
+        self._changed.notify_all()
+
+    def _public(self, job: Dict) -> Dict:
+        state = {k: job[k] for k in ('id', 'kind', 'tag', 'status', 'result', 'error',
+                                     'created_at', 'started_at', 'finished_at')}
+        if job['started_at'] and job['finished_at']:
+            state['run_seconds'] = job['finished_at'] - job['started_at']
+        if job['started_at']:
+            state['wait_seconds'] = job['started_at'] - job['created_at']
+        return state
+
+    # SQLite durable mode
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                tag TEXT,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat_at REAL
+            )
+        """)
+        columns = {column[1] for column in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (('owner', 'TEXT'), ('heartbeat_at', 'REAL')):
+            if column not in columns:
+                # Databases written before running rows had an owner
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+    def _db_insert(self, job: Dict):
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, payload, tag, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job['id'], job['kind'], json.dumps(job['payload']), job['tag'], job['status'], job['created_at'])
+        )
+
+    def _db_claim(self, job_id: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, now, self.owner, now, job_id, QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def _db_finish(self, job: Dict):
+        try:
+            result = json.dumps(job['result'])
+        except (TypeError, ValueError):
+            result = json.dumps(str(job['result']))
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (job['status'], result, job['error'], job['finished_at'], job['id'])
+        )
+
+    def _db_get(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def _maintain(self):
+        """Heartbeat this process's running rows, pick up orphaned jobs and prune finished ones"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            try:
+                self._connect().execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                    (time.time(), self.owner, RUNNING)
+                )
+                self._recover(queued_before=time.time() - self.stale_after)
+                self._prune()
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue maintenance failed: {e}")
+
+    def _owner_gone(self, owner: Optional[str]) -> bool:
+        if not owner:
+            return False
+        pid = int(owner.split(':')[0])
+        if pid == os.getpid():
+            # Same pid but another instance: this process restarted (e.g. as pid 1 in a container)
+            return owner != self.owner
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _prune(self):
+        cursor = self._connect().execute(f"""
+            DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATES))})
+                ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (*FINISHED_STATES, self.keep_finished))
+        if cursor.rowcount:
+            with self._lock:
+                self.counts['pruned'] += cursor.rowcount
+
+    def _recover(self, queued_before: Optional[float] = None):
+        """Re-queue orphaned running jobs and take on queued ones (at startup all of them,
+        later only those queued before `queued_before`, which no live process has picked up)"""
+        conn = self._connect()
+        # Jobs interrupted by a crash are re-run from the start. Only orphaned ones: other
+        # processes sharing the database keep the heartbeat of the jobs they are running fresh.
+        # Rows from before owners were recorded fall back to their start time.
+        running = conn.execute(
+            "SELECT id, owner, COALESCE(heartbeat_at, started_at) AS seen FROM jobs WHERE status = ? AND "
+            "(owner IS NULL OR owner != ?)",
+            (RUNNING, self.owner)
+        ).fetchall()
+        stale = time.time() - self.stale_after
+        orphaned = []
+        for row in running:
+            if (row['seen'] or 0) < stale or self._owner_gone(row['owner']):
+                orphaned.append(row['id'])
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                    "WHERE id = ? AND status = ?",
+                    (QUEUED, row['id'], RUNNING)
+                )
+        rows = [row for row in conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+        ).fetchall() if queued_before is None or row['created_at'] < queued_before or row['id'] in orphaned]
+
+        recovered = 0
+        for row in rows:
+            job = dict(row)
+            if job['kind'] not in self.handlers:
+                continue
+            job['payload'] = json.loads(job['payload'])
+            with self._lock:
+                if job['id'] in self.jobs:
+                    continue
+                self.jobs[job['id']] = job
+                self.counts['recovered'] += 1
+            self._queue.put(job['id'])
+            recovered += 1
+
+        if recovered:
+            print(f"🔄 Recovered {recovered} queued jobs from {self.db_path}")
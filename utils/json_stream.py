@@ -0,0 +1,195 @@
+"""
+Tolerant incremental JSON extraction for LLM output
+"""
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FEEDBACK_SCHEMA = {
+    'strengths': list,
+    'weaknesses': list,
+    'fallacies': list,
+    'suggestions': list,
+    'grade': str,
+    'overall_feedback': str
+}
+
+VALID_GRADES = ('A', 'B', 'C', 'D', 'E', 'F')
+
+
+class IncrementalJSONParser:
+    """Pulls the first complete JSON object out of a stream of text chunks.
+
+    Prose before the object, markdown fences and trailing chatter are ignored.
+    Top-level members are reported as soon as each one is complete so callers
+    can forward fields before the whole object has arrived.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+        self.fields = {}
+        self.result = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """Consume a chunk and return the (key, value) members completed by it"""
+        if self.done or not chunk:
+            return []
+
+        self.buffer += chunk
+        completed = []
+
+        while self.pos < len(self.buffer) and not self.done:
+            char = self.buffer[self.pos]
+
+            if self.start is None:
+                if char == '{':
+                    self._open(self.pos)
+                self.pos += 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    completed.extend(self._close_member(self.pos))
+                    self._finish(self.pos + 1)
+                    if not self.done:
+                        continue
+            elif char == ',' and self.depth == 1:
+                completed.extend(self._close_member(self.pos))
+                self.member_start = self.pos + 1
+
+            self.pos += 1
+
+        return completed
+
+    def close(self) -> Optional[Dict]:
+        """Signal end of stream and return the parsed object, if any"""
+        return self.result
+
+    def _open(self, index: int):
+        self.start = index
+        self.depth = 1
+        self.in_string = False
+        self.escaped = False
+        self.member_start = index + 1
+        self.fields = {}
+
+    def _close_member(self, end: int) -> List[Tuple[str, object]]:
+        member = self.buffer[self.member_start:end].strip()
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return []
+
+        members = []
+        for key, value in parsed.items():
+            if key not in self.fields:
+                self.fields[key] = value
+                members.append((key, value))
+        return members
+
+    def _finish(self, end: int):
+        candidate = self.buffer[self.start:end]
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            parsed = None
+
+        if isinstance(parsed, dict):
+            self.result = parsed
+            self.pos = end
+            return
+
+        # Braces in prose ("{like this}") are not our object - rescan after them
+        self.pos = self.start + 1
+        self.start = None
+        self.depth = 0
+        self.fields = {}
+
+
+def extract_first_json(chunks: Iterable[str]) -> Optional[Dict]:
+    parser = IncrementalJSONParser()
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.close()
+
+
+def validate_feedback(data) -> Tuple[Optional[Dict], List[str]]:
+    """Check analysis output against FEEDBACK_SCHEMA.
+
+    Returns the normalized feedback (or None when it is unusable) and a list
+    of problems found. Missing list fields are tolerated as empty lists, a
+    single string is promoted to a one-item list and grades are upper-cased.
+    """
+    if not isinstance(data, dict):
+        return None, ["feedback is not a JSON object"]
+
+    errors = []
+    feedback = {}
+
+    for field, expected in FEEDBACK_SCHEMA.items():
+        if field not in data:
+            if expected is list:
+                feedback[field] = []
+                continue
+            errors.append(f"missing field '{field}'")
+            continue
+
+        value = validate_field(field, data[field])
+        if value is None:
+            errors.append(f"field '{field}' should be {expected.__name__}")
+        else:
+            feedback[field] = value
+
+    if errors:
+        return None, errors
+    return feedback, []
+
+
+def validate_field(field: str, value):
+    expected = FEEDBACK_SCHEMA.get(field)
+    if expected is None:
+        return None
+
+    if expected is list:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return None
+        return [str(item) for item in value if item not in (None, "")]
+
+    if not isinstance(value, (str, int, float)):
+        return None
+    value = str(value).strip()
+
+    if field == 'grade':
+        value = value.upper()
+        if not value or value[0] not in VALID_GRADES:
+            return None
+    return value
@@ -0,0 +1,199 @@
+"""
+Local CPU speech-to-text fallback that never touches the network.
+
+The model runs in a separate process pool so decoding doesn't hold the
+GIL of the web worker. The pool is created on first use (or by warm())
+and kept alive, so the model is only loaded once per process.
+
+Backends:
+    faster-whisper  LOCAL_STT_MODEL = model name already in the local cache, or a model directory
+    vosk            LOCAL_STT_MODEL = path to an unpacked Vosk model
+"""
+import importlib.util
+import os
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from utils.audio_pipeline import AudioNormalizer
+
+BACKEND_MODULES = {
+    'faster-whisper': 'faster_whisper',
+    'vosk': 'vosk'
+}
+
+_worker_model = None
+_worker_backend = None
+
+
+def _init_worker(backend: str, model: str):
+    global _worker_model, _worker_backend
+    # Belt and braces: never download weights at runtime
+    os.environ['HF_HUB_OFFLINE'] = '1'
+    _worker_backend = backend
+
+    if backend == 'faster-whisper':
+        from faster_whisper import WhisperModel
+        _worker_model = WhisperModel(model, device='cpu', compute_type='int8', local_files_only=True)
+    elif backend == 'vosk':
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        _worker_model = Model(model)
+
+
+def _worker_ping() -> bool:
+    return _worker_model is not None
+
+
+def _worker_transcribe(wav_path: str) -> str:
+    if _worker_backend == 'faster-whisper':
+        segments, _ = _worker_model.transcribe(wav_path, beam_size=1, vad_filter=True)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    if _worker_backend == 'vosk':
+        import json
+        from vosk import KaldiRecognizer
+
+        with wave.open(wav_path, 'rb') as reader:
+            recognizer = KaldiRecognizer(_worker_model, reader.getframerate())
+            while True:
+                data = reader.readframes(4000)
+                if not data:
+                    break
+                recognizer.AcceptWaveform(data)
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+    raise RuntimeError("Local STT worker has no model")
+
+
+class LocalSTT:
+    def __init__(self, backend: Optional[str], model: Optional[str], workers: int = 1,
+                 first_pass_seconds: float = 8.0, timeout: float = 60.0):
+        self.backend = backend
+        self.model = model
+        self.workers = workers
+        self.first_pass_seconds = first_pass_seconds
+        self.timeout = timeout
+        self.normalizer = AudioNormalizer()
+        self._pool = None
+        self._lock = threading.Lock()
+        self.totals = {'calls': 0, 'failures': 0, 'latency_seconds': 0.0, 'audio_seconds': 0.0}
+        self.last = None
+
+    @classmethod
+    def from_env(cls) -> 'LocalSTT':
+        backend = os.getenv('LOCAL_STT_BACKEND', 'auto')
+        model = os.getenv('LOCAL_STT_MODEL')
+
+        if backend == 'auto':
+            backend = None
+            for name, module in BACKEND_MODULES.items():
+                if importlib.util.find_spec(module) is not None:
+                    backend = name
+                    break
+        elif backend not in BACKEND_MODULES or importlib.util.find_spec(BACKEND_MODULES[backend]) is None:
+            backend = None
+
+        if backend == 'faster-whisper' and not model:
+            model = 'tiny.en'
+
+        return cls(
+            backend if model else None,
+            model,
+            workers=int(os.getenv('LOCAL_STT_WORKERS', '1')),
+            first_pass_seconds=float(os.getenv('LOCAL_STT_FIRST_PASS_SECONDS', '8'))
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.backend, self.model)
+                )
+            return self._pool
+
+    def warm(self):
+        """Start the pool and load the model now instead of on the first request"""
+        if not self.available:
+            return
+        try:
+            pool = self._get_pool()
+            for future in [pool.submit(_worker_ping) for _ in range(self.workers)]:
+                future.result(timeout=300)
+            print(f"✅ Local STT ({self.backend}) warmed up")
+        except Exception as e:
+            print(f"❌ Local STT warmup failed: {e}")
+            self._reset_pool()
+
+    def warm_in_background(self):
+        if self.available:
+            threading.Thread(target=self.warm, daemon=True).start()
+
+    def _reset_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def prepare(self, audio_file_path: str) -> Optional[Dict]:
+        """16 kHz mono WAV copy of the recording plus its duration"""
+        return self.normalizer.normalize(audio_file_path, fmt='wav')
+
+    def transcribe_prepared(self, prepared: Dict) -> Optional[str]:
+        start = time.perf_counter()
+        try:
+            text = self._get_pool().submit(_worker_transcribe, prepared['path']).result(timeout=self.timeout)
+        except Exception as e:
+            print(f"❌ Local STT error: {e}")
+            with self._lock:
+                self.totals['calls'] += 1
+                self.totals['failures'] += 1
+            # A crashed or hung worker would poison later calls
+            self._reset_pool()
+            return None
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.totals['calls'] += 1
+            self.totals['latency_seconds'] += latency
+            self.totals['audio_seconds'] += prepared['duration']
+            self.last = {
+                'latency': latency,
+                'audio_seconds': prepared['duration'],
+                'rtf': latency / prepared['duration'] if prepared['duration'] else 0.0
+            }
+        print(f"✅ Local STT: {prepared['duration']:.1f}s audio in {latency:.2f}s "
+              f"(RTF {self.last['rtf']:.2f})")
+        return text or None
+
+    def transcribe(self, audio_file_path: str) -> Optional[str]:
+        prepared = self.prepare(audio_file_path)
+        if prepared is None:
+            return None
+        try:
+            return self.transcribe_prepared(prepared)
+        finally:
+            if os.path.exists(prepared['path']):
+                os.remove(prepared['path'])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+            stats['last'] = self.last
+        stats['backend'] = self.backend
+        stats['model'] = self.model
+        stats['warm'] = self._pool is not None
+        stats['avg_latency_seconds'] = (
+            stats['latency_seconds'] / (stats['calls'] - stats['failures'])
+            if stats['calls'] > stats['failures'] else 0.0
+        )
+        stats['rtf'] = stats['latency_seconds'] / stats['audio_seconds'] if stats['audio_seconds'] else 0.0
+        return stats
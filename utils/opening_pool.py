@@ -0,0 +1,229 @@
+"""
+Pre-generated opening statements for the fixed (topic, side, theme) catalog
+"""
+import html
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.audio_files import local_path
+from utils.shared_store import ThreadLocalDB
+
+SIDES = ('FOR', 'AGAINST')
+
+# Rotated through so a pool holds different openings rather than near-duplicates
+ANGLES = [
+    'a surprising statistic or fact',
+    'a rhetorical question',
+    'a short vivid anecdote',
+    'a bold, provocative claim',
+    'an unexpected analogy'
+]
+
+Key = Tuple[str, str, str]
+
+
+def load_catalog(template_path: str) -> Dict[str, List[str]]:
+    """Topics and themes offered by the start screen (data-topic / data-theme attributes)"""
+    with open(template_path, encoding='utf-8') as f:
+        page = f.read()
+    return {
+        'topics': [html.unescape(topic) for topic in re.findall(r'data-topic="([^"]+)"', page)],
+        'themes': re.findall(r'data-theme="([^"]+)"', page)
+    }
+
+
+def catalog_keys(catalog: Dict[str, List[str]]) -> List[Key]:
+    return [(topic, side, theme) for topic in catalog['topics'] for side in SIDES for theme in catalog['themes']]
+
+
+class OpeningPool:
+    """A few ready openings per key, stored in SQLite so every worker shares them.
+
+    take() pops the oldest fresh entry atomically (DELETE ... RETURNING),
+    so two workers never hand out the same opening. refill() tops a key
+    back up to `depth`; fill() walks every key, emptiest first, while a
+    should_continue() callback says the server is idle. Entries older than
+    `max_age` are never served.
+    """
+
+    def __init__(self, db_path: str, generate: Callable[[str, str, str, str], str],
+                 synthesize: Optional[Callable[[str, str], Optional[str]]] = None,
+                 depth: int = 2, max_age: float = 7 * 24 * 3600):
+        self.db = ThreadLocalDB(db_path)
+        self.generate = generate
+        self.synthesize = synthesize
+        self.depth = depth
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._refilling = set()
+        self.totals = {'hits': 0, 'misses': 0, 'generated': 0, 'generation_errors': 0,
+                       'stale_discarded': 0, 'generation_seconds': 0.0}
+        self.db.conn().execute("""
+            CREATE TABLE IF NOT EXISTS openings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                side TEXT NOT NULL,
+                theme TEXT NOT NULL,
+                text TEXT NOT NULL,
+                audio_path TEXT,
+                angle INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.db.conn().execute("CREATE INDEX IF NOT EXISTS openings_key ON openings (topic, side, theme, created_at)")
+        self.db.conn().execute("""
+            CREATE TABLE IF NOT EXISTS opening_filler (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def take(self, topic: str, side: str, theme: str) -> Optional[Dict]:
+        row = self.db.conn().execute("""
+            DELETE FROM openings WHERE id = (
+                SELECT id FROM openings
+                WHERE topic = ? AND side = ? AND theme = ? AND created_at > ?
+                ORDER BY created_at LIMIT 1
+            ) RETURNING text, audio_path, created_at
+        """, (topic, side, theme, time.time() - self.max_age)).fetchone()
+
+        with self._lock:
+            self.totals['hits' if row else 'misses'] += 1
+        if row is None:
+            return None
+
+        text, audio_path, created_at = row
+        if audio_path and not os.path.exists(local_path(audio_path)):
+            audio_path = None
+        return {'text': text, 'audio_path': audio_path, 'age_seconds': time.time() - created_at}
+
+    def count(self, topic: str, side: str, theme: str) -> int:
+        return self.db.conn().execute(
+            "SELECT COUNT(*) FROM openings WHERE topic = ? AND side = ? AND theme = ? AND created_at > ?",
+            (topic, side, theme, time.time() - self.max_age)
+        ).fetchone()[0]
+
+    def _next_angle(self, topic: str, side: str, theme: str) -> int:
+        row = self.db.conn().execute(
+            "SELECT angle FROM openings WHERE topic = ? AND side = ? AND theme = ? ORDER BY id DESC LIMIT 1",
+            (topic, side, theme)
+        ).fetchone()
+        return (row[0] + 1) % len(ANGLES) if row else 0
+
+    def refill(self, topic: str, side: str, theme: str,
+               should_continue: Callable[[], bool] = lambda: True) -> int:
+        """Generate openings until the key holds `depth` fresh ones; returns how many were added"""
+        key = (topic, side, theme)
+        with self._lock:
+            if key in self._refilling:
+                return 0
+            self._refilling.add(key)
+
+        added = 0
+        try:
+            while self.count(*key) < self.depth and should_continue():
+                angle = self._next_angle(*key)
+                start = time.perf_counter()
+                try:
+                    text = self.generate(topic, side, theme, ANGLES[angle])
+                    audio_path = self.synthesize(text, theme) if self.synthesize else None
+                except Exception as e:
+                    print(f"❌ Opening pool generation failed for {key}: {e}")
+                    with self._lock:
+                        self.totals['generation_errors'] += 1
+                    break
+
+                self.db.conn().execute(
+                    "INSERT INTO openings (topic, side, theme, text, audio_path, angle, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (topic, side, theme, text, audio_path, angle, time.time())
+                )
+                added += 1
+                with self._lock:
+                    self.totals['generated'] += 1
+                    self.totals['generation_seconds'] += time.perf_counter() - start
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+        return added
+
+    def purge_stale(self) -> int:
+        cursor = self.db.conn().execute(
+            "DELETE FROM openings WHERE created_at <= ?", (time.time() - self.max_age,)
+        )
+        with self._lock:
+            self.totals['stale_discarded'] += cursor.rowcount
+        return cursor.rowcount
+
+    def fill(self, keys: Iterable[Key], should_continue: Callable[[], bool] = lambda: True) -> int:
+        """Top up every key, emptiest first, until done or should_continue() turns False"""
+        self.purge_stale()
+        added = 0
+        for key in sorted(keys, key=lambda key: self.count(*key)):
+            if not should_continue():
+                break
+            added += self.refill(*key, should_continue=should_continue)
+        return added
+
+    def _claim_filler(self, owner: str, lease: float) -> bool:
+        """Only one process fills at a time; the lease expires if it dies"""
+        now = time.time()
+        cursor = self.db.conn().execute("""
+            INSERT INTO opening_filler (id, owner, expires_at) VALUES (1, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE opening_filler.owner = excluded.owner OR opening_filler.expires_at < ?
+        """, (owner, now + lease, now))
+        return cursor.rowcount > 0
+
+    def start_filler(self, keys: List[Key], is_idle: Callable[[], bool], interval: float = 30.0):
+        """Background thread that fills the pool whenever is_idle() says it's off-peak"""
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+
+        def keep_going():
+            return is_idle() and self._claim_filler(owner, lease=interval * 4)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    if keep_going():
+                        added = self.fill(keys, should_continue=keep_going)
+                        if added:
+                            print(f"🧊 Opening pool: generated {added} openings")
+                except Exception as e:
+                    print(f"❌ Opening pool filler error: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self, keys: List[Key]) -> Dict:
+        cutoff = time.time() - self.max_age
+        rows = self.db.conn().execute("""
+            SELECT topic, side, theme, COUNT(*), MIN(created_at) FROM openings
+            WHERE created_at > ? GROUP BY topic, side, theme
+        """, (cutoff,)).fetchall()
+        depths = {(topic, side, theme): (count, oldest) for topic, side, theme, count, oldest in rows}
+        counts = [depths.get(key, (0, None))[0] for key in keys]
+        oldest = min((oldest for _, oldest in depths.values()), default=None)
+
+        with self._lock:
+            stats = dict(self.totals)
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'keys': len(keys),
+            'target_depth': self.depth,
+            'entries': sum(counts),
+            'empty_keys': sum(1 for count in counts if count == 0),
+            'full_keys': sum(1 for count in counts if count >= self.depth),
+            'min_depth': min(counts, default=0),
+            'oldest_age_seconds': time.time() - oldest if oldest else None,
+            'max_age_seconds': self.max_age,
+            'hit_rate': stats['hits'] / lookups if lookups else 0.0,
+            'avg_generation_seconds': (
+                stats['generation_seconds'] / stats['generated'] if stats['generated'] else 0.0
+            )
+        })
+        return stats
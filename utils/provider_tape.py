@@ -0,0 +1,388 @@
+"""
+Record provider calls to a tape and replay them offline with the original (or scaled) timings
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+_active = None
+
+
+def active() -> Optional['ProviderTape']:
+    return _active
+
+
+def install_from_env() -> Optional['ProviderTape']:
+    """PROVIDER_TAPE=calls.jsonl.gz with PROVIDER_TAPE_MODE=record|replay (PROVIDER_TAPE_SCALE=0.5 halves delays)"""
+    path = os.getenv('PROVIDER_TAPE')
+    if not path or _active is not None:
+        return _active
+    tape = ProviderTape(path, os.getenv('PROVIDER_TAPE_MODE', 'replay'),
+                        scale=float(os.getenv('PROVIDER_TAPE_SCALE', '1.0')))
+    tape.install()
+    return tape
+
+
+def _provider(url: str) -> str:
+    host = urlsplit(url).hostname or ''
+    groq_url = os.getenv('GROQ_API_URL')
+    if 'groq' in host or (groq_url and url.startswith(groq_url)):
+        return 'groq'
+    if 'assemblyai' in host:
+        return 'assemblyai'
+    return host
+
+
+def _route(url: str) -> str:
+    """Where a call went, independent of which endpoint served it (a mock Groq server records as Groq)"""
+    provider = _provider(url)
+    if provider == 'groq':
+        return 'groq'
+    parts = urlsplit(url)
+    return f"{provider}{parts.path}"
+
+
+def _request_key(method: str, route: str, body, query: str = '') -> str:
+    digest = hashlib.sha1(f"{method} {route}?{query}\n".encode('utf-8'))
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    # Streamed bodies (file uploads, chunked recordings) match on method and URL alone
+    if isinstance(body, bytes):
+        digest.update(body)
+    return digest.hexdigest()
+
+
+def _encode(data: bytes) -> Dict:
+    try:
+        return {'text': data.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(data).decode('ascii')}
+
+
+def _decode(chunk: Dict) -> bytes:
+    return chunk['text'].encode('utf-8') if 'text' in chunk else base64.b64decode(chunk['b64'])
+
+
+class ProviderTape:
+    """Records every HTTP call made through `requests` (and Gemini SDK calls) with
+    timings, or serves them back.
+
+    A tape is JSONL, gzipped when the path ends in .gz. Each entry keeps
+    the request key (method, provider route and body hash; credentials
+    are never stored), the status, content type, time to headers and each body
+    chunk with its offset, so streamed replies replay chunk by chunk.
+    Replay serves entries with the same key in recorded order (a polled
+    URL steps through its statuses) and otherwise the next unused entry
+    for the same method and route; delays are multiplied by `scale`
+    (0 replays instantly). A request with nothing on tape raises
+    ConnectionError, like an unreachable provider.
+    """
+
+    def __init__(self, path: str, mode: str = 'replay', scale: float = 1.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown tape mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.scale = scale
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._by_route = {}
+        self._used = set()
+        self._cursors = {}
+        self.totals = {'recorded': 0, 'replayed': 0, 'loose': 0, 'misses': 0}
+        self._original_send = None
+
+        if self.replaying:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for index, line in enumerate(self._lines(f)):
+                    entry = json.loads(line)
+                    entry['index'] = index
+                    self._by_key.setdefault(entry['key'], []).append(entry)
+                    self._by_route.setdefault((entry['method'], entry['route']), []).append(entry)
+            self._out = None
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._out = (gzip.open if path.endswith('.gz') else open)(path, 'at', encoding='utf-8')
+            atexit.register(self.close)
+
+    @staticmethod
+    def _lines(f) -> Iterator[str]:
+        """Complete lines of a tape, including one whose recording process was killed"""
+        try:
+            for line in f:
+                if line.endswith("\n") and line.strip():
+                    yield line
+        except EOFError:
+            return
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def providers(self) -> List[str]:
+        return sorted({entries[0]['provider'] for entries in self._by_key.values()})
+
+    def install(self):
+        """Route every requests.Session through the tape"""
+        global _active
+        if self._original_send is None:
+            self._original_send = HTTPAdapter.send
+            tape = self
+
+            def send(adapter, request, **kwargs):
+                return tape.send(adapter, request, **kwargs)
+
+            HTTPAdapter.send = send
+        _active = self
+
+    def uninstall(self):
+        global _active
+        if self._original_send is not None:
+            HTTPAdapter.send = self._original_send
+            self._original_send = None
+        if _active is self:
+            _active = None
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.totals, mode=self.mode, path=self.path)
+
+    # --- HTTP ---
+
+    def send(self, adapter, request, **kwargs):
+        method, url = request.method, request.url
+        route = _route(url)
+        key = _request_key(method, route, request.body, urlsplit(url).query)
+        if self.replaying:
+            # Drain streamed bodies, as sending them would
+            if request.body is not None and not isinstance(request.body, (bytes, str)):
+                for _ in (iter(request.body.read, b'') if hasattr(request.body, 'read') else request.body):
+                    pass
+            entry = self._take(key, method, route)
+            time.sleep(entry['latency'] * self.scale)
+            return self._response(entry, request)
+
+        started = time.perf_counter()
+        response = self._original_send(adapter, request, **kwargs)
+        entry = {
+            'provider': _provider(url), 'method': method, 'route': route, 'key': key,
+            'status': response.status_code, 'reason': response.reason,
+            'content_type': response.headers.get('Content-Type'),
+            'latency': round(time.perf_counter() - started, 4)
+        }
+        response.raw = _RecordingRaw(response.raw, self, entry)
+        return response
+
+    def _take(self, key: str, method: str, route: str) -> Dict:
+        with self._lock:
+            for cursor, candidates, loose in (
+                (('key', key), self._by_key.get(key, []), False),
+                (('route', method, route), self._by_route.get((method, route), []), True)
+            ):
+                # Entries are taken roughly in order, so each list keeps a cursor past its used entries
+                position = self._cursors.get(cursor, 0)
+                while position < len(candidates) and candidates[position]['index'] in self._used:
+                    position += 1
+                self._cursors[cursor] = position
+                if position < len(candidates):
+                    entry = candidates[position]
+                    self._used.add(entry['index'])
+                    self.totals['replayed'] += 1
+                    self.totals['loose'] += 1 if loose else 0
+                    return entry
+            # A polled URL keeps answering with its last recorded response
+            same = self._by_key.get(key)
+            if same:
+                self.totals['replayed'] += 1
+                return same[-1]
+            self.totals['misses'] += 1
+        raise requests.ConnectionError(f"No recorded response for {method} {route}")
+
+    def _response(self, entry: Dict, request) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict({'Content-Type': entry['content_type']} if entry['content_type'] else {})
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.raw = _ReplayRaw(entry['chunks'], self.scale)
+        return response
+
+    def write(self, entry: Dict):
+        with self._lock:
+            if self._out is not None:
+                self._out.write(json.dumps(entry, separators=(',', ':')) + "\n")
+                self._out.flush()
+                self.totals['recorded'] += 1
+
+    # --- Gemini SDK ---
+
+    def gemini_model(self, name: str, model=None):
+        """`model` wrapped to record its calls, or (replaying) a stand-in serving them"""
+        return _GeminiTape(self, name, model)
+
+    def _take_sdk(self, key: str, route: str) -> Dict:
+        try:
+            return self._take(key, 'SDK', route)
+        except requests.ConnectionError as e:
+            raise RuntimeError(str(e))
+
+
+class _RecordingRaw:
+    """Wraps a urllib3 response: chunks pass through to the caller and onto the tape"""
+
+    def __init__(self, raw, tape: ProviderTape, entry: Dict):
+        self._raw = raw
+        self._tape = tape
+        self._entry = entry
+        self._chunks = []
+        self._started = time.perf_counter()
+        self._written = False
+
+    def stream(self, amt: int = 2 ** 16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        try:
+            for chunk in self._raw.stream(amt, decode_content=decode_content):
+                self._chunks.append(dict(_encode(chunk), at=round(time.perf_counter() - self._started, 4)))
+                yield chunk
+        finally:
+            self._finish()
+
+    def read(self, amt: Optional[int] = None, decode_content: Optional[bool] = None, **kwargs) -> bytes:
+        chunk = self._raw.read(amt, decode_content=decode_content, **kwargs)
+        if chunk:
+            self._chunks.append(dict(_encode(chunk), at=round(time.perf_counter() - self._started, 4)))
+        if not chunk or amt is None:
+            self._finish()
+        return chunk
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def _finish(self):
+        # Streams the caller stopped reading early are recorded as far as they were read
+        if not self._written:
+            self._written = True
+            self._tape.write(dict(self._entry, chunks=self._chunks))
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class _ReplayRaw:
+    def __init__(self, chunks: List[Dict], scale: float):
+        self._chunks = chunks
+        self._scale = scale
+        self._position = 0
+        self._started = None
+        self._buffer = b''
+
+    def stream(self, amt: int = 2 ** 16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        while True:
+            chunk = self._next()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _next(self) -> Optional[bytes]:
+        if self._position >= len(self._chunks):
+            return None
+        if self._started is None:
+            self._started = time.perf_counter()
+        chunk = self._chunks[self._position]
+        self._position += 1
+        delay = chunk['at'] * self._scale - (time.perf_counter() - self._started)
+        if delay > 0:
+            time.sleep(delay)
+        return _decode(chunk)
+
+    def read(self, amt: Optional[int] = None, decode_content: Optional[bool] = None, **kwargs) -> bytes:
+        while amt is None or len(self._buffer) < amt:
+            chunk = self._next()
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._position = len(self._chunks)
+
+    def release_conn(self):
+        pass
+
+
+class _GeminiTape:
+    """generate_content() recorded to, or replayed from, the tape"""
+
+    def __init__(self, tape: ProviderTape, name: str, model=None):
+        self._tape = tape
+        self._model = model
+        self.model_name = name
+
+    def generate_content(self, prompt, generation_config=None, stream: bool = False):
+        route = f"gemini/{self.model_name}"
+        key = _request_key('SDK', route, json.dumps([prompt, generation_config, stream], sort_keys=True, default=str))
+        if self._tape.replaying:
+            entry = self._tape._take_sdk(key, route)
+            time.sleep(entry['latency'] * self._tape.scale)
+            if stream:
+                return self._replay_stream(entry)
+            return _gemini_response(entry['text'], entry.get('usage'))
+
+        started = time.perf_counter()
+        result = self._model.generate_content(prompt, generation_config=generation_config, stream=stream)
+        entry = {'provider': 'gemini', 'method': 'SDK', 'route': route, 'key': key,
+                 'latency': round(time.perf_counter() - started, 4)}
+        if stream:
+            return self._record_stream(result, entry, started)
+        metadata = getattr(result, 'usage_metadata', None)
+        usage = [getattr(metadata, 'prompt_token_count', None), getattr(metadata, 'candidates_token_count', None)]
+        self._tape.write(dict(entry, text=result.text, usage=usage))
+        return result
+
+    def _record_stream(self, result, entry: Dict, started: float):
+        chunks = []
+        try:
+            for chunk in result:
+                chunks.append({'text': chunk.text, 'at': round(time.perf_counter() - started - entry['latency'], 4)})
+                yield chunk
+        finally:
+            self._tape.write(dict(entry, text="".join(c['text'] for c in chunks), chunks=chunks))
+
+    def _replay_stream(self, entry: Dict):
+        raw = _ReplayRaw(entry.get('chunks') or [{'text': entry['text'], 'at': 0.0}], self._tape.scale)
+        for chunk in raw.stream():
+            yield _gemini_response(chunk.decode('utf-8'), None)
+
+
+def _gemini_response(text: str, usage: Optional[List]):
+    prompt_tokens, completion_tokens = usage or (None, None)
+    metadata = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens)
+    return SimpleNamespace(text=text, usage_metadata=metadata)
@@ -0,0 +1,251 @@
+"""
+Model routing per task: which provider model serves each call, with latency/cost accounting
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Per provider, in table order. latency is the expected seconds per call before any are measured;
+# tier ranks answer quality (higher is stronger); price is USD per 1M input/output tokens.
+MODEL_TABLE = {
+    'groq': [
+        {'model': 'llama3-8b-8192', 'tier': 1, 'latency': 0.5, 'price': [0.05, 0.08]},
+        {'model': 'llama3-70b-8192', 'tier': 2, 'latency': 1.5, 'price': [0.59, 0.79]}
+    ],
+    'gemini': [
+        {'model': 'gemini-1.5-flash', 'tier': 1, 'latency': 1.0, 'price': [0.075, 0.3]},
+        {'model': 'gemini-pro', 'tier': 2, 'latency': 2.5, 'price': [0.5, 1.5]}
+    ]
+}
+
+# slo is the p95 latency in seconds a model may have for the task before calls move down the table
+TASK_ROUTES = {
+    'opening': {'policy': 'fastest', 'slo': 2.5},
+    'rebuttal': {'policy': 'fastest', 'slo': 2.5},
+    'summary': {'policy': 'fastest', 'slo': 5.0},
+    'analysis': {'policy': 'strongest', 'slo': 8.0},
+    'analysis_packed': {'policy': 'strongest', 'slo': 30.0},
+    'default': {'policy': 'fastest', 'slo': None}
+}
+
+
+def _rank_fastest(candidate: Dict) -> Tuple:
+    return (candidate['expected_latency'],)
+
+
+def _rank_strongest(candidate: Dict) -> Tuple:
+    return (-candidate['tier'], candidate['expected_latency'])
+
+
+def _rank_cheapest(candidate: Dict) -> Tuple:
+    return (sum(candidate['price']), candidate['expected_latency'])
+
+
+POLICIES = {
+    'fastest': _rank_fastest,
+    'strongest': _rank_strongest,
+    'cheapest': _rank_cheapest
+}
+
+
+def load_routes(path: Optional[str]) -> Tuple[Dict, Dict]:
+    """(models, tasks) from a JSON file {"models": {...}, "tasks": {...}} over the defaults"""
+    models, tasks = MODEL_TABLE, dict(TASK_ROUTES)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        models = config.get('models', models)
+        tasks.update(config.get('tasks', {}))
+    return models, tasks
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ModelRouter:
+    """Orders candidate models for each task and accounts latency and cost per model.
+
+    The task's policy ranks the models of the available providers; any
+    model whose recent p95 latency for that task is over the task's SLO
+    (a failed call counts as infinitely slow) moves to the end, so calls
+    fall down the table while it is slow and come back once its samples
+    age out of `window_seconds`. With `trace_path`, every call is appended
+    to a JSONL trace that replay() can evaluate other policies against.
+    """
+
+    def __init__(self, models: Optional[Dict] = None, tasks: Optional[Dict] = None,
+                 window_seconds: float = 300.0, window_size: int = 50, trace_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        self.models = models or MODEL_TABLE
+        self.tasks = tasks or TASK_ROUTES
+        self.window_seconds = window_seconds
+        self.window_size = window_size
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._totals = {}
+        self.fallbacks = 0
+        self._trace = open(trace_path, 'a', encoding='utf-8', buffering=1) if trace_path else None
+
+    @classmethod
+    def from_env(cls) -> 'ModelRouter':
+        models, tasks = load_routes(os.getenv('MODEL_ROUTES'))
+        return cls(models, tasks, trace_path=os.getenv('MODEL_TRACE'))
+
+    def default_model(self, provider: str) -> Optional[str]:
+        entries = self.models.get(provider) or []
+        return entries[0]['model'] if entries else None
+
+    def route(self, task: Optional[str], providers: Iterable[str], policy: Optional[str] = None) -> List[Tuple[str, str]]:
+        """[(provider, model), ...] in the order to try them"""
+        config = self.tasks.get(task) or self.tasks['default']
+        rank = POLICIES[policy or config['policy']]
+        slo = config.get('slo')
+        now = self.clock()
+
+        candidates = []
+        for provider in providers:
+            for entry in self.models.get(provider, []):
+                samples = self._samples(provider, entry['model'], task, now)
+                observed = [s for s in samples if s != float('inf')]
+                candidates.append(dict(
+                    entry, provider=provider,
+                    expected_latency=percentile(observed, 0.5) if observed else entry['latency'],
+                    over_slo=bool(slo and len(samples) >= 5 and percentile(samples, 0.95) > slo)
+                ))
+        # Stable sort: within the same rank, table order decides
+        candidates.sort(key=lambda c: (c['over_slo'],) + rank(c))
+        return [(c['provider'], c['model']) for c in candidates]
+
+    def _samples(self, provider: str, model: str, task: Optional[str], now: float) -> List[float]:
+        with self._lock:
+            window = self._windows.get((provider, model, task))
+            if not window:
+                return []
+            while window and window[0][0] < now - self.window_seconds:
+                window.popleft()
+            return [seconds for _, seconds in window]
+
+    def price(self, provider: str, model: str) -> Tuple[float, float]:
+        for entry in self.models.get(provider, []):
+            if entry['model'] == model:
+                return tuple(entry['price'])
+        return (0.0, 0.0)
+
+    def record(self, provider: str, model: str, task: Optional[str], seconds: float, ok: bool,
+               prompt_tokens: int = 0, completion_tokens: int = 0, fallback: bool = False):
+        now = self.clock()
+        price_in, price_out = self.price(provider, model)
+        cost = (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+        with self._lock:
+            window = self._windows.setdefault((provider, model, task), deque(maxlen=self.window_size))
+            window.append((now, seconds if ok else float('inf')))
+            totals = self._totals.setdefault(f"{provider}/{model}", {
+                'calls': 0, 'failures': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'cost': 0.0, 'tasks': {}
+            })
+            totals['calls'] += 1
+            totals['failures'] += 0 if ok else 1
+            totals['seconds'] += seconds
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['cost'] += cost
+            totals['tasks'][task] = totals['tasks'].get(task, 0) + 1
+            self.fallbacks += 1 if fallback else 0
+            if self._trace is not None:
+                self._trace.write(json.dumps({
+                    'at': now, 'task': task, 'provider': provider, 'model': model, 'seconds': round(seconds, 4),
+                    'ok': ok, 'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                    'fallback': fallback
+                }) + "\n")
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        with self._lock:
+            models = {name: dict(totals, tasks=dict(totals['tasks'])) for name, totals in self._totals.items()}
+            keys = list(self._windows)
+            fallbacks = self.fallbacks
+        for provider, model, task in keys:
+            samples = [s for s in self._samples(provider, model, task, now) if s != float('inf')]
+            if samples:
+                latency = models[f"{provider}/{model}"].setdefault('latency', {})
+                latency[task] = {'p50': percentile(samples, 0.5), 'p95': percentile(samples, 0.95)}
+        for totals in models.values():
+            totals['avg_seconds'] = totals['seconds'] / totals['calls']
+        return {'models': models, 'fallbacks': fallbacks}
+
+
+def load_trace(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(trace: List[Dict], policy: Optional[str] = None, models: Optional[Dict] = None,
+           tasks: Optional[Dict] = None, providers: Iterable[str] = ('groq', 'gemini'),
+           requests: Optional[List[Tuple[float, str]]] = None) -> Dict:
+    """Evaluate a routing policy against a recorded trace.
+
+    `requests` are (time, task) pairs, by default every traced call that
+    was not a fallback attempt. The router
+    picks models as it would live; each attempt's outcome is the recorded
+    call for that model and task nearest in time, so slow periods in the
+    trace hit whichever policy routes into them. Models with no recorded
+    calls for a task are skipped. `policy` overrides every task's policy;
+    None uses the table's.
+    """
+    samples = {}
+    for event in trace:
+        samples.setdefault((event['provider'], event['model'], event['task']), []).append(event)
+    clock = {'now': 0.0}
+    router = ModelRouter(models, tasks, clock=lambda: clock['now'])
+    providers = list(providers)
+
+    if requests is None:
+        requests = [(event['at'], event['task']) for event in trace if not event.get('fallback')]
+
+    results = {}
+    for at, task in sorted(requests, key=lambda request: request[0]):
+        clock['now'] = at
+        slo = (router.tasks.get(task) or router.tasks['default']).get('slo')
+        total, served = 0.0, None
+        for attempt, (provider, model) in enumerate(router.route(task, providers, policy)):
+            recorded = samples.get((provider, model, task))
+            if not recorded:
+                continue
+            outcome = min(recorded, key=lambda e: abs(e['at'] - at))
+            total += outcome['seconds']
+            router.record(provider, model, task, outcome['seconds'], outcome['ok'],
+                          outcome['prompt_tokens'], outcome['completion_tokens'], fallback=attempt > 0)
+            if outcome['ok']:
+                served = (provider, model)
+                break
+
+        stats = results.setdefault(task, {'requests': 0, 'failed': 0, 'slo_misses': 0, 'latencies': [],
+                                          'tier': 0, 'models': {}})
+        stats['requests'] += 1
+        stats['latencies'].append(total)
+        stats['slo_misses'] += 1 if served is None or (slo and total > slo) else 0
+        if served is None:
+            stats['failed'] += 1
+            continue
+        name = f"{served[0]}/{served[1]}"
+        stats['models'][name] = stats['models'].get(name, 0) + 1
+        stats['tier'] += next(e['tier'] for e in router.models[served[0]] if e['model'] == served[1])
+
+    usage = router.stats()['models']
+    for stats in results.values():
+        latencies = stats.pop('latencies')
+        stats['p50'] = percentile(latencies, 0.5)
+        stats['p95'] = percentile(latencies, 0.95)
+        stats['slo_miss_rate'] = stats['slo_misses'] / stats['requests']
+        stats['avg_tier'] = stats.pop('tier') / max(stats['requests'] - stats['failed'], 1)
+    return {
+        'tasks': results,
+        'cost': sum(model['cost'] for model in usage.values()),
+        'fallbacks': router.fallbacks
+    }
@@ -0,0 +1,282 @@
+"""
+SQLite-backed state shared by every worker process: sessions and response cache
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ThreadLocalDB:
+    """One SQLite connection per thread (and per process after a fork)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = connect_sqlite(self.db_path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False, snapshot: str = "{}",
+                 version: int = 0):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        # Nested mutations (history.append) don't trigger on_update, so saves compare against this
+        self.snapshot = snapshot
+        # Row version this session was read at; 0 while it has never been stored
+        self.version = version
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """Server-side sessions so every worker process sees the same debate state.
+
+    The cookie only carries a random session ID. Debate history no longer
+    has to fit in a 4 KB cookie either.
+
+    Saves are optimistic: each row has a version, and a save whose version
+    is stale (another request on the same session saved first) is merged
+    key by key onto the stored row, so concurrent requests that change
+    different keys both keep their changes. Code that needs the latest
+    state of a key under its own lock uses refresh() and persist().
+
+    Expired rows are only skipped on read, so every `purge_every` saves
+    (across this process) they are deleted.
+    """
+
+    def __init__(self, db_path: str, lifetime: float = 7 * 24 * 3600, intern_keys: Iterable[str] = (),
+                 purge_every: int = 500):
+        self.db = ThreadLocalDB(db_path)
+        self.lifetime = lifetime
+        self.purge_every = purge_every
+        # String values repeated across many sessions (topic, theme) share one copy once loaded
+        self.intern_keys = tuple(intern_keys)
+        self._lock = threading.Lock()
+        self.conflicts = 0
+        self._saves = 0
+        self.purges = 0
+        self.purged = 0
+        conn = self.db.conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        if 'version' not in {column[1] for column in conn.execute("PRAGMA table_info(sessions)")}:
+            # Databases written before sessions were versioned
+            conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expiry ON sessions (expires_at)")
+
+    def _decode(self, data: str) -> Dict:
+        decoded = json.loads(data)
+        for key in self.intern_keys:
+            if isinstance(decoded.get(key), str):
+                decoded[key] = sys.intern(decoded[key])
+        return decoded
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.db.conn().execute(
+                "SELECT data, version FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+            ).fetchone()
+            if row is not None:
+                return ServerSession(self._decode(row[0]), sid=sid, snapshot=row[0], version=row[1])
+        return ServerSession(sid=uuid.uuid4().hex, new=True)
+
+    def refresh(self, session: ServerSession):
+        """Reload the session from the store, dropping unsaved changes"""
+        row = self.db.conn().execute(
+            "SELECT data, version FROM sessions WHERE sid = ? AND expires_at > ?", (session.sid, time.time())
+        ).fetchone()
+        if row is None:
+            return
+        dict.clear(session)
+        dict.update(session, self._decode(row[0]))
+        session.snapshot, session.version = row
+
+    def persist(self, session: ServerSession):
+        """Write the session now, merged with whatever other requests saved since it was read"""
+        data = json.dumps(dict(session), separators=(',', ':'))
+        if data == session.snapshot and session.version:
+            return
+        base, mine = json.loads(session.snapshot), json.loads(data)
+        conn = self.db.conn()
+
+        while True:
+            expires_at = time.time() + self.lifetime
+            if session.version:
+                cursor = conn.execute(
+                    "UPDATE sessions SET data = ?, expires_at = ?, version = version + 1 WHERE sid = ? AND version = ?",
+                    (data, expires_at, session.sid, session.version)
+                )
+            else:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO sessions (sid, data, expires_at, version) VALUES (?, ?, ?, 1)",
+                    (session.sid, data, expires_at)
+                )
+            if cursor.rowcount:
+                session.version += 1
+                session.snapshot = data
+                return
+
+            # Someone saved first: apply the keys this request changed on top of their row
+            with self._lock:
+                self.conflicts += 1
+            row = conn.execute(
+                "SELECT data, version, expires_at FROM sessions WHERE sid = ?", (session.sid,)
+            ).fetchone()
+            current = json.loads(row[0]) if row is not None and row[2] > time.time() else {}
+            for key in set(base) | set(mine):
+                if key not in mine:
+                    current.pop(key, None)
+                elif key not in base or base[key] != mine[key]:
+                    current[key] = mine[key]
+            session.version = row[1] if row is not None else 0
+            data = json.dumps(current, separators=(',', ':'))
+            dict.clear(session)
+            dict.update(session, self._decode(data))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if not session.new:
+                self.db.conn().execute("DELETE FROM sessions WHERE sid = ?", (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        self.persist(session)
+        with self._lock:
+            self._saves += 1
+            purge = self.purge_every and self._saves % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+        if session.new:
+            response.set_cookie(
+                name,
+                session.sid,
+                max_age=int(self.lifetime),
+                httponly=self.get_cookie_httponly(app),
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+                domain=domain,
+                path=path
+            )
+
+    def purge_expired(self) -> int:
+        cursor = self.db.conn().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        with self._lock:
+            self.purges += 1
+            self.purged += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        stored = self.db.conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        with self._lock:
+            return {'conflicts': self.conflicts, 'stored': stored, 'purges': self.purges, 'purged': self.purged}
+
+
+class SQLiteCache:
+    """Drop-in for LRUCache whose entries are visible to every worker process"""
+
+    def __init__(self, db_path: str, namespace: str = 'default', max_size: int = 10000,
+                 ttl: Optional[float] = None):
+        self.db = ThreadLocalDB(db_path)
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.db.conn().execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self.db.conn().execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, stored_at)")
+
+    def get(self, key: str):
+        row = self.db.conn().execute(
+            "SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        expired = row is not None and self.ttl is not None and time.time() - row[1] > self.ttl
+        with self._lock:
+            if row is None or expired:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        conn = self.db.conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), time.time())
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 100 == 0
+        if prune:
+            conn.execute("""
+                DELETE FROM cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache WHERE namespace = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.namespace, self.namespace, self.max_size))
+
+    def clear(self):
+        self.db.conn().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict:
+        size = self.db.conn().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': size,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'shared': True
+            }
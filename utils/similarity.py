@@ -0,0 +1,148 @@
+"""
+Near-duplicate argument detection with MinHash signatures and LSH buckets
+"""
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+WORD = re.compile(r"[a-z0-9']+")
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def shingles(text: str) -> np.ndarray:
+    """Hashed word unigrams and bigrams of the normalized text"""
+    words = WORD.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.uint64)
+    return np.unique(np.fromiter(
+        (zlib.crc32(gram.encode()) & MERSENNE_PRIME for gram in grams), dtype=np.uint64, count=len(grams)
+    ))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashes = shingles(text)
+        if not hashes.size:
+            return None
+        # (a * x + b) mod p for every permutation and shingle; a, x < 2^31 so no overflow
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class RebuttalIndex:
+    """Past (topic, side, theme, argument) -> rebuttal, looked up by estimated Jaccard similarity.
+
+    Each (topic, side, theme) has its own LSH table: signatures are split into
+    `bands` bands of `rows` values, and only arguments sharing at least one
+    band with the query are compared. The best candidate is returned if
+    its similarity reaches the theme's threshold (`thresholds` overrides the
+    default per theme; a threshold above 1 turns reuse off for that theme).
+    """
+
+    def __init__(self, default_threshold: float = 0.85, thresholds: Optional[Dict[str, float]] = None,
+                 num_perm: int = 64, bands: int = 16, max_per_key: int = 2000):
+        self.hasher = MinHasher(num_perm)
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds or {}
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_per_key = max_per_key
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._data = {}
+        self._buckets = {}
+        self._next_id = 0
+        self.totals = {'lookups': 0, 'hits': 0, 'llm_calls_avoided': 0, 'added': 0, 'lookup_seconds': 0.0}
+
+    @staticmethod
+    def parse_thresholds(spec: str) -> Dict[str, float]:
+        """'sassy:0.9,objective:2' -> {'sassy': 0.9, 'objective': 2.0}"""
+        thresholds = {}
+        for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+            theme, _, value = item.partition(':')
+            thresholds[theme.strip()] = float(value)
+        return thresholds
+
+    def threshold(self, theme: str) -> float:
+        return self.thresholds.get(theme, self.default_threshold)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, topic: str, side: str, theme: str, argument: str, rebuttal: str):
+        signature = self.hasher.signature(argument)
+        if signature is None:
+            return
+        key = (topic, side, theme)
+        with self._lock:
+            entries = self._entries.setdefault(key, deque())
+            buckets = self._buckets.setdefault(key, [{} for _ in range(self.bands)])
+            if len(entries) >= self.max_per_key:
+                old_id = entries.popleft()
+                old_signature, _ = self._data.pop(old_id)
+                for band, band_key in enumerate(self._band_keys(old_signature)):
+                    ids = buckets[band].get(band_key)
+                    if ids is not None:
+                        ids.discard(old_id)
+                        if not ids:
+                            del buckets[band][band_key]
+
+            entry_id = self._next_id
+            self._next_id += 1
+            entries.append(entry_id)
+            self._data[entry_id] = (signature, rebuttal)
+            for band, band_key in enumerate(self._band_keys(signature)):
+                buckets[band].setdefault(band_key, set()).add(entry_id)
+            self.totals['added'] += 1
+
+    def find(self, topic: str, side: str, theme: str, argument: str,
+             exclude: Iterable[str] = ()) -> Optional[Tuple[str, float]]:
+        """(rebuttal, similarity) of the closest past argument above the threshold, or None"""
+        start = time.perf_counter()
+        threshold = self.threshold(theme)
+        signature = self.hasher.signature(argument) if threshold <= 1 else None
+        match = None
+
+        with self._lock:
+            self.totals['lookups'] += 1
+            buckets = self._buckets.get((topic, side, theme))
+            if signature is not None and buckets:
+                candidates = set()
+                for band, band_key in enumerate(self._band_keys(signature)):
+                    candidates |= buckets[band].get(band_key, set())
+                if candidates:
+                    exclude = set(exclude)
+                    rows = [self._data[entry_id] for entry_id in candidates
+                            if self._data[entry_id][1] not in exclude]
+                    if rows:
+                        similarity = (np.stack([row[0] for row in rows]) == signature).mean(axis=1)
+                        best = int(similarity.argmax())
+                        if similarity[best] >= threshold:
+                            match = (rows[best][1], float(similarity[best]))
+                            self.totals['hits'] += 1
+                            self.totals['llm_calls_avoided'] += 1
+            self.totals['lookup_seconds'] += time.perf_counter() - start
+        return match
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+            stats['entries'] = len(self._data)
+            stats['keys'] = len(self._entries)
+        stats['hit_rate'] = stats['hits'] / stats['lookups'] if stats['lookups'] else 0.0
+        stats['avg_lookup_ms'] = stats['lookup_seconds'] / stats['lookups'] * 1000 if stats['lookups'] else 0.0
+        stats['default_threshold'] = self.default_threshold
+        stats['thresholds'] = dict(self.thresholds)
+        return stats
@@ -0,0 +1,237 @@
+"""
+Batch AI-vs-scripted-user debates for offline evaluation of themes and prompts
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# USD per 1M tokens (input, output)
+DEFAULT_PRICES = {
+    'groq': (0.05, 0.08),
+    'gemini': (0.50, 1.50),
+    'mock': (0.0, 0.0)
+}
+
+SCRIPTED_ARGUMENTS = [
+    "I am {side} {topic} because the evidence from the last decade clearly supports my position.",
+    "Think about the people most affected by {topic}. Their lived experience backs up my side.",
+    "Your point ignores the economic costs. When you count them honestly, being {side} {topic} is the only sensible choice.",
+    "History shows that every time a society faced a question like {topic}, the {side} side turned out to be right.",
+    "Studies show that most experts who have looked at {topic} agree with me, so the burden of proof is on you.",
+    "Even if I grant your strongest point, it does not outweigh the long-term consequences I have described.",
+    "You keep appealing to emotion. Let's talk about measurable outcomes instead, and those favour my side.",
+    "The alternative you propose has been tried and it failed. Why would it work this time?",
+    "My opponent assumes the status quo is neutral, but doing nothing about {topic} is itself a choice with costs.",
+    "To sum up: the data, the history and basic fairness all point the same way on {topic}."
+]
+
+Plan = Tuple[str, str, str, str]
+
+
+def scripted_arguments(topic: str, side: str, turns: int, rng: random.Random) -> List[str]:
+    """A scripted user's arguments for one debate, in a per-debate shuffled order"""
+    stance = "for" if side.upper() == 'FOR' else "against"
+    lines = rng.sample(SCRIPTED_ARGUMENTS, min(turns, len(SCRIPTED_ARGUMENTS)))
+    while len(lines) < turns:
+        lines.append(rng.choice(SCRIPTED_ARGUMENTS))
+    return [line.format(topic=topic.lower(), side=stance) for line in lines]
+
+
+def plan_debates(count: int, topics: List[str], themes: List[str], sides: Iterable[str] = ('FOR', 'AGAINST'),
+                 seed: int = 0) -> Iterator[Plan]:
+    """(debate_id, topic, side, theme), round-robin over themes so every theme gets an equal share"""
+    rng = random.Random(seed)
+    sides = list(sides)
+    for index in range(count):
+        yield f"sim_{index:06d}", rng.choice(topics), rng.choice(sides), themes[index % len(themes)]
+
+
+def usage_cost(usage: Dict[str, Dict], prices: Dict[str, Tuple[float, float]]) -> float:
+    cost = 0.0
+    for provider, counts in usage.items():
+        price_in, price_out = prices.get(provider, (0.0, 0.0))
+        cost += (counts['prompt_tokens'] * price_in + counts['completion_tokens'] * price_out) / 1e6
+    return cost
+
+
+class Reservoir:
+    """Uniform sample of at most `size` values, for percentiles over an unbounded stream"""
+
+    def __init__(self, size: int = 2048, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self.values = []
+        self._rng = random.Random(seed)
+
+    def add(self, value: float):
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self.values[slot] = value
+
+    def percentile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ThemeSummary:
+    """Running totals for one theme; only counters and fixed-size samples are kept"""
+
+    def __init__(self):
+        self.debates = 0
+        self.failures = 0
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.grades = {}
+        self.debate_seconds = Reservoir()
+        self.response_seconds = Reservoir()
+        self.analysis_seconds = Reservoir()
+
+    def add(self, record: Dict):
+        self.debates += 1
+        for counts in record['usage'].values():
+            self.calls += counts['calls']
+            self.prompt_tokens += counts['prompt_tokens']
+            self.completion_tokens += counts['completion_tokens']
+        self.cost += record['cost']
+        if record.get('error'):
+            self.failures += 1
+            return
+        self.debate_seconds.add(record['seconds'])
+        for turn in record['turns']:
+            self.response_seconds.add(turn['response_seconds'])
+            self.analysis_seconds.add(turn['analysis_seconds'])
+            grade = turn['grade']
+            self.grades[grade] = self.grades.get(grade, 0) + 1
+
+    def to_dict(self) -> Dict:
+        completed = self.debates - self.failures
+        return {
+            'debates': self.debates,
+            'failures': self.failures,
+            'calls': self.calls,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'tokens_per_debate': (self.prompt_tokens + self.completion_tokens) / completed if completed else 0.0,
+            'cost': round(self.cost, 6),
+            'cost_per_debate': self.cost / completed if completed else 0.0,
+            'debate_p50': self.debate_seconds.percentile(0.5),
+            'debate_p95': self.debate_seconds.percentile(0.95),
+            'response_p50': self.response_seconds.percentile(0.5),
+            'response_p95': self.response_seconds.percentile(0.95),
+            'analysis_p50': self.analysis_seconds.percentile(0.5),
+            'analysis_p95': self.analysis_seconds.percentile(0.95),
+            'grades': dict(sorted(self.grades.items()))
+        }
+
+
+class Tournament:
+    """Runs planned debates on a bounded thread pool and streams one JSON line per debate.
+
+    At most `concurrency` debates run at once and at most twice that are
+    submitted, so memory stays flat however many debates are planned;
+    finished records are written and folded into per-theme totals, then
+    dropped.
+    """
+
+    def __init__(self, engine, turns: int = 3, concurrency: int = 8,
+                 prices: Optional[Dict[str, Tuple[float, float]]] = None, seed: int = 0):
+        self.engine = engine
+        self.turns = turns
+        self.concurrency = concurrency
+        self.prices = prices if prices is not None else DEFAULT_PRICES
+        self.seed = seed
+        self.themes = {}
+        self.completed = 0
+        self.started_at = None
+        self._lock = threading.Lock()
+
+    def run_debate(self, debate_id: str, topic: str, side: str, theme: str) -> Dict:
+        rng = random.Random(f"{self.seed}:{debate_id}")
+        record = {'debate_id': debate_id, 'topic': topic, 'side': side, 'theme': theme, 'turns': []}
+        start = time.perf_counter()
+        try:
+            with self.engine.usage_meter() as usage:
+                opened = time.perf_counter()
+                opening = self.engine.generate_opening(topic, side, theme)
+                record['opening'] = opening
+                record['opening_seconds'] = time.perf_counter() - opened
+                history = [{'speaker': 'ai', 'message': opening}]
+
+                for argument in scripted_arguments(topic, side, self.turns, rng):
+                    began = time.perf_counter()
+                    response = self.engine.generate_response(argument, topic, side, theme, history)
+                    responded = time.perf_counter()
+                    feedback = self.engine.analyze_argument(argument, theme)
+                    analysed = time.perf_counter()
+                    history += [{'speaker': 'user', 'message': argument}, {'speaker': 'ai', 'message': response}]
+                    record['turns'].append({
+                        'argument': argument,
+                        'response': response,
+                        'grade': feedback.get('grade'),
+                        'feedback': feedback.get('overall_feedback'),
+                        'response_seconds': responded - began,
+                        'analysis_seconds': analysed - responded
+                    })
+        except Exception as e:
+            record['error'] = str(e)
+        record['seconds'] = time.perf_counter() - start
+        record['usage'] = usage
+        record['cost'] = usage_cost(usage, self.prices)
+        return record
+
+    def _collect(self, record: Dict, out):
+        out.write(json.dumps(record) + "\n")
+        with self._lock:
+            self.themes.setdefault(record['theme'], ThemeSummary()).add(record)
+            self.completed += 1
+
+    def run(self, plan: Iterable[Plan], out, progress_every: int = 100) -> Dict:
+        """Runs every planned debate, writing records to the open text file `out`"""
+        self.started_at = time.perf_counter()
+        pending = set()
+        plan = iter(plan)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='simulate') as pool:
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.concurrency * 2:
+                    item = next(plan, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(self.run_debate, *item))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result(), out)
+                    if progress_every and self.completed % progress_every == 0:
+                        out.flush()
+                        print(f"🏁 {self.completed} debates ({self.rate():.0f}/hour)")
+        out.flush()
+        return self.summary()
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return self.completed / elapsed * 3600 if elapsed else 0.0
+
+    def summary(self) -> Dict:
+        with self._lock:
+            themes = {theme: summary.to_dict() for theme, summary in sorted(self.themes.items())}
+        return {
+            'debates': self.completed,
+            'seconds': time.perf_counter() - self.started_at if self.started_at else 0.0,
+            'debates_per_hour': self.rate(),
+            'cost': round(sum(theme['cost'] for theme in themes.values()), 6),
+            'themes': themes
+        }
@@ -0,0 +1,163 @@
+"""
+Speculative rebuttals: start generating while the user is still talking, from partial transcripts
+"""
+import difflib
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from utils.jobs import DONE, FINISHED_STATES, JobQueue
+from utils.response_cache import LRUCache, cache_key
+
+WORD = re.compile(r"[a-z0-9']+")
+
+
+def transcript_similarity(a: str, b: str) -> float:
+    """Word-level similarity in [0, 1]; a partial that is 80% of the final transcript scores ~0.9"""
+    words_a, words_b = WORD.findall(a.lower()), WORD.findall(b.lower())
+    if not words_a and not words_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, words_a, words_b, autojunk=False).ratio()
+
+
+class SpeculativeReplies:
+    """Runs 'speculative_reply' jobs on partial transcripts and hands a finished one to the final turn.
+
+    partial() starts a job once the transcript has `min_words` words and
+    re-issues it (cancelling the old one) when the transcript has drifted
+    below `reissue_below` similarity from what the job was started with,
+    at most every `min_interval` seconds. take() returns the job's result
+    for the final transcript if it is at least `accept_at` similar to the
+    speculated one and the debate has not moved on, waiting for it if it
+    is still running; otherwise it cancels it and the caller generates as
+    usual. One speculation per debate is tracked in `index`, which can be
+    shared (SQLiteCache) so a final turn on another worker finds it. It
+    records the turn index it was made for, and a speculation left over
+    from another turn is discarded (its job cancelled) by the next
+    partial() or take().
+    """
+
+    def __init__(self, job_queue: JobQueue, index=None, min_words: int = 10, reissue_below: float = 0.85,
+                 accept_at: float = 0.8, min_interval: float = 1.0):
+        self.job_queue = job_queue
+        self.index = index if index is not None else LRUCache(max_size=1024, ttl=300)
+        self.min_words = min_words
+        self.reissue_below = reissue_below
+        self.accept_at = accept_at
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self.totals = {
+            'partials': 0, 'started': 0, 'reissued': 0, 'stale': 0, 'hits': 0, 'rejected': 0, 'misses': 0,
+            'failed': 0, 'cancelled_in_flight': 0, 'wasted_completion_tokens': 0, 'used_completion_tokens': 0,
+            'latency_saved_seconds': 0.0, 'final_wait_seconds': 0.0
+        }
+
+    def partial(self, debate_id: str, turn: int, text: str, payload: Dict) -> Dict:
+        """Feed a partial transcript; payload is the job payload without the argument"""
+        key = cache_key('speculative_reply', debate_id)
+        with self._lock:
+            self.totals['partials'] += 1
+            if len(WORD.findall(text.lower())) < self.min_words:
+                return {'status': 'listening'}
+            current = self.index.get(key)
+            if current is not None and current['turn'] != turn:
+                # Left over from an earlier turn (or a turn that was never submitted)
+                self._discard(current)
+                self.index.set(key, None)
+                self.totals['stale'] += 1
+                current = None
+            if current is not None:
+                if (transcript_similarity(current['text'], text) >= self.reissue_below
+                        or time.time() - current['started_at'] < self.min_interval):
+                    return self._handle(current)
+                self._discard(current)
+                self.totals['reissued'] += 1
+            job_id = self.job_queue.submit('speculative_reply', dict(payload, argument=text), tag=debate_id)
+            current = {'job_id': job_id, 'text': text, 'turn': turn, 'started_at': time.time()}
+            self.index.set(key, current)
+            self.totals['started'] += 1
+        return self._handle(current)
+
+    def take(self, debate_id: str, turn: int, text: str, timeout: float = 60) -> Optional[Dict]:
+        """The speculative job's result ({'reply', ...}) for this final transcript, or None to generate normally"""
+        key = cache_key('speculative_reply', debate_id)
+        with self._lock:
+            current = self.index.get(key)
+            self.index.set(key, None)
+            if current is None:
+                self.totals['misses'] += 1
+                return None
+            if current['turn'] != turn:
+                self.totals['stale'] += 1
+                self._discard(current)
+                return None
+            if transcript_similarity(current['text'], text) < self.accept_at:
+                self.totals['rejected'] += 1
+                self._discard(current)
+                return None
+
+        started = time.time()
+        job = self.job_queue.wait(current['job_id'], timeout=timeout)
+        waited = time.time() - started
+        with self._lock:
+            if job is None or job['status'] != DONE:
+                self.totals['failed'] += 1
+                return None
+            self.totals['hits'] += 1
+            self.totals['used_completion_tokens'] += job['result']['completion_tokens']
+            self.totals['final_wait_seconds'] += waited
+            # Without speculation the whole generation would have started now
+            self.totals['latency_saved_seconds'] += max(job.get('run_seconds', 0.0) - waited, 0.0)
+        return job['result']
+
+    def transcription_callback(self, debate_id: str, turn: int, payload: Dict, on_final: Callable[[str], None]):
+        """A start_realtime_transcription callback: partials speculate, the final transcript goes to on_final"""
+        def callback(text, is_partial=False, is_error=False):
+            if is_error:
+                self.discard(debate_id)
+            elif is_partial:
+                self.partial(debate_id, turn, text, payload)
+            else:
+                on_final(text)
+        return callback
+
+    def cancelled(self, completion_tokens: int):
+        """Called by the job handler when a speculation is cancelled mid-generation"""
+        with self._lock:
+            self.totals['wasted_completion_tokens'] += completion_tokens
+
+    def discard(self, debate_id: str):
+        key = cache_key('speculative_reply', debate_id)
+        with self._lock:
+            current = self.index.get(key)
+            self.index.set(key, None)
+            if current is not None:
+                self._discard(current)
+
+    def _discard(self, current: Dict):
+        """Caller holds self._lock: cancel a speculation that will not be used"""
+        job = self.job_queue.get(current['job_id'])
+        if job is None:
+            return
+        if job['status'] == DONE:
+            self.totals['wasted_completion_tokens'] += job['result']['completion_tokens']
+        elif job['status'] not in FINISHED_STATES:
+            self.totals['cancelled_in_flight'] += 1
+            self.job_queue.cancel(current['job_id'], reason='speculation discarded')
+
+    def _handle(self, current: Dict) -> Dict:
+        job = self.job_queue.get(current['job_id']) or {'status': 'unknown'}
+        status = 'ready' if job['status'] == DONE else 'failed' if job['status'] in FINISHED_STATES else 'thinking'
+        return {'status': status, 'job_id': current['job_id'], 'speculated': current['text']}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+        speculated = stats['hits'] + stats['rejected'] + stats['failed']
+        finals = speculated + stats['misses']
+        # accuracy: final turns with a speculation that could use it; hit_rate: of all final turns
+        stats['accuracy'] = stats['hits'] / speculated if speculated else 0.0
+        stats['hit_rate'] = stats['hits'] / finals if finals else 0.0
+        stats['avg_latency_saved_seconds'] = stats['latency_saved_seconds'] / stats['hits'] if stats['hits'] else 0.0
+        return stats
@@ -0,0 +1,74 @@
+"""
+Speculative TTS synthesis of AI replies before the client asks for audio
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+from utils.jobs import CANCELLED, DONE, FINISHED_STATES, JobQueue
+from utils.response_cache import LRUCache, cache_key
+
+
+class SpeculativeTTS:
+    """Starts 'tts' jobs as soon as a reply exists and lets later requests attach.
+
+    Keys are (theme, voice, text) so a /text_to_speech request for the same
+    reply waits on the job that is already running instead of synthesizing
+    again. `voice_for` resolves a theme to its current voice, so a clip
+    made before the theme's voice was changed is not handed out after.
+    Passing a shared index (SQLiteCache) together with a durable job queue
+    lets a request on one worker process attach to a job started by another.
+    """
+
+    def __init__(self, job_queue: JobQueue, index=None, voice_for: Optional[Callable[[str], Optional[str]]] = None):
+        self.job_queue = job_queue
+        self.voice_for = voice_for
+        self.index = index if index is not None else LRUCache(max_size=512)
+        self._lock = threading.Lock()
+        self.stats = {'started': 0, 'attached': 0, 'ready_on_request': 0, 'misses': 0}
+
+    def _key(self, text: str, theme: str) -> str:
+        voice = self.voice_for(theme) if self.voice_for else None
+        return cache_key('tts', theme, voice, text)
+
+    def start(self, text: str, theme: str, debate_id: str) -> Dict:
+        key = self._key(text, theme)
+        with self._lock:
+            job_id = self.index.get(key)
+            job = self.job_queue.get(job_id) if job_id is not None else None
+            # A job cancelled with its debate doesn't count as a synthesis in progress
+            if job is None or job['status'] == CANCELLED:
+                job_id = self.job_queue.submit(
+                    'tts', {'text': text, 'debate_id': debate_id, 'theme': theme}, tag=debate_id
+                )
+                self.index.set(key, job_id)
+                self.stats['started'] += 1
+        return self.handle(job_id)
+
+    def handle(self, job_id: str) -> Dict:
+        job = self.job_queue.get(job_id) or {'status': 'unknown', 'result': None}
+        handle = {'job_id': job_id, 'status': 'pending'}
+        if job['status'] == DONE:
+            handle['status'] = 'ready'
+            handle['audio_path'] = job['result']['audio_path']
+        elif job['status'] in FINISHED_STATES:
+            handle['status'] = 'failed'
+        return handle
+
+    def result(self, text: str, theme: str, timeout: float = 60) -> Optional[str]:
+        """Audio path of a speculative synthesis for this reply, waiting if still running"""
+        with self._lock:
+            job_id = self.index.get(self._key(text, theme))
+            if job_id is None:
+                self.stats['misses'] += 1
+                return None
+
+        job = self.job_queue.get(job_id)
+        ready = job is not None and job['status'] == DONE
+        with self._lock:
+            self.stats['ready_on_request' if ready else 'attached'] += 1
+        if not ready:
+            job = self.job_queue.wait(job_id, timeout=timeout)
+
+        if job is None or job['status'] != DONE:
+            return None
+        return job['result']['audio_path']
@@ -0,0 +1,182 @@
+"""
+Race several transcription backends and keep the first usable transcript
+"""
+import queue
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.cancellation import CancelToken, Cancelled
+
+# A backend takes (audio_file_path, cancel_event) and returns text or None.
+# Long-running backends should poll cancel_event and give up when it is set.
+Backend = Tuple[str, Callable[[str, threading.Event], Optional[str]]]
+
+WORD = re.compile(r'\w')
+ERROR_PREFIXES = ('error', 'api error', 'upload failed', 'transcription request failed', 'transcription failed',
+                  'transcription error', 'transcription timeout', 'transcription cancelled')
+
+
+def is_usable_transcript(text) -> bool:
+    """Default quality check: real text, not one of the error strings backends return"""
+    if not isinstance(text, str):
+        return False
+    text = text.strip()
+    if not text or text.startswith('❌') or text.lower().startswith(ERROR_PREFIXES):
+        return False
+    return WORD.search(text) is not None
+
+
+class TranscriptionOrchestrator:
+    """Start backends staggered, return the first result that passes the quality check.
+
+    The first backend starts immediately; the next one starts after
+    `stagger` seconds, or as soon as every running backend has failed.
+    Once a winner is found the shared cancel event is set so the others
+    stop polling. Per-backend latency and success rate decide the order
+    next time: the backend with the lowest expected time to a usable
+    transcript (average latency / success rate) goes first. Backends with
+    fewer than `min_samples` attempts keep their given order ahead of
+    measured ones, so new backends get tried.
+    """
+
+    def __init__(self, stagger: float = 5.0, timeout: float = 180.0,
+                 quality_check: Callable[[str], bool] = is_usable_transcript, min_samples: int = 3):
+        self.stagger = stagger
+        self.timeout = timeout
+        self.quality_check = quality_check
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self.backend_stats = {}
+        self.totals = {'requests': 0, 'succeeded': 0, 'failed': 0, 'cancelled': 0, 'seconds': 0.0}
+
+    def _stats_for(self, name: str) -> Dict:
+        return self.backend_stats.setdefault(name, {
+            'attempts': 0, 'successes': 0, 'failures': 0, 'cancelled': 0, 'wins': 0, 'latency_seconds': 0.0
+        })
+
+    def expected_seconds(self, name: str) -> Optional[float]:
+        with self._lock:
+            stats = self.backend_stats.get(name)
+            if not stats:
+                return None
+            finished = stats['successes'] + stats['failures']
+            if finished < self.min_samples:
+                return None
+            success_rate = stats['successes'] / finished
+            avg_latency = stats['latency_seconds'] / stats['successes'] if stats['successes'] else self.timeout
+            return avg_latency / max(success_rate, 0.05)
+
+    def order(self, backends: Sequence[Backend]) -> List[Backend]:
+        expected = {name: self.expected_seconds(name) for name, _ in backends}
+        return sorted(backends, key=lambda backend: (
+            expected[backend[0]] is not None,
+            expected[backend[0]] or 0.0
+        ))
+
+    def _record(self, name: str, outcome: str, latency: float = 0.0):
+        with self._lock:
+            stats = self._stats_for(name)
+            stats[outcome] += 1
+            if outcome == 'successes':
+                stats['latency_seconds'] += latency
+
+    def _run_backend(self, name, fn, audio_file_path, cancel_event, results):
+        start = time.perf_counter()
+        try:
+            text = fn(audio_file_path, cancel_event)
+            error = None
+        except Exception as e:
+            text, error = None, e
+        results.put((name, text, time.perf_counter() - start, error))
+
+    def transcribe(self, audio_file_path: str, backends: Sequence[Backend],
+                   fallbacks: Sequence[Backend] = (), cancel: Optional[CancelToken] = None) -> Optional[str]:
+        """Run `backends` (reordered by history); `fallbacks` only start once all of those failed.
+
+        Raises Cancelled if `cancel` is set first; the backends are stopped with it.
+        """
+        started_at = time.perf_counter()
+        deadline = time.time() + self.timeout
+        cancel_event = cancel.child() if cancel is not None else CancelToken()
+        results = queue.Queue()
+        pending = self.order(backends)
+        fallbacks = list(fallbacks)
+        running = set()
+        next_start = time.time()
+
+        with self._lock:
+            self.totals['requests'] += 1
+
+        winner = None
+        while winner is None and not cancel_event.is_set():
+            now = time.time()
+            if not running and not pending and fallbacks:
+                pending, fallbacks = fallbacks, []
+                next_start = now
+            if pending and now >= next_start:
+                name, fn = pending.pop(0)
+                print(f"🔄 Transcribing with {name}...")
+                with self._lock:
+                    self._stats_for(name)['attempts'] += 1
+                running.add(name)
+                threading.Thread(
+                    target=self._run_backend,
+                    args=(name, fn, audio_file_path, cancel_event, results),
+                    daemon=True
+                ).start()
+                next_start = now + self.stagger
+                continue
+            if not running or now >= deadline:
+                break
+
+            wait = deadline - now
+            if pending:
+                wait = min(wait, max(next_start - now, 0))
+            if cancel is not None:
+                wait = min(wait, 0.25)
+            try:
+                name, text, latency, error = results.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+            running.discard(name)
+            if error is None and self.quality_check(text):
+                self._record(name, 'successes', latency)
+                self._record(name, 'wins')
+                print(f"✅ {name} transcription in {latency:.2f}s")
+                winner = text.strip()
+            else:
+                self._record(name, 'failures')
+                print(f"❌ {name} transcription failed: {error or text!r}")
+                # Don't wait out the stagger when nothing is left running
+                if not running:
+                    next_start = time.time()
+
+        cancelled = winner is None and cancel is not None and cancel.is_set()
+        cancel_event.set()
+        for name in running:
+            self._record(name, 'cancelled')
+
+        with self._lock:
+            self.totals['cancelled' if cancelled else 'succeeded' if winner else 'failed'] += 1
+            self.totals['seconds'] += time.perf_counter() - started_at
+        if cancelled:
+            raise Cancelled(cancel.reason)
+        return winner
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+            backends = {name: dict(values) for name, values in self.backend_stats.items()}
+        for name, values in backends.items():
+            finished = values['successes'] + values['failures']
+            values['success_rate'] = values['successes'] / finished if finished else None
+            values['avg_latency_seconds'] = (
+                values['latency_seconds'] / values['successes'] if values['successes'] else None
+            )
+            values['expected_seconds'] = self.expected_seconds(name)
+        stats['backends'] = backends
+        stats['avg_seconds'] = stats['seconds'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
@@ -0,0 +1,370 @@
+"""
+Append-only transcript store: every debate and turn, kept after the session is gone
+"""
+import base64
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.shared_store import ThreadLocalDB
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS debates (
+        debate_id TEXT PRIMARY KEY,
+        user_id TEXT,
+        topic TEXT NOT NULL,
+        side TEXT,
+        theme TEXT,
+        started_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS debates_started ON debates (started_at, debate_id)",
+    "CREATE INDEX IF NOT EXISTS debates_user ON debates (user_id, started_at, debate_id)",
+    "CREATE INDEX IF NOT EXISTS debates_topic ON debates (topic, started_at, debate_id)",
+    "CREATE INDEX IF NOT EXISTS debates_theme ON debates (theme, started_at, debate_id)",
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        debate_id TEXT NOT NULL,
+        speaker TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        source TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS messages_debate ON messages (debate_id, id)",
+    # Full-text index over the messages table, kept current by triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        message, content='messages', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts (rowid, message) VALUES (new.id, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END
+    """
+]
+
+SEARCH_TERM = re.compile(r'"([^"]+)"|(\S+)')
+
+FILTERS = {
+    'user_id': 'user_id = ?',
+    'topic': 'topic = ?',
+    'theme': 'theme = ?',
+    'since': 'started_at >= ?',
+    'until': 'started_at < ?'
+}
+
+
+def encode_cursor(started_at: float, debate_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([started_at, debate_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        started_at, debate_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(started_at), str(debate_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def fts_query(text: str) -> str:
+    """Turn user input into an FTS5 query: all words must match, "quoted phrases" stay
+    phrases, and a trailing * is a prefix search. Operators are never interpreted."""
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(text):
+        term = phrase or word
+        prefix = not phrase and term.endswith('*') and len(term) > 1
+        term = term.rstrip('*') if prefix else term
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return " ".join(terms)
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+class TranscriptStore:
+    """Debates and their turns in SQLite (WAL), written once and never updated.
+
+    Listing uses keyset pagination on (started_at, debate_id), newest first,
+    so page 1000 costs the same as page 1; each filter has a matching
+    (column, started_at, debate_id) index. export() walks those pages and
+    yields one debate at a time, so callers can stream any number of
+    debates in constant memory.
+
+    Each commit rewrites whole pages, so one commit per turn writes ~50x
+    the message size. With flush_interval > 0 writes are queued and a
+    background thread commits whatever accumulated every flush_interval
+    seconds in one transaction (group commit); readers may then lag the
+    writer by that long. flush() waits for everything queued so far.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 0.0):
+        self.db = ThreadLocalDB(db_path)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = []
+        self._queued = 0
+        self._committed = 0
+        self._cond = threading.Condition()
+        self.totals = {'debates': 0, 'messages': 0, 'commits': 0, 'write_seconds': 0.0,
+                       'searches': 0, 'search_seconds': 0.0}
+        conn = self.db.conn()
+        had_index = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+        ).fetchone() is not None
+        for statement in SCHEMA:
+            conn.execute(statement)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+        if 'source' not in columns:
+            # Databases written before AI turns recorded where the reply came from
+            conn.execute("ALTER TABLE messages ADD COLUMN source TEXT")
+        if not had_index:
+            # Databases written before the index existed
+            conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+        if flush_interval:
+            threading.Thread(target=self._writer, daemon=True).start()
+
+    def _write(self, kind: str, sql: str, params: tuple):
+        if not self.flush_interval:
+            start = time.perf_counter()
+            self.db.conn().execute(sql, params)
+            with self._lock:
+                self.totals[kind] += 1
+                self.totals['commits'] += 1
+                self.totals['write_seconds'] += time.perf_counter() - start
+            return
+        with self._cond:
+            self._pending.append((kind, sql, params))
+            self._queued += 1
+            self._cond.notify_all()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.flush_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+
+            start = time.perf_counter()
+            conn = self.db.conn()
+            try:
+                conn.execute("BEGIN")
+                for _, sql, params in batch:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+                with self._lock:
+                    for kind, _, _ in batch:
+                        self.totals[kind] += 1
+                    self.totals['commits'] += 1
+                    self.totals['write_seconds'] += time.perf_counter() - start
+            except Exception as e:
+                print(f"❌ Transcript write failed, {len(batch)} rows lost: {e}")
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception as e:
+                    # No transaction left to roll back (BEGIN itself failed); keep the writer alive
+                    print(f"⚠️ Transcript rollback failed: {e}")
+
+            with self._cond:
+                self._committed += len(batch)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        if not self.flush_interval:
+            return True
+        with self._cond:
+            target = self._queued
+            return self._cond.wait_for(lambda: self._committed >= target, timeout=timeout)
+
+    def start_debate(self, debate_id: str, topic: str, side: Optional[str], theme: Optional[str],
+                     user_id: Optional[str] = None, started_at: Optional[float] = None):
+        self._write(
+            'debates',
+            "INSERT OR IGNORE INTO debates (debate_id, user_id, topic, side, theme, started_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (debate_id, user_id, topic or '', side, theme, started_at or time.time())
+        )
+
+    def append(self, debate_id: str, speaker: str, message: str, created_at: Optional[float] = None,
+               source: Optional[str] = None):
+        """source: where an AI turn came from, 'generated', 'reused' or 'mock'"""
+        self._write(
+            'messages',
+            "INSERT INTO messages (debate_id, speaker, message, created_at, source) VALUES (?, ?, ?, ?, ?)",
+            (debate_id, speaker, message, created_at or time.time(), source)
+        )
+
+    def list_debates(self, limit: int = 50, cursor: Optional[str] = None, **filters) -> Tuple[List[Dict], Optional[str]]:
+        """One page of debates, newest first. Returns (debates, next_cursor)."""
+        clauses, params = [], []
+        for name, value in filters.items():
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter '{name}'")
+            if value is not None:
+                clauses.append(FILTERS[name])
+                params.append(value)
+        if cursor:
+            started_at, debate_id = decode_cursor(cursor)
+            clauses.append("(started_at, debate_id) < (?, ?)")
+            params.extend([started_at, debate_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.db.conn().execute(f"""
+            SELECT debate_id, user_id, topic, side, theme, started_at FROM debates {where}
+            ORDER BY started_at DESC, debate_id DESC LIMIT ?
+        """, params + [limit]).fetchall()
+
+        debates = [{
+            'debate_id': debate_id,
+            'user_id': user_id,
+            'topic': topic,
+            'side': side,
+            'theme': theme,
+            'started_at': _iso(started_at)
+        } for debate_id, user_id, topic, side, theme, started_at in rows]
+        next_cursor = encode_cursor(rows[-1][5], rows[-1][0]) if len(rows) == limit else None
+        return debates, next_cursor
+
+    def get_debate(self, debate_id: str) -> Optional[Dict]:
+        row = self.db.conn().execute(
+            "SELECT debate_id, user_id, topic, side, theme, started_at FROM debates WHERE debate_id = ?",
+            (debate_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('debate_id', 'user_id', 'topic', 'side', 'theme'), row[:5]), started_at=_iso(row[5]))
+
+    def get_messages(self, debate_id: str, after: int = 0, limit: int = 200) -> Tuple[List[Dict], Optional[int]]:
+        """Turns of one debate in order, `limit` at a time. Returns (messages, next_after)."""
+        rows = self.db.conn().execute(
+            "SELECT id, speaker, message, created_at FROM messages WHERE debate_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (debate_id, after, limit)
+        ).fetchall()
+        messages = [{
+            'id': message_id,
+            'speaker': speaker,
+            'message': message,
+            'timestamp': _iso(created_at)
+        } for message_id, speaker, message, created_at in rows]
+        return messages, (rows[-1][0] if len(rows) == limit else None)
+
+    def iter_messages(self, debate_id: str, page_size: int = 500) -> Iterator[Dict]:
+        after = 0
+        while after is not None:
+            messages, after = self.get_messages(debate_id, after, page_size)
+            yield from messages
+
+    def iter_exchanges(self, limit: int = 20000) -> Iterator[Tuple[str, str, str, str, str]]:
+        """(topic, side, theme, argument, rebuttal) for user turns answered by a freshly generated AI
+        reply, most recent messages only. Reused and mock replies, and turns recorded before the
+        source was stored, are left out."""
+        yield from self.db.conn().execute("""
+            SELECT d.topic, d.side, d.theme, x.message, x.reply FROM (
+                SELECT debate_id, speaker, message,
+                       LEAD(speaker) OVER turns AS reply_speaker,
+                       LEAD(message) OVER turns AS reply,
+                       LEAD(source) OVER turns AS reply_source
+                FROM messages
+                WHERE id > (SELECT COALESCE(MAX(id), 0) - ? FROM messages)
+                WINDOW turns AS (PARTITION BY debate_id ORDER BY id)
+            ) x
+            JOIN debates d ON d.debate_id = x.debate_id
+            WHERE x.speaker = 'user' AND x.reply_speaker = 'ai' AND x.reply_source = 'generated'
+        """, (limit * 2,))
+
+    def export(self, page_size: int = 200, **filters) -> Iterator[Dict]:
+        """Every matching debate with its full history, one at a time"""
+        cursor = None
+        while True:
+            debates, cursor = self.list_debates(limit=page_size, cursor=cursor, **filters)
+            for debate in debates:
+                debate['history'] = list(self.iter_messages(debate['debate_id']))
+                yield debate
+            if cursor is None:
+                return
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, rank_limit: int = 5000, **filters) -> Dict:
+        """Messages matching `query` with a highlighted snippet, best bm25 rank first.
+
+        bm25 has to score every match, so a query matching more than
+        `rank_limit` messages (a very common word) is returned newest first
+        instead, with 'ranked': False. Filters: speaker, topic, theme, user_id,
+        and since/until (epoch seconds) on the debate's start time.
+        """
+        match = fts_query(query)
+        if not match:
+            return {'results': [], 'next_offset': None, 'ranked': True}
+
+        conn = self.db.conn()
+        start = time.perf_counter()
+        broad = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM messages_fts WHERE messages_fts MATCH ? LIMIT ?)",
+            (match, rank_limit + 1)
+        ).fetchone()[0] > rank_limit
+
+        clauses, params = ["messages_fts MATCH ?"], [match]
+        for name, column in (('speaker', 'm.speaker'), ('topic', 'd.topic'),
+                             ('theme', 'd.theme'), ('user_id', 'd.user_id')):
+            if filters.get(name):
+                clauses.append(f"{column} = ?")
+                params.append(filters[name])
+        for name, operator in (('since', '>='), ('until', '<')):
+            if filters.get(name) is not None:
+                clauses.append(f"d.started_at {operator} ?")
+                params.append(filters[name])
+
+        rows = conn.execute(f"""
+            SELECT m.id, m.debate_id, m.speaker, m.created_at, d.topic, d.side, d.theme,
+                   snippet(messages_fts, 0, '**', '**', '…', 16), bm25(messages_fts) AS score
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            LEFT JOIN debates d ON d.debate_id = m.debate_id
+            WHERE {' AND '.join(clauses)}
+            ORDER BY {'messages_fts.rowid DESC' if broad else 'score'} LIMIT ? OFFSET ?
+        """, params + [limit, offset]).fetchall()
+        with self._lock:
+            self.totals['searches'] += 1
+            self.totals['search_seconds'] += time.perf_counter() - start
+
+        results = [{
+            'message_id': message_id,
+            'debate_id': debate_id,
+            'speaker': speaker,
+            'timestamp': _iso(created_at),
+            'topic': topic,
+            'side': side,
+            'theme': theme,
+            'snippet': snippet,
+            'score': -score
+        } for message_id, debate_id, speaker, created_at, topic, side, theme, snippet, score in rows]
+        return {
+            'results': results,
+            'next_offset': offset + limit if len(rows) == limit else None,
+            'ranked': not broad
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals)
+        writes = stats['debates'] + stats['messages']
+        stats['rows_per_commit'] = writes / stats['commits'] if stats['commits'] else 0.0
+        stats['avg_commit_ms'] = stats['write_seconds'] / stats['commits'] * 1000 if stats['commits'] else 0.0
+        stats['avg_search_ms'] = stats['search_seconds'] / stats['searches'] * 1000 if stats['searches'] else 0.0
+        stats['flush_interval'] = self.flush_interval
+        with self._cond:
+            stats['pending'] = len(self._pending)
+        return stats
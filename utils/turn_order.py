@@ -0,0 +1,160 @@
+"""
+Per-debate turn serialization: one turn of a debate runs at a time, different debates in parallel
+"""
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.cancellation import CancelToken
+from utils.shared_store import ThreadLocalDB
+
+MODES = ('queue', 'reject', 'off')
+
+
+class TurnConflict(Exception):
+    """A turn could not run: another one holds the debate, the queue is full, or the debate changed"""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Debate:
+    def __init__(self):
+        self.cond = threading.Condition()
+        # Turns of this process in arrival order; the first one holds the debate
+        self.queue = []
+        self.users = 0
+
+
+class DebateLocks:
+    """Hands out the right to run a turn of a debate, one holder at a time.
+
+    Within a process waiting turns are served in arrival order.
+    Across worker processes a `debate_leases` row names the holder; other
+    processes poll for it, and a lease older than `lease` seconds (a
+    crashed worker) is taken over. With mode 'reject' an overlapping turn
+    fails at once instead of queueing; at most `max_waiting` turns queue
+    per debate in a process, and none waits longer than `wait_timeout`.
+    """
+
+    def __init__(self, db_path: str, mode: str = 'queue', lease: float = 180.0, wait_timeout: float = 120.0,
+                 max_waiting: int = 4, poll_interval: float = 0.05):
+        if mode not in MODES:
+            raise ValueError(f"Unknown turn order mode '{mode}'")
+        self.db = ThreadLocalDB(db_path)
+        self.mode = mode
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self.max_waiting = max_waiting
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._debates = {}
+        self.totals = {'turns': 0, 'queued': 0, 'rejected': 0, 'timeouts': 0, 'wait_seconds': 0.0}
+        self.db.conn().execute("""
+            CREATE TABLE IF NOT EXISTS debate_leases (
+                debate_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    @contextmanager
+    def hold(self, debate_id: str, cancel: Optional[CancelToken] = None):
+        """Run the body as the debate's only turn; raises TurnConflict if it can't get there"""
+        if self.mode == 'off':
+            yield
+            return
+
+        started = time.perf_counter()
+        with self._lock:
+            debate = self._debates.setdefault(debate_id, _Debate())
+            debate.users += 1
+        turn = object()
+        owner = None
+        try:
+            self._wait_in_line(debate, turn, cancel)
+            try:
+                owner = self._claim(debate_id, started, cancel)
+                self._count('turns', wait=time.perf_counter() - started)
+                yield
+            finally:
+                if owner is not None:
+                    self.db.conn().execute(
+                        "DELETE FROM debate_leases WHERE debate_id = ? AND owner = ?", (debate_id, owner)
+                    )
+                with debate.cond:
+                    debate.queue.remove(turn)
+                    debate.cond.notify_all()
+        finally:
+            with self._lock:
+                debate.users -= 1
+                if not debate.users:
+                    del self._debates[debate_id]
+
+    def _wait_in_line(self, debate: _Debate, turn: object, cancel: Optional[CancelToken]):
+        with debate.cond:
+            ahead = len(debate.queue)
+            if ahead and self.mode == 'reject':
+                self._count('rejected')
+                raise TurnConflict("Another turn of this debate is in progress", 'busy')
+            if ahead > self.max_waiting:
+                self._count('rejected')
+                raise TurnConflict(f"Too many turns queued for this debate ({ahead})", 'queue_full')
+            debate.queue.append(turn)
+            if ahead:
+                self._count('queued')
+            deadline = time.monotonic() + self.wait_timeout
+            try:
+                while debate.queue[0] is not turn:
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._count('timeouts')
+                        raise TurnConflict("Timed out waiting for the previous turn", 'timeout')
+                    debate.cond.wait(min(remaining, self.poll_interval * 4))
+            except BaseException:
+                # Turns behind this one must not wait for it
+                debate.queue.remove(turn)
+                debate.cond.notify_all()
+                raise
+
+    def _claim(self, debate_id: str, started: float, cancel: Optional[CancelToken]) -> str:
+        """Take the cross-process lease, waiting for another worker's turn to finish"""
+        owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        conn = self.db.conn()
+        while True:
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO debate_leases (debate_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(debate_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE debate_leases.expires_at < ?",
+                (debate_id, owner, now + self.lease, now)
+            )
+            if cursor.rowcount:
+                return owner
+            if self.mode == 'reject':
+                self._count('rejected')
+                raise TurnConflict("Another turn of this debate is in progress", 'busy')
+            if time.perf_counter() - started > self.wait_timeout:
+                self._count('timeouts')
+                raise TurnConflict("Timed out waiting for the previous turn", 'timeout')
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            time.sleep(self.poll_interval)
+
+    def _count(self, name: str, wait: float = 0.0):
+        with self._lock:
+            self.totals[name] += 1
+            self.totals['wait_seconds'] += wait
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.totals, active_debates=len(self._debates))
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['turns'] if stats['turns'] else 0.0
+        stats['mode'] = self.mode
+        return stats
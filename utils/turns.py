@@ -0,0 +1,102 @@
+"""
+Compact debate history: slotted turn records, integer speakers, epoch timestamps and a per-debate cap
+"""
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+SPEAKERS = ('user', 'ai')
+USER, AI = 0, 1
+SPEAKER_CODES = {name: code for code, name in enumerate(SPEAKERS)}
+
+DEFAULT_CAP = 40
+
+
+class Turn:
+    """One turn of a debate.
+
+    Indexing by the old dict keys ('speaker', 'message', 'timestamp') still
+    works, so code written against the dict entries accepts turns as is.
+    """
+
+    __slots__ = ('speaker', 'message', 'at')
+
+    def __init__(self, speaker: int, message: str, at: float):
+        self.speaker = speaker
+        self.message = message
+        self.at = at
+
+    def __getitem__(self, key: str):
+        if key == 'speaker':
+            return SPEAKERS[self.speaker]
+        if key == 'message':
+            return self.message
+        if key == 'timestamp':
+            return datetime.fromtimestamp(self.at).isoformat()
+        raise KeyError(key)
+
+    def to_dict(self) -> Dict:
+        return {'speaker': self['speaker'], 'message': self.message, 'timestamp': self['timestamp']}
+
+
+class DebateHistory:
+    """The latest `cap` turns of a debate, with a count of the older ones.
+
+    Every turn is also written to the transcript store, so turns past the
+    cap are dropped from memory (and from the session) rather than copied
+    anywhere; all() reads them back from the store when the whole debate
+    is needed. In the session the history is stored as
+    {"spilled": n, "turns": [[speaker, message, epoch], ...]}.
+    """
+
+    __slots__ = ('turns', 'spilled', 'cap')
+
+    def __init__(self, turns: Optional[List[Turn]] = None, spilled: int = 0, cap: int = DEFAULT_CAP):
+        self.turns = turns or []
+        self.spilled = spilled
+        self.cap = cap
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self.turns)
+
+    def append(self, speaker: str, message: str, at: float) -> Turn:
+        turn = Turn(SPEAKER_CODES[speaker], message, at)
+        self.turns.append(turn)
+        overflow = len(self.turns) - self.cap
+        if overflow > 0:
+            del self.turns[:overflow]
+            self.spilled += overflow
+        return turn
+
+    def encode(self) -> Dict:
+        return {'spilled': self.spilled, 'turns': [[turn.speaker, turn.message, turn.at] for turn in self.turns]}
+
+    @classmethod
+    def decode(cls, data, cap: int = DEFAULT_CAP) -> 'DebateHistory':
+        if not data:
+            return cls(cap=cap)
+        if isinstance(data, list):
+            # Sessions written before the compact format: a list of {'speaker', 'message', 'timestamp'}
+            history = cls(cap=cap)
+            for entry in data:
+                history.append(entry['speaker'], entry['message'],
+                               datetime.fromisoformat(entry['timestamp']).timestamp())
+            return history
+        return cls([Turn(speaker, message, at) for speaker, message, at in data['turns']], data['spilled'], cap)
+
+    def all(self, store, debate_id: str) -> List[Turn]:
+        """Every turn of the debate, the spilled ones read back from the transcript store"""
+        if not self.spilled:
+            return list(self.turns)
+        spilled, _ = store.get_messages(debate_id, 0, self.spilled)
+        if len(spilled) < self.spilled:
+            # Some of them may still be waiting for the store's group commit
+            store.flush()
+            spilled, _ = store.get_messages(debate_id, 0, self.spilled)
+        return [
+            Turn(SPEAKER_CODES[entry['speaker']], entry['message'],
+                 datetime.fromisoformat(entry['timestamp']).timestamp())
+            for entry in spilled
+        ] + self.turns
@@ -6,6 +6,8 @@ import time
 import tempfile
 from typing import Optional
 
+from utils.audio_pipeline import pcm_audio
+
 # Try to import AssemblyAI with fallback
 try:
     import assemblyai as aai
@@ -105,7 +107,7 @@ class VoiceManager:
         if self.speech_recognition_available:
             try:
                 r = sr.Recognizer()
-                with sr.AudioFile(audio_file_path) as source:
+                with pcm_audio(audio_file_path) as pcm_path, sr.AudioFile(pcm_path) as source:
                     audio = r.record(source)
                     text = r.recognize_google(audio)
                     print("✅ Google Speech Recognition successful")
@@ -255,7 +257,7 @@ class VoiceManager:
             self.tts_engine.save_to_file(text, audio_path)
             self.tts_engine.runAndWait()
             
-            return f"/static/audio/{audio_filename}"
+            return f"/audio/{audio_filename}"
             
         except Exception as e:
             print(f"⚠️ TTS error: {e}")
@@ -0,0 +1,184 @@
+"""
+Cached TTS voice inventory and theme -> voice mapping, shared by every worker through one JSON file
+"""
+import glob
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Dict, List
+
+# Keywords matched against voice names, first match wins; unmatched themes get the first voice
+THEME_VOICE_KEYWORDS = {
+    'sassy': ['female', 'zira', 'hazel'],
+    'ruthless': ['male', 'david', 'mark'],
+    'sweet': ['female', 'zira', 'hazel'],
+    'innocent': ['female', 'zira', 'hazel'],
+    'bestie': ['female', 'zira', 'hazel'],
+    'flirty': ['male', 'david', 'mark'],
+    'objective': ['male', 'david'],
+    'teacher': ['female', 'zira'],
+    'philosopher': ['male', 'david']
+}
+
+# Where installed voices live; their listings (and the SAPI registry on Windows) make up the fingerprint
+VOICE_DIRS = [
+    '/System/Library/Speech/Voices', '/Library/Speech/Voices', '~/Library/Speech/Voices',
+    '/usr/share/espeak-ng-data/voices', '/usr/lib/*/espeak-ng-data/voices', '/usr/share/espeak-data/voices',
+    '%WINDIR%/Speech/Engines/TTS', '%WINDIR%/Speech_OneCore/Engines/TTS'
+]
+SAPI_TOKEN_KEYS = [r'SOFTWARE\Microsoft\Speech\Voices\Tokens', r'SOFTWARE\Microsoft\Speech_OneCore\Voices\Tokens']
+
+
+def _windows_voice_tokens() -> List[str]:
+    try:
+        import winreg
+    except ImportError:
+        return []
+    tokens = []
+    for key_path in SAPI_TOKEN_KEYS:
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                tokens.extend(winreg.EnumKey(key, i) for i in range(winreg.QueryInfoKey(key)[0]))
+        except OSError:
+            continue
+    return tokens
+
+
+def voice_fingerprint() -> str:
+    """Changes when the platform or the installed voices change, without starting a TTS engine"""
+    parts = [sys.platform, platform.release(), platform.machine()]
+    for pattern in VOICE_DIRS:
+        for directory in sorted(glob.glob(os.path.expandvars(os.path.expanduser(pattern)))):
+            try:
+                entries = sorted(os.listdir(directory))
+                parts.append(f"{directory}:{os.stat(directory).st_mtime_ns}:{','.join(entries)}")
+            except OSError:
+                continue
+    parts.extend(_windows_voice_tokens())
+    return hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def map_themes(voices: List[Dict], keywords: Dict[str, List[str]] = THEME_VOICE_KEYWORDS) -> Dict[str, str]:
+    if not voices:
+        return {}
+    mapping = {}
+    for theme, words in keywords.items():
+        match = next((voice for voice in voices if any(word in voice['name'].lower() for word in words)), None)
+        mapping[theme] = (match or voices[0])['id']
+    return mapping
+
+
+class VoiceCatalog:
+    """The voice scan's results, kept on disk and reused while the fingerprint matches.
+
+    The file also holds operator overrides (theme -> voice id), which
+    survive rescans. Every process re-reads the file when it changes, so
+    an override set through one worker applies in all of them.
+    """
+
+    def __init__(self, path: str, keywords: Dict[str, List[str]] = THEME_VOICE_KEYWORDS):
+        self.path = path
+        self.keywords = keywords
+        self._lock = threading.Lock()
+        self._data = {'fingerprint': None, 'voices': [], 'mapping': {}, 'overrides': {}}
+        self._mtime = None
+        self.source = None
+        self.scan_seconds = None
+
+    @classmethod
+    def from_env(cls) -> 'VoiceCatalog':
+        path = os.getenv('VOICE_CATALOG') or os.path.join(os.getenv('DEBATE_DATA_DIR', 'data'), 'voices.json')
+        return cls(path)
+
+    def load(self) -> bool:
+        """Use the cached scan if it matches this machine's voices"""
+        self._reload()
+        with self._lock:
+            if self._data['voices'] and self._data['fingerprint'] == voice_fingerprint():
+                self.source = 'cache'
+                return True
+        return False
+
+    def discover(self, engine) -> List[Dict]:
+        """Enumerate the engine's voices, map themes to them and save the result"""
+        started = time.perf_counter()
+        voices = [{'id': voice.id, 'name': voice.name} for voice in engine.getProperty('voices') or []]
+        self._reload()
+        with self._lock:
+            self._data.update(fingerprint=voice_fingerprint(), voices=voices,
+                              mapping=map_themes(voices, self.keywords), scanned_at=time.time())
+            self.scan_seconds = time.perf_counter() - started
+            self.source = 'scan'
+            self._save()
+        return voices
+
+    def voices(self) -> List[Dict]:
+        self._reload()
+        with self._lock:
+            return list(self._data['voices'])
+
+    def mapping(self) -> Dict[str, str]:
+        """theme -> voice id, overrides applied"""
+        self._reload()
+        with self._lock:
+            return dict(self._data['mapping'], **self._data['overrides'])
+
+    def set_override(self, theme: str, voice_id: str):
+        if voice_id not in {voice['id'] for voice in self.voices()}:
+            raise ValueError(f"Unknown voice: {voice_id}")
+        self._reload()
+        with self._lock:
+            self._data['overrides'][theme] = voice_id
+            self._save()
+
+    def clear_override(self, theme: str) -> bool:
+        self._reload()
+        with self._lock:
+            removed = self._data['overrides'].pop(theme, None) is not None
+            if removed:
+                self._save()
+        return removed
+
+    def describe(self) -> Dict:
+        self._reload()
+        with self._lock:
+            return {
+                'voices': list(self._data['voices']),
+                'mapping': dict(self._data['mapping'], **self._data['overrides']),
+                'scanned': dict(self._data['mapping']),
+                'overrides': dict(self._data['overrides']),
+                'fingerprint': self._data['fingerprint'],
+                'scanned_at': self._data.get('scanned_at'),
+                'source': self.source,
+                'scan_seconds': self.scan_seconds
+            }
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return
+            self._data = dict({'overrides': {}}, **data)
+            self._mtime = mtime
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=1)
+        os.replace(partial, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
@@ -37,7 +37,7 @@ class VoiceManagerFallback:
             print(f"⚠️ TTS initialization error: {e}")
             self.tts_engine = None
     
-    def transcribe_audio(self, audio_file_path: str) -> str:
+    def transcribe_audio(self, audio_file_path: str, cancel=None) -> str:
         """Fallback transcription - returns message about missing PyAudio"""
         return "Voice transcription unavailable - AssemblyAI not configured. Please type your argument instead."
     
@@ -58,7 +58,7 @@ class VoiceManagerFallback:
             self.tts_engine.save_to_file(text, audio_path)
             self.tts_engine.runAndWait()
             
-            return f"/static/audio/{audio_filename}"
+            return f"/audio/{audio_filename}"
             
         except Exception as e:
             print(f"⚠️ TTS error: {e}")
@@ -1,37 +1,26 @@
+import importlib.util
 import os
 import requests
-import pyttsx3
 import threading
 import time
 import tempfile
 import re
+import hashlib
+import uuid
 from typing import Optional, Callable
 
-ASSEMBLYAI_AVAILABLE = False
-ASSEMBLYAI_STREAMING_AVAILABLE = False
+from utils import provider_tape
+from utils.local_stt import LocalSTT
+from utils.transcription import TranscriptionOrchestrator
+from utils.voice_catalog import VoiceCatalog
 
-try:
-    import assemblyai as aai
-    ASSEMBLYAI_AVAILABLE = True
-    print("✅ AssemblyAI base module loaded")
-except ImportError as e:
-    print(f"❌ AssemblyAI base not available: {e}")
-
-try:
-    from assemblyai.streaming.v3 import (
-        BeginEvent,
-        StreamingClient,
-        StreamingClientOptions,
-        StreamingError,
-        StreamingEvents,
-        StreamingParameters,
-        TerminationEvent,
-        TurnEvent,
-    )
-    ASSEMBLYAI_STREAMING_AVAILABLE = True
-    print("✅ AssemblyAI streaming module loaded")
-except ImportError as e:
-    print(f"❌ AssemblyAI streaming not available: {e}")
+# The SDKs are only located here; they are imported on first use (or by warmup())
+_AAI_SPEC = importlib.util.find_spec('assemblyai')
+ASSEMBLYAI_AVAILABLE = _AAI_SPEC is not None
+ASSEMBLYAI_STREAMING_AVAILABLE = bool(
+    _AAI_SPEC and _AAI_SPEC.submodule_search_locations
+    and any(os.path.isdir(os.path.join(path, 'streaming', 'v3')) for path in _AAI_SPEC.submodule_search_locations)
+)
 
 class VoiceManagerPython313:
     def __init__(self, api_keys):
@@ -39,45 +28,51 @@ class VoiceManagerPython313:
         self.tts_engine = None
         self.assemblyai_available = False
         self.assemblyai_streaming_available = False
-        self.available_voices = {}
+        self.voice_catalog = VoiceCatalog.from_env()
+        # pyttsx3 engines are not thread-safe; TTS jobs run on worker threads
+        self._tts_lock = threading.Lock()
+        # The TTS engine (and its voice scan) is created on first use or by warmup()
+        self._tts_init_lock = threading.Lock()
+        self._tts_initialized = False
+        self._aai = None
+        self.local_stt = LocalSTT.from_env()
+        self.transcription = TranscriptionOrchestrator(stagger=float(os.getenv('TRANSCRIBE_STAGGER_SECONDS', '5')))
         
-        self._init_tts()
         self._init_assemblyai()
+    
+    def warmup(self):
+        """Create the TTS engine and import the AssemblyAI SDK ahead of the first request"""
+        self._ensure_tts()
+        if self.assemblyai_available:
+            self._assemblyai()
         self._print_status()
+    
+    def _ensure_tts(self):
+        if self._tts_initialized:
+            return
+        with self._tts_init_lock:
+            if not self._tts_initialized:
+                self._init_tts()
+                self._tts_initialized = True
+    
+    def _assemblyai(self):
+        """The assemblyai module, imported and configured on first use"""
+        if self._aai is None:
+            import assemblyai as aai
+            aai.settings.api_key = self.api_keys['ASSEMBLYAI_API_KEY']
+            self._aai = aai
+        return self._aai
         
     def _init_tts(self):
         try:
+            import pyttsx3
             self.tts_engine = pyttsx3.init()
-            voices = self.tts_engine.getProperty('voices')
-            
-            default_voice = voices[0].id if voices else None
-            
-            theme_voice_map = {
-                'sassy': ['female', 'zira', 'hazel'],
-                'ruthless': ['male', 'david', 'mark'],
-                'sweet': ['female', 'zira', 'hazel'],
-                'innocent': ['female', 'zira', 'hazel'],
-                'bestie': ['female', 'zira', 'hazel'],
-                'flirty': ['male', 'david', 'mark'],
-                'objective': ['male', 'david'],
-                'teacher': ['female', 'zira'],
-                'philosopher': ['male', 'david']
-            }
             
-            if voices:
-                print(f"✅ Found {len(voices)} voices")
-                
-                for theme, keywords in theme_voice_map.items():
-                    for voice in voices:
-                        voice_name = voice.name.lower()
-                        if any(keyword in voice_name for keyword in keywords):
-                            self.available_voices[theme] = voice.id
-                            print(f"✅ Assigned voice '{voice.name}' to theme '{theme}'")
-                            break
-                    
-                    if theme not in self.available_voices:
-                        self.available_voices[theme] = default_voice
-                        print(f"⚠️ Using default voice for theme '{theme}'")
+            # Enumerating voices is the slow part of startup; reuse the last scan while the installed voices match
+            if self.voice_catalog.load():
+                print(f"✅ Using cached voice catalog ({len(self.voice_catalog.voices())} voices)")
+            else:
+                self._scan_voices()
             
             self.tts_engine.setProperty('rate', 180)
             self.tts_engine.setProperty('volume', 0.9)
@@ -87,20 +82,31 @@ class VoiceManagerPython313:
             print(f"❌ TTS initialization error: {e}")
             self.tts_engine = None
     
+    def _scan_voices(self):
+        voices = self.voice_catalog.discover(self.tts_engine)
+        print(f"✅ Found {len(voices)} voices in {self.voice_catalog.scan_seconds:.2f}s")
+        names = {voice['id']: voice['name'] for voice in voices}
+        for theme, voice_id in self.voice_catalog.describe()['scanned'].items():
+            print(f"✅ Assigned voice '{names.get(voice_id, voice_id)}' to theme '{theme}'")
+    
+    @property
+    def available_voices(self):
+        """theme -> voice id: the cached scan with operator overrides applied"""
+        return self.voice_catalog.mapping() if self.tts_engine else {}
+    
+    def rescan_voices(self):
+        """Enumerate the engine's voices again, e.g. after installing new ones"""
+        self._ensure_tts()
+        if not self.tts_engine:
+            return None
+        with self._tts_lock:
+            self._scan_voices()
+        return self.voice_catalog.describe()
+    
     def _init_assemblyai(self):
         if ASSEMBLYAI_AVAILABLE and self.api_keys.get('ASSEMBLYAI_API_KEY'):
-            try:
-                aai.settings.api_key = self.api_keys['ASSEMBLYAI_API_KEY']
-                self.assemblyai_available = True
-                print("✅ AssemblyAI base initialized successfully")
-                
-                if ASSEMBLYAI_STREAMING_AVAILABLE:
-                    self.assemblyai_streaming_available = True
-                    print("✅ AssemblyAI streaming initialized successfully")
-                    
-            except Exception as e:
-                print(f"❌ AssemblyAI initialization failed: {e}")
-                self.assemblyai_available = False
+            self.assemblyai_available = True
+            self.assemblyai_streaming_available = ASSEMBLYAI_STREAMING_AVAILABLE
         else:
             if not ASSEMBLYAI_AVAILABLE:
                 print("❌ AssemblyAI module not installed")
@@ -113,7 +119,8 @@ class VoiceManagerPython313:
         print(f"   Theme-specific voices: {'✅' if self.available_voices else '❌'}")
         print(f"   AssemblyAI Base: {'✅' if self.assemblyai_available else '❌'}")
         print(f"   AssemblyAI Streaming: {'✅' if self.assemblyai_streaming_available else '❌'}")
-        print(f"   Voice Recording: {'✅' if self.assemblyai_available else '❌'}")
+        print(f"   Local STT: {'✅ ' + self.local_stt.backend if self.local_stt.available else '❌'}")
+        print(f"   Voice Recording: {'✅' if self.assemblyai_available or self.local_stt.available else '❌'}")
         print()
     
     def _remove_emojis(self, text):
@@ -139,55 +146,89 @@ class VoiceManagerPython313:
                                    "]+", flags=re.UNICODE)
         return emoji_pattern.sub(r'', text)
     
-    def transcribe_audio(self, audio_file_path: str) -> str:
-        if self.assemblyai_available:
-            try:
-                print("🔄 Trying AssemblyAI SDK...")
-                transcriber = aai.Transcriber()
-                transcript = transcriber.transcribe(audio_file_path)
-                
-                if transcript.status == "completed":
-                    print("✅ AssemblyAI SDK transcription successful")
-                    return transcript.text
-                elif transcript.status == "error":
-                    print(f"❌ AssemblyAI SDK error: {transcript.error}")
-                else:
-                    print(f"⚠️ AssemblyAI SDK status: {transcript.status}")
-            except Exception as e:
-                print(f"❌ AssemblyAI SDK error: {e}")
+    def transcribe_audio(self, audio_file_path: str, cancel=None) -> str:
+        prepared = self.local_stt.prepare(audio_file_path) if self.local_stt.available else None
+        backends, fallbacks = [], []
         
+        if prepared:
+            local = ('local', lambda path, cancel_event: self.local_stt.transcribe_prepared(prepared))
+            # Short clips decode locally faster than an upload round trip
+            if prepared['duration'] <= self.local_stt.first_pass_seconds:
+                backends.append(local)
+            else:
+                fallbacks.append(local)
+        # The SDK's HTTP client bypasses provider tapes; the REST backend is recorded and replayed
+        if self.assemblyai_available and provider_tape.active() is None:
+            backends.append(('assemblyai_sdk', self._transcribe_with_sdk))
         if self.api_keys.get('ASSEMBLYAI_API_KEY'):
-            try:
-                print("🔄 Trying AssemblyAI Direct API...")
-                result = self._transcribe_with_api(audio_file_path)
-                if result and not result.startswith("❌") and not result.startswith("Error"):
-                    print("✅ AssemblyAI API transcription successful")
-                    return result
-                else:
-                    print(f"❌ AssemblyAI API failed: {result}")
-            except Exception as e:
-                print(f"❌ AssemblyAI API error: {e}")
+            backends.append(('assemblyai_api', self._transcribe_with_api))
+        
+        try:
+            result = self.transcription.transcribe(audio_file_path, backends, fallbacks, cancel=cancel)
+        finally:
+            if prepared and os.path.exists(prepared['path']):
+                os.remove(prepared['path'])
         
+        if result:
+            return result
         return "❌ Transcription failed. AssemblyAI API key may be missing or invalid. Please type your argument instead."
     
-    def _transcribe_with_api(self, audio_file_path: str) -> str:
+    def _transcribe_with_sdk(self, audio_file_path: str, cancel_event=None) -> Optional[str]:
+        # The SDK call blocks until done; a cancelled run just has its result ignored
+        transcript = self._assemblyai().Transcriber().transcribe(audio_file_path)
+        
+        if transcript.status == "completed":
+            return transcript.text
+        elif transcript.status == "error":
+            print(f"❌ AssemblyAI SDK error: {transcript.error}")
+        else:
+            print(f"⚠️ AssemblyAI SDK status: {transcript.status}")
+        return None
+    
+    def _transcribe_with_api(self, audio_file_path: str, cancel_event=None) -> str:
         try:
-            headers = {'authorization': self.api_keys['ASSEMBLYAI_API_KEY']}
-            
             print("📤 Uploading audio file...")
             with open(audio_file_path, 'rb') as f:
-                response = requests.post(
-                    'https://api.assemblyai.com/v2/upload',
-                    headers=headers,
-                    files={'file': f},
-                    timeout=60
-                )
+                upload_url = self.upload_audio(f, timeout=60)
             
-            if response.status_code != 200:
-                return f"❌ Upload failed: {response.status_code} - {response.text}"
+            if upload_url.startswith("❌"):
+                return upload_url
+            if cancel_event is not None and cancel_event.is_set():
+                return "❌ Transcription cancelled"
+            
+            return self.transcribe_upload_url(upload_url, cancel_event)
             
-            upload_url = response.json()['upload_url']
-            print(f"✅ File uploaded: {upload_url}")
+        except requests.exceptions.Timeout:
+            return "❌ Request timeout - check your internet connection"
+        except requests.exceptions.RequestException as e:
+            return f"❌ Network error: {str(e)}"
+        except Exception as e:
+            return f"❌ API error: {str(e)}"
+    
+    def upload_audio(self, data, timeout: int = 60) -> str:
+        """Upload a file object or an iterator of byte chunks; returns the upload URL.
+        
+        Iterators are sent with chunked transfer encoding, so a recording can
+        be uploaded while it is still being captured.
+        """
+        headers = {'authorization': self.api_keys['ASSEMBLYAI_API_KEY']}
+        response = requests.post(
+            'https://api.assemblyai.com/v2/upload',
+            headers=headers,
+            data=data,
+            timeout=timeout
+        )
+        
+        if response.status_code != 200:
+            return f"❌ Upload failed: {response.status_code} - {response.text}"
+        
+        upload_url = response.json()['upload_url']
+        print(f"✅ File uploaded: {upload_url}")
+        return upload_url
+    
+    def transcribe_upload_url(self, upload_url: str, cancel_event: Optional[threading.Event] = None) -> str:
+        try:
+            headers = {'authorization': self.api_keys['ASSEMBLYAI_API_KEY']}
             
             print("🔄 Requesting transcription...")
             data = {
@@ -213,6 +254,8 @@ class VoiceManagerPython313:
             url = f'https://api.assemblyai.com/v2/transcript/{transcript_id}'
             
             for attempt in range(60):
+                if cancel_event is not None and cancel_event.is_set():
+                    return "❌ Transcription cancelled"
                 print(f"🔄 Checking status... (attempt {attempt + 1}/60)")
                 response = requests.get(url, headers=headers, timeout=10)
                 
@@ -236,7 +279,10 @@ class VoiceManagerPython313:
                 else:
                     print(f"⚠️ Status check failed: {response.status_code}")
                 
-                time.sleep(2)
+                if cancel_event is not None:
+                    cancel_event.wait(2)
+                else:
+                    time.sleep(2)
             
             return "❌ Transcription timeout (2 minutes exceeded)"
             
@@ -253,6 +299,17 @@ class VoiceManagerPython313:
             return None
             
         try:
+            from assemblyai.streaming.v3 import (
+                BeginEvent,
+                StreamingClient,
+                StreamingClientOptions,
+                StreamingError,
+                StreamingEvents,
+                StreamingParameters,
+                TerminationEvent,
+                TurnEvent,
+            )
+            
             client = StreamingClient(
                 StreamingClientOptions(
                     api_key=self.api_keys['ASSEMBLYAI_API_KEY'],
@@ -303,25 +360,36 @@ class VoiceManagerPython313:
     
     def text_to_speech(self, text: str, debate_id: str, theme: str = None) -> str:
         try:
+            self._ensure_tts()
             if not self.tts_engine:
                 return "❌ TTS engine not available"
             
             clean_text = self._remove_emojis(text)
+            voice_id = self.available_voices.get(theme) if theme else None
             
-            if theme and theme in self.available_voices:
-                voice_id = self.available_voices[theme]
-                self.tts_engine.setProperty('voice', voice_id)
+            if voice_id:
                 print(f"🎤 Using voice for theme '{theme}'")
             
-            audio_filename = f"ai_response_{debate_id}_{int(time.time())}.wav"
+            # Content-addressed so repeated replies (and speculative synthesis) reuse the file;
+            # the voice is part of the key so an override is heard on the next reply
+            audio_key = hashlib.sha1(f"{theme}\0{voice_id}\0{clean_text}".encode('utf-8')).hexdigest()[:20]
+            audio_filename = f"ai_response_{audio_key}.wav"
             audio_path = os.path.join('static', 'audio', audio_filename)
             
+            if os.path.exists(audio_path):
+                return f"/audio/{audio_filename}"
+            
             os.makedirs(os.path.dirname(audio_path), exist_ok=True)
+            partial_path = os.path.join('static', 'audio', f"ai_response_{audio_key}.{uuid.uuid4().hex[:8]}.partial.wav")
             
-            self.tts_engine.save_to_file(clean_text, audio_path)
-            self.tts_engine.runAndWait()
+            with self._tts_lock:
+                if voice_id:
+                    self.tts_engine.setProperty('voice', voice_id)
+                self.tts_engine.save_to_file(clean_text, partial_path)
+                self.tts_engine.runAndWait()
+            os.replace(partial_path, audio_path)
             
-            return f"/static/audio/{audio_filename}"
+            return f"/audio/{audio_filename}"
             
         except Exception as e:
             print(f"❌ TTS error: {e}")
@@ -329,16 +397,18 @@ class VoiceManagerPython313:
     
     def speak_text(self, text: str, theme: str = None):
         try:
+            self._ensure_tts()
             if self.tts_engine:
                 clean_text = self._remove_emojis(text)
                 
-                if theme and theme in self.available_voices:
-                    voice_id = self.available_voices[theme]
-                    self.tts_engine.setProperty('voice', voice_id)
+                voice_id = self.available_voices.get(theme) if theme else None
                 
                 def speak():
-                    self.tts_engine.say(clean_text)
-                    self.tts_engine.runAndWait()
+                    with self._tts_lock:
+                        if voice_id:
+                            self.tts_engine.setProperty('voice', voice_id)
+                        self.tts_engine.say(clean_text)
+                        self.tts_engine.runAndWait()
                 
                 thread = threading.Thread(target=speak)
                 thread.daemon = True
@@ -348,12 +418,15 @@ class VoiceManagerPython313:
             print(f"❌ Direct speech error: {e}")
     
     def get_voice_status(self):
+        self._ensure_tts()
         return {
             'tts_available': self.tts_engine is not None,
             'theme_voices_available': len(self.available_voices) > 0,
+            'voice_catalog': self.voice_catalog.source,
             'assemblyai_available': self.assemblyai_available,
             'assemblyai_streaming_available': self.assemblyai_streaming_available,
-            'voice_recording_available': self.assemblyai_available,
+            'voice_recording_available': self.assemblyai_available or self.local_stt.available,
+            'local_stt_available': self.local_stt.available,
             'realtime_available': self.assemblyai_streaming_available,
             'python_version_compatible': True
         }
@@ -9,6 +9,10 @@ import time
 import tempfile
 from typing import Optional, Callable
 
+from utils import provider_tape
+from utils.audio_pipeline import pcm_audio
+from utils.transcription import TranscriptionOrchestrator
+
 # Import with comprehensive error handling
 ASSEMBLYAI_AVAILABLE = False
 ASSEMBLYAI_STREAMING_AVAILABLE = False
@@ -54,6 +58,7 @@ class VoiceManagerRobust:
         self.assemblyai_available = False
         self.assemblyai_streaming_available = False
         self.speech_recognition_available = SPEECH_RECOGNITION_AVAILABLE
+        self.transcription = TranscriptionOrchestrator(stagger=float(os.getenv('TRANSCRIBE_STAGGER_SECONDS', '5')))
         
         self._init_tts()
         self._init_assemblyai()
@@ -111,54 +116,40 @@ class VoiceManagerRobust:
         print(f"   Voice Recording: {'✅' if (self.assemblyai_available or self.speech_recognition_available) else '❌'}")
         print()
     
-    def transcribe_audio(self, audio_file_path: str) -> str:
-        """Transcribe audio using all available methods"""
-        
-        # Method 1: AssemblyAI SDK
-        if self.assemblyai_available:
-            try:
-                print("🔄 Trying AssemblyAI SDK...")
-                transcriber = aai.Transcriber()
-                transcript = transcriber.transcribe(audio_file_path)
-                
-                if transcript.status == "completed":
-                    print("✅ AssemblyAI SDK transcription successful")
-                    return transcript.text
-                else:
-                    print(f"⚠️ AssemblyAI SDK failed with status: {transcript.status}")
-            except Exception as e:
-                print(f"❌ AssemblyAI SDK error: {e}")
-        
-        # Method 2: AssemblyAI Direct API
+    def transcribe_audio(self, audio_file_path: str, cancel=None) -> str:
+        """Transcribe audio, racing all available methods (staggered)"""
+        backends = []
+        # The SDK's HTTP client bypasses provider tapes; the REST backend is recorded and replayed
+        if self.assemblyai_available and provider_tape.active() is None:
+            backends.append(('assemblyai_sdk', self._transcribe_with_sdk))
         if self.api_keys.get('ASSEMBLYAI_API_KEY'):
-            try:
-                print("🔄 Trying AssemblyAI Direct API...")
-                result = self._transcribe_with_api(audio_file_path)
-                if result and "error" not in result.lower():
-                    print("✅ AssemblyAI API transcription successful")
-                    return result
-                else:
-                    print(f"⚠️ AssemblyAI API failed: {result}")
-            except Exception as e:
-                print(f"❌ AssemblyAI API error: {e}")
-        
-        # Method 3: Google Speech Recognition
+            backends.append(('assemblyai_api', self._transcribe_with_api))
         if self.speech_recognition_available:
-            try:
-                print("🔄 Trying Google Speech Recognition...")
-                r = sr.Recognizer()
-                with sr.AudioFile(audio_file_path) as source:
-                    audio = r.record(source)
-                    text = r.recognize_google(audio)
-                    print("✅ Google Speech Recognition successful")
-                    return text
-            except Exception as e:
-                print(f"❌ Speech Recognition error: {e}")
+            backends.append(('google_speech', self._transcribe_with_speech_recognition))
+        
+        result = self.transcription.transcribe(audio_file_path, backends, cancel=cancel)
+        if result:
+            return result
         
         # All methods failed
         return "❌ All transcription methods failed. Please type your argument instead."
     
-    def _transcribe_with_api(self, audio_file_path: str) -> str:
+    def _transcribe_with_sdk(self, audio_file_path: str, cancel_event=None) -> Optional[str]:
+        """AssemblyAI SDK (blocking; a cancelled run just has its result ignored)"""
+        transcript = aai.Transcriber().transcribe(audio_file_path)
+        if transcript.status == "completed":
+            return transcript.text
+        print(f"⚠️ AssemblyAI SDK failed with status: {transcript.status}")
+        return None
+    
+    def _transcribe_with_speech_recognition(self, audio_file_path: str, cancel_event=None) -> Optional[str]:
+        """Google Speech Recognition"""
+        r = sr.Recognizer()
+        with pcm_audio(audio_file_path) as pcm_path, sr.AudioFile(pcm_path) as source:
+            audio = r.record(source)
+            return r.recognize_google(audio)
+    
+    def _transcribe_with_api(self, audio_file_path: str, cancel_event=None) -> str:
         """Direct API call to AssemblyAI"""
         try:
             headers = {'authorization': self.api_keys['ASSEMBLYAI_API_KEY']}
@@ -176,6 +167,8 @@ class VoiceManagerRobust:
                 return f"Upload failed: {response.status_code}"
             
             upload_url = response.json()['upload_url']
+            if cancel_event is not None and cancel_event.is_set():
+                return "Transcription cancelled"
             
             # Request transcription
             data = {'audio_url': upload_url}
@@ -195,6 +188,8 @@ class VoiceManagerRobust:
             url = f'https://api.assemblyai.com/v2/transcript/{transcript_id}'
             
             for attempt in range(30):  # 60 seconds max
+                if cancel_event is not None and cancel_event.is_set():
+                    return "Transcription cancelled"
                 response = requests.get(url, headers=headers, timeout=10)
                 
                 if response.status_code == 200:
@@ -206,7 +201,10 @@ class VoiceManagerRobust:
                     elif status == 'error':
                         return f"Transcription error: {result.get('error')}"
                 
-                time.sleep(2)
+                if cancel_event is not None:
+                    cancel_event.wait(2)
+                else:
+                    time.sleep(2)
             
             return "Transcription timeout"
             
@@ -282,7 +280,7 @@ class VoiceManagerRobust:
             self.tts_engine.save_to_file(text, audio_path)
             self.tts_engine.runAndWait()
             
-            return f"/static/audio/{audio_filename}"
+            return f"/audio/{audio_filename}"
             
         except Exception as e:
             print(f"❌ TTS error: {e}")